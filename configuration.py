@@ -54,8 +54,11 @@ CONFIG = {
     "atk_filt": {"strat": [DirectionalFilteringStrat]},
     "atk_feas": {
         "strat": [LPFeasStrat],
+        "solver": ["gurobi"],
     },
     "atk_optim": {"strat": [BinSearchOptimStrat], "rate": [1.0]},
+    # Not a strategy: LinkAttackPhase parameters. Number of targets whose feasibility problems are prepared together
+    "lnk_atk": {"group_size": [8]},
     "zone_select": {"strat": [RandZoneStrat], "samples": [5000]},
     "zone_build": {"strat": [KclosestZoneStrat], "size": [6]},
     "zone_edges": {
@@ -69,7 +72,7 @@ CONFIG = {
 
 # Here follow methods used for the parsing.
 def parse_config(config_lists) -> List[Dict]:
-    """ Parse the configuration """
+    """Parse the configuration"""
     # Parse the base elements
     # Get a list of all the lists and determine the longest
     full_config = []
@@ -3,53 +3,303 @@
 Main interface of the library. Every time an experiment is run, an icarusSimulator object must be created.
 The constructor takes a list of phases to run sequentially. This class manages the intermediate and final results,
 saving everything with passed property names, and correctly naming the file dumps based on phase dependencies.
+File dumps are content-addressed: each phase result is keyed by a hash of the phase configuration and of the keys of
+its upstream results, see result_cache.py.
+
+Properties are evaluated lazily. compute_simulation() only makes sure that the results of the final phases (the ones
+whose outputs are not consumed by any following phase) are available, either in the cache or in memory. Every other
+property is loaded from the cache, or computed, only when a downstream phase or get_property() requests it.
+Therefore, upstream results are not even read when a downstream result is already cached.
+
+To bound the memory usage, a liveness analysis over the phase inputs and outputs releases every result as soon as its
+last consumer phase finishes. Results that can be read back from their file are always released, and are transparently
+reloaded if get_property() requests them later. Results that cannot be read back are kept only if one of their
+properties is listed in the retain parameter (all properties are retained when it is None), otherwise get_property()
+recomputes them. At the end of the simulation, a peak-memory summary is printed.
+
+The phases needed by compute_simulation() are run by the PhaseScheduler, which executes independent phases
+concurrently within a budget of num_cores cores, shared with the Multiprocessor of each phase (all the cores by default).
+
+compute_time_series() is the temporal mode: the phases are run for a list of epoch offsets (in seconds, added to the
+time configured in the LSN strategy), one snapshot each. The time-variant phases (e.g. LSNPhase) are copied for every
+snapshot, and so are all the phases that depend on them, while the other phases (e.g. GridPhase) are shared by all
+snapshots and run once. The snapshots are scheduled together, and therefore run in parallel. The results of the time-dependent phases are stored in a single time-indexed
+dataset per phase (see result_store.py), and get_time_series() returns the values of a property for every offset.
 """
-from typing import List, Any, Tuple, Set
+import resource
+import threading
+
+from dataclasses import dataclass, field
+from typing import List, Any, Tuple, Set, Dict, Optional
 
 from icarus_simulator.phases.base_phase import BasePhase
+from icarus_simulator.phase_scheduler import PhaseScheduler
+from icarus_simulator.result_cache import ResultCache
+from icarus_simulator.result_store import result_exists
 from icarus_simulator.structure_definitions import PropertyDict, Pname, DependencyDict
 
 
+@dataclass
+class PhaseNode:
+    # A phase in the computation graph. Inputs are (producer node index, producer output index) pairs
+    phase: BasePhase
+    key: str
+    fname: str
+    description: str
+    inputs: List[Tuple[int, int]]
+    cached: bool = False
+    result: Optional[Tuple] = None
+    consumers: int = 0  # Number of consumer phases that did not finish yet
+    finished: bool = False
+    # Held while the result is read or computed, so that concurrent requests load it only once
+    load_lock: threading.Lock = field(default_factory=threading.Lock)
+
+
 class IcarusSimulator:
-    def __init__(self, phases: List[BasePhase], results_directory: str):
+    def __init__(
+        self,
+        phases: List[BasePhase],
+        results_directory: str,
+        verify_cache: bool = False,
+        retain: Optional[List[Pname]] = None,
+        num_cores: Optional[int] = None,
+    ):
         self.phases = phases
         self.basedir = results_directory
+        self.cache = ResultCache(results_directory, verify_cache)
         self.properties: PropertyDict = {}
         self.dependencies: DependencyDict = {}
+        self.keys: Dict[Pname, str] = {}
+        self.nodes: List[PhaseNode] = []
+        self.producers: Dict[Pname, Tuple[int, int]] = {}
+        self.retain = retain
+        self.memory_log: List[Tuple[str, float, float, List[Pname]]] = []
+        self.scheduler = PhaseScheduler(num_cores)
+        self.node_keys: Dict[str, int] = {}
+        self.time_producers: Dict[float, Dict[Pname, Tuple[int, int]]] = {}
+        # Guards the node states when phases run concurrently
+        self._lock = threading.RLock()
 
     def get_property(self, property_name: str):
-        return self.properties[property_name]  # Raises with wrong property name
+        node_idx, out_idx = self.producers[property_name]  # Raises with wrong name
+        return self._materialize(node_idx)[out_idx]
 
     def compute_simulation(self):
-        # Execute phases sequentially
-        for phase in self.phases:
-            # Get all necessary input data for the current phase
+        self._reset_graph()
+        self.producers, self.keys, self.dependencies = self._add_phases(self.phases)
+        self._run_graph()
+
+    def get_time_series(self, property_name: str) -> Dict[float, Any]:
+        series = {}
+        for offset, producers in self.time_producers.items():
+            node_idx, out_idx = producers[property_name]  # Raises with wrong name
+            series[offset] = self._materialize(node_idx)[out_idx]
+        return series
+
+    def compute_time_series(self, offsets: List[float]):
+        self._reset_graph()
+        time_variant = self._get_time_variant(self.phases)
+        # The dataset of each phase is named after the phase key at offset 0, which is the same for all offsets
+        series_keys = self._get_phase_keys(
+            [
+                phase.at_epoch_offset(0) if phase.time_variant else phase
+                for phase in self.phases
+            ]
+        )
+        for offset in offsets:
+            snapshot = [
+                phase.at_epoch_offset(offset) if phase.time_variant else phase
+                for phase in self.phases
+            ]
+            fnames = [
+                self.cache.series_path_for(series_keys[idx], phase.name, offset)
+                if time_variant[idx]
+                else None
+                for idx, phase in enumerate(snapshot)
+            ]
+            self.time_producers[offset], _, _ = self._add_phases(snapshot, fnames)
+        self._run_graph()
+
+    def _reset_graph(self) -> None:
+        self.properties, self.dependencies, self.keys = {}, {}, {}
+        self.nodes, self.producers, self.node_keys, self.memory_log = [], {}, {}, []
+        self.time_producers = {}
+
+    @staticmethod
+    def _get_time_variant(phases: List[BasePhase]) -> List[bool]:
+        # A phase depends on time if it is time-variant itself, or if any of its inputs depends on time
+        variant_props, time_variant = set(), []
+        for phase in phases:
+            variant = phase.time_variant or any(
+                inp in variant_props for inp in phase.input_properties
+            )
+            outputs = set(phase.output_properties)
+            variant_props = (
+                variant_props.union(outputs) if variant else variant_props - outputs
+            )
+            time_variant.append(variant)
+        return time_variant
+
+    def _get_phase_keys(self, phases: List[BasePhase]) -> List[str]:
+        keys = {}
+        return [
+            self._update_keys(
+                keys, phase.output_properties, phase.input_properties, phase.description
+            )
+            for phase in phases
+        ]
+
+    def _add_phases(
+        self, phases: List[BasePhase], fnames: Optional[List[Optional[str]]] = None
+    ) -> Tuple[Dict[Pname, Tuple[int, int]], Dict[Pname, str], DependencyDict]:
+        # Compute keys and file names of the phases, without executing them. Phases with the same key share a node
+        # File names can be passed for some phases, otherwise they are derived from the key
+        producers, keys, dependencies = {}, {}, {}
+        for phase_idx, phase in enumerate(phases):
             input_properties, output_properties = (
                 phase.input_properties,
                 phase.output_properties,
             )
             phase_name, phase_descr = phase.name, phase.description
-            input_values = self._get_input_values(input_properties)
+            inputs = [producers[inp] for inp in input_properties]
 
-            # Update the phase dependency dictionary and get the filename
+            # Update the phase dependency dictionary and get the filename from the content key
             previous = self._update_dependencies(
-                output_properties, input_properties, phase_descr
+                dependencies, output_properties, input_properties, phase_descr
+            )
+            phase_key = self._update_keys(
+                keys, output_properties, input_properties, phase_descr
             )
-            phase_fname = self._get_phase_fname(phase_name, previous)
+            if phase_key not in self.node_keys:
+                phase_fname = self.cache.path_for(phase_key, phase_name)
+                if fnames is not None and fnames[phase_idx] is not None:
+                    phase_fname = fnames[phase_idx]
+                cached = phase.read_persist and self.cache.validate(
+                    phase_key, phase_fname
+                )
+                node = PhaseNode(
+                    phase,
+                    phase_key,
+                    phase_fname,
+                    self._get_phase_description(phase_name, previous),
+                    inputs,
+                    cached,
+                )
+                for producer_idx in set(inp[0] for inp in inputs):
+                    self.nodes[producer_idx].consumers += 1
+                self.node_keys[phase_key] = len(self.nodes)
+                self.nodes.append(node)
+            for idx, outp in enumerate(output_properties):
+                producers[outp] = (self.node_keys[phase_key], idx)
+        return producers, keys, dependencies
 
-            # Execute the phase and update the results
-            phase_result = phase.execute_phase(input_values, phase_fname)
-            self._update_properties(phase_result, output_properties)
+    def _run_graph(self) -> None:
+        # Only the final results are required to exist, the rest is materialized on demand
+        consumed = set(inp[0] for node in self.nodes for inp in node.inputs)
+        targets = [idx for idx in range(len(self.nodes)) if idx not in consumed]
+        for node_idx in targets:
+            if self.nodes[node_idx].cached:
+                self._touch(self.nodes[node_idx])
+        # Phases that are not executed do not need their inputs
+        needed = self.scheduler.get_needed(self.nodes, targets)
+        for node_idx in range(len(self.nodes)):
+            if node_idx not in needed:
+                self._finish(self.nodes[node_idx])
+        self.scheduler.run(self.nodes, targets, self._materialize)
+        for node_idx in targets:
+            self._release_if_dead(node_idx)
+        self._print_memory_summary()
 
-    def _get_input_values(self, input_properties: List[Pname]) -> List[Any]:
+    def _materialize(self, node_idx: int) -> Tuple:
+        # Read or compute the result of a node, recursively materializing its inputs only if computation is needed
+        node = self.nodes[node_idx]
+        # The inputs of a node are upstream of it, so the nested node locks are always taken in topological order
+        with node.load_lock:
+            phase_result = node.result
+            if phase_result is not None:
+                return phase_result
+            phase_result = node.phase.execute_phase(
+                lambda: self._get_input_values(node), node.fname
+            )
+            self.cache.register(
+                node.key, node.fname, node.description, written=not node.cached
+            )
+            with self._lock:
+                node.result = phase_result
+                self._update_properties(node_idx)
+                self._finish(node)
+                self._log_memory(node)
+        return phase_result
+
+    def _finish(self, node: PhaseNode) -> None:
+        # The first time a phase finishes, its inputs lose one consumer, and can possibly be released
+        if node.finished:
+            return
+        node.finished = True
+        for producer_idx in set(inp[0] for inp in node.inputs):
+            self.nodes[producer_idx].consumers -= 1
+            self._release_if_dead(producer_idx)
+
+    def _release_if_dead(self, node_idx: int) -> None:
+        node = self.nodes[node_idx]
+        with self._lock:
+            if node.result is None or node.consumers > 0:
+                return
+            self._release(node_idx)
+
+    def _release(self, node_idx: int) -> None:
+        node = self.nodes[node_idx]
+        phase = node.phase
+        reloadable = phase.persist and phase.read_persist and result_exists(node.fname)
+        retained = self.retain is None or any(
+            outp in self.retain for outp in phase.output_properties
+        )
+        if retained and not reloadable:
+            return
+        node.result, node.cached = None, reloadable
+        for idx, outp in enumerate(phase.output_properties):
+            if self.producers.get(outp) == (node_idx, idx):
+                del self.properties[outp]
+        print(f"{phase.name} released {', '.join(phase.output_properties)}")
+
+    def _log_memory(self, node: PhaseNode) -> None:
+        # Peak resident set size in MB, for this process and for the largest terminated worker process (Linux units)
+        peak_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        peak_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        live = [
+            outp
+            for live_node in self.nodes
+            if live_node.result is not None
+            for outp in live_node.phase.output_properties
+        ]
+        self.memory_log.append((node.phase.name, peak_self, peak_children, live))
+
+    def _print_memory_summary(self) -> None:
+        if len(self.memory_log) == 0:
+            return
+        print("Memory summary")
+        for phase_name, peak_self, peak_children, live in self.memory_log:
+            print(
+                f"{phase_name}: peak {peak_self:.1f}MB, workers peak {peak_children:.1f}MB, "
+                f"live properties: {', '.join(live)}"
+            )
+        print(f"Peak memory: {max(log[1] for log in self.memory_log):.1f}MB")
+        print("")
+
+    def _touch(self, node: PhaseNode) -> None:
+        # Record the access to a cached result that is not loaded yet, to keep it from being evicted
+        self.cache.register(node.key, node.fname, node.description, written=False)
+
+    def _get_input_values(self, node: PhaseNode) -> List[Any]:
         inputs = []
-        for inp in input_properties:
-            inputs.append(self.properties[inp])
-        assert len(inputs) == len(input_properties)
+        for node_idx, out_idx in node.inputs:
+            inputs.append(self._materialize(node_idx)[out_idx])
+        assert len(inputs) == len(node.phase.input_properties)
         return inputs
 
+    @staticmethod
     def _update_dependencies(
-        self,
+        dependencies: DependencyDict,
         output_properties: List[Pname],
         input_properties: List[Pname],
         phase_descr: str,
@@ -57,19 +307,34 @@ class IcarusSimulator:
         new_deps = set()
         new_deps.add(phase_descr)
         for inp in input_properties:
-            new_deps.update(self.dependencies[inp])
+            new_deps.update(dependencies[inp])
         for outp in output_properties:
-            self.dependencies[outp] = new_deps
+            dependencies[outp] = new_deps
         return new_deps
 
-    def _get_phase_fname(self, phase_name: str, previous: Set[str]) -> str:
+    @staticmethod
+    def _update_keys(
+        keys: Dict[Pname, str],
+        output_properties: List[Pname],
+        input_properties: List[Pname],
+        phase_descr: str,
+    ) -> str:
+        key = ResultCache.compute_key(
+            phase_descr, [keys[inp] for inp in input_properties]
+        )
+        for outp in output_properties:
+            keys[outp] = key
+        return key
+
+    @staticmethod
+    def _get_phase_description(phase_name: str, previous: Set[str]) -> str:
+        # Human-readable description of the whole upstream computation, stored in the cache index
         previous = sorted(list(previous))
-        return self.basedir + "/" + phase_name + "||" + "_".join(previous) + ".pkl.bz2"
-
-    def _update_properties(
-        self, phase_result: Tuple, output_properties: List[Pname]
-    ) -> None:
-        for idx, outp in enumerate(output_properties):
-            if outp not in self.properties:
-                self.properties[outp] = None
-            self.properties[outp] = phase_result[idx]
+        return phase_name + "||" + "_".join(previous)
+
+    def _update_properties(self, node_idx: int) -> None:
+        # Only expose the outputs of the last phase producing each property name
+        node = self.nodes[node_idx]
+        for idx, outp in enumerate(node.phase.output_properties):
+            if self.producers.get(outp) == (node_idx, idx):
+                self.properties[outp] = node.result[idx]
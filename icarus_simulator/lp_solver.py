@@ -0,0 +1,101 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+"""
+Linear programming backends for the strategies that solve LPs, e.g. LPFeasStrat.
+All the backends solve the same problem: min c @ x, subject to a_ub @ x <= b_ub and x >= 0, where a_ub is a dense
+numpy array or a scipy sparse matrix. The solution is returned as an array, or None if the problem has no optimum.
+
+Available backends, selected by name with get_solver():
+    - "gurobi": Gurobi, the default, which must be installed separately and requires a license (see readme.md);
+    - "highs": the open-source HiGHS solver shipped with scipy>=1.6, through scipy.optimize.linprog. It can return a
+      different optimal vertex than Gurobi, which changes about 8% of the link attack costs.
+The Gurobi environment is created once per worker process (and thread), instead of once per solved LP, as its startup
+is much more expensive than solving the small attack LPs.
+"""
+import os
+import threading
+import importlib.util
+import numpy as np
+import scipy
+
+from abc import ABC, abstractmethod
+from scipy.optimize import linprog
+from typing import Optional, Dict, Type
+
+
+class LPSolver(ABC):
+    REQUIREMENT: str = ""  # What the backend needs, reported when it is not available
+
+    @staticmethod
+    def is_available() -> bool:
+        return True
+
+    @abstractmethod
+    def minimize(self, c: np.ndarray, a_ub, b_ub: np.ndarray) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+
+class HighsSolver(LPSolver):
+    REQUIREMENT = "scipy>=1.6, which needs python>=3.7 (Pipfile.lock pins scipy 1.5.2)"
+
+    @staticmethod
+    def is_available() -> bool:
+        major, minor = scipy.__version__.split(".")[:2]
+        return (int(major), int(minor)) >= (1, 6)
+
+    def minimize(self, c: np.ndarray, a_ub, b_ub: np.ndarray) -> Optional[np.ndarray]:
+        res = linprog(c, A_ub=a_ub, b_ub=b_ub, bounds=(0, None), method="highs")
+        if res.status != 0:  # Not feasible, unbounded or failed
+            return None
+        return res.x
+
+
+class GurobiSolver(LPSolver):
+    REQUIREMENT = "gurobipy and a Gurobi license, see readme.md"
+    _local = threading.local()
+
+    @staticmethod
+    def is_available() -> bool:
+        return importlib.util.find_spec("gurobipy") is not None
+
+    @classmethod
+    def _env(cls):
+        # One environment per process and thread. The pid check catches the environments inherited by forking
+        local = cls._local
+        if getattr(local, "pid", None) != os.getpid():
+            # We import gurobi here as not everybody may have it installed!
+            import gurobipy as gp
+
+            env = gp.Env(empty=True)
+            env.setParam("OutputFlag", 0)
+            env.start()
+            local.pid, local.env = os.getpid(), env
+        return local.env
+
+    def minimize(self, c: np.ndarray, a_ub, b_ub: np.ndarray) -> Optional[np.ndarray]:
+        import gurobipy as gp
+        from gurobipy import GRB
+
+        m = gp.Model("lp", env=self._env())
+        try:
+            x = m.addMVar(shape=len(c), lb=0.0, name="x")
+            m.setObjective(c @ x, GRB.MINIMIZE)  # @ is matrix product!
+            # noinspection PyArgumentList
+            m.addConstr(a_ub @ x <= b_ub, name="c")
+            m.optimize()
+            if m.status != GRB.OPTIMAL:
+                return None
+            return np.array(x.X)
+        finally:
+            m.dispose()
+
+
+SOLVERS: Dict[str, Type[LPSolver]] = {"highs": HighsSolver, "gurobi": GurobiSolver}
+
+
+def get_solver(name: str) -> LPSolver:
+    solver_class = SOLVERS[name]  # Raises with a wrong name
+    if not solver_class.is_available():
+        raise RuntimeError(
+            f"The {name} LP solver is not available, it requires {solver_class.REQUIREMENT}"
+        )
+    return solver_class()
@@ -3,20 +3,108 @@
 Utils for a standardised batched multithreaded computing, in order to best accommodate python's shortcomings.
 The class spawns the desired number of processes after dividing the sample list in a desired number of batches.
 To reduce biases and thus computation tail times, samples are shuffled before execution.
+
+When phases are run concurrently by the PhaseScheduler, the cores are shared through the CoreBudget class attribute.
+The phase already holds one core, which is used by the first process. For every batch, additional processes are only
+spawned for the cores that are currently free in the budget, and the cores are returned at the end of the batch.
+As the phases run in threads, forking from a phase thread could copy into the child the locks held by the other threads
+of the simulator. The workers are thus forked by the scheduler's main thread, through the ProcessLauncher class attribute.
 """
 
 import math
 import pickle
+import queue
 import random
 import time
+import threading
 import multiprocessing as mp
 
 from abc import abstractmethod
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional, Callable, Any
 from icarus_simulator.utils import compute_intervals_uniform
 
 
+class CoreBudget:
+    def __init__(self, num_cores: int):
+        assert num_cores > 0
+        self.num_cores: int = num_cores
+        self.available: int = num_cores
+        self._cond = threading.Condition()
+
+    def acquire(self, num: int, blocking: bool = True) -> int:
+        # Acquire up to num cores, and return the number of acquired cores. If blocking, wait for at least one core
+        if num <= 0:
+            return 0
+        with self._cond:
+            while blocking and self.available == 0:
+                self._cond.wait()
+            granted = min(num, self.available)
+            self.available -= granted
+            return granted
+
+    def release(self, num: int) -> None:
+        if num <= 0:
+            return
+        with self._cond:
+            self.available += num
+            assert self.available <= self.num_cores
+            self._cond.notify_all()
+
+
+class ProcessLauncher:
+    # Runs the calls that fork processes in the thread that serves the launcher, on behalf of the other threads
+    def __init__(self):
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        done, outcome = threading.Event(), {}
+        with self._lock:
+            if self._closed:
+                return func()
+            self._requests.put((func, done, outcome))
+        done.wait()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def wake(self) -> None:
+        self._requests.put(None)
+
+    def serve(self, timeout: float) -> None:
+        # Wait for a request or a wake up, then run all the pending requests
+        try:
+            request = self._requests.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            if request is not None:
+                self._run(*request)
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+
+    def close(self) -> None:
+        # The pending requests are run here, the later ones by the calling threads
+        with self._lock:
+            self._closed = True
+        self.serve(timeout=0)
+
+    @staticmethod
+    def _run(func: Callable[[], Any], done: threading.Event, outcome: Dict) -> None:
+        try:
+            outcome["result"] = func()
+        except BaseException as e:
+            outcome["error"] = e
+        done.set()
+
+
 class Multiprocessor:
+    core_budget: Optional[CoreBudget] = None  # Set by the PhaseScheduler
+    launcher: Optional[ProcessLauncher] = None  # Set by the PhaseScheduler
+
     def __init__(
         self,
         num_procs: int,
@@ -26,11 +114,11 @@ class Multiprocessor:
         verbose: bool = False,
     ):
         assert num_procs > 0 and num_batches > 0
-        random.seed("DINFK")
         self.num_procs: int = min(mp.cpu_count(), num_procs)
         self.num_batches: int = num_batches
         self.samples: List = samples
-        random.shuffle(self.samples)
+        # Local generator, phases can run concurrently. The global one is seeded by each worker, see _proc_worker
+        random.Random("DINFK").shuffle(self.samples)
         self.verbose: bool = verbose
         self.process_params: Tuple = process_params
         samples_len = len(samples)
@@ -55,20 +143,39 @@ class Multiprocessor:
             batch_end = min(batch_start + self.batch_size, samples_len)
             samples_batch = self.samples[batch_start:batch_end]
             batch_start = batch_end
-            if self.num_procs == 1:
+            extra_procs = self._acquire_cores()
+            num_procs = 1 + extra_procs
+            if num_procs == 1:
                 dummy_dict = {}
                 self._proc_worker(0, dummy_dict, samples_batch)
                 dummy_dict[0] = pickle.loads(dummy_dict[0])
                 result_batch = self._assemble({}, dummy_dict)
             else:
-                result_batch = self._spawn_procs(samples_batch)
+                result_batch = self._spawn_procs(samples_batch, num_procs)
+            self._release_cores(extra_procs)
             result_total[idx] = result_batch
             idx += 1
         return self._assemble({}, result_total)
 
-    def _spawn_procs(self, samples_batch) -> Dict:
-        shared_dict, jobs = mp.Manager().dict(), []
-        intervals = compute_intervals_uniform(len(samples_batch), self.num_procs)
+    def _acquire_cores(self) -> int:
+        # Number of processes to spawn besides the first one
+        if self.core_budget is None:
+            return self.num_procs - 1
+        return self.core_budget.acquire(self.num_procs - 1, blocking=False)
+
+    def _release_cores(self, extra_procs: int) -> None:
+        if self.core_budget is not None:
+            self.core_budget.release(extra_procs)
+
+    def _launch(self, func: Callable[[], Any]) -> Any:
+        if self.launcher is None:
+            return func()
+        return self.launcher.call(func)
+
+    def _spawn_procs(self, samples_batch, num_procs: int) -> Dict:
+        manager = self._launch(mp.Manager)
+        shared_dict, jobs = manager.dict(), []
+        intervals = compute_intervals_uniform(len(samples_batch), num_procs)
         self._verbprint(f"Spawning {len(intervals)} threads")
         for i in range(len(intervals)):
             samples_proc = [s for s in samples_batch[intervals[i][0] : intervals[i][1]]]
@@ -76,7 +183,7 @@ class Multiprocessor:
                 target=self._proc_worker, args=(i, shared_dict, samples_proc)
             )
             jobs.append(p)
-            p.start()
+        self._launch(lambda: [proc.start() for proc in jobs])
         for proc in jobs:
             proc.join()
 
@@ -84,10 +191,12 @@ class Multiprocessor:
         unpickle_dict = {}
         for key in shared_dict:
             unpickle_dict[key] = pickle.loads(shared_dict[key])
+        manager.shutdown()
         return self._assemble({}, unpickle_dict)
 
     def _proc_worker(self, proc_id: int, return_dict, samples_proc: List) -> None:
         st = time.time()
+        # Whatever state the worker inherits, its global generator only depends on its id
         random.seed(f"{proc_id}-{proc_id}-{proc_id}")
         samples_len = len(samples_proc)
         last_min = 0
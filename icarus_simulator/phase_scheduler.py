@@ -0,0 +1,141 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+"""
+Scheduler for the phase graph built by IcarusSimulator. The input and output properties of the phases define a DAG,
+and phases that do not depend on each other (e.g. LSN and Grid) are executed concurrently, in separate threads.
+
+The scheduler only runs the phases that are actually needed: the target phases that are not cached, all the phases
+whose results they consume, and so on recursively. Cached phases that are needed are read, and their own inputs are
+not needed.
+A CoreBudget is shared between the scheduler and the Multiprocessor of every phase: a phase is started only when a core
+is free, and holds it until it finishes, while its Multiprocessor can borrow the cores that are free at each batch.
+The worker processes of the Multiprocessors are forked by the main thread of the scheduler, through a ProcessLauncher,
+so that no phase thread forks while the other ones run.
+
+After the execution, a timing report is printed, with the start and end time of every phase, and the critical path:
+the chain of dependent phases with the largest total time, which bounds the duration of the simulation.
+"""
+import time
+import multiprocessing as mp
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Set, Tuple, Callable, Optional
+
+from icarus_simulator.multiprocessor import CoreBudget, Multiprocessor, ProcessLauncher
+
+
+class PhaseScheduler:
+    def __init__(self, num_cores: Optional[int] = None):
+        self.num_cores: int = mp.cpu_count() if num_cores is None else num_cores
+        assert self.num_cores > 0
+        self.timings: Dict[int, Tuple[float, float]] = {}
+
+    def run(self, nodes: List, targets: List[int], execute: Callable[[int], None]):
+        # Nodes must expose the inputs and cached attributes of PhaseNode, and be topologically ordered
+        needed = self.get_needed(nodes, targets)
+        deps = {idx: self._get_deps(nodes, idx, needed) for idx in needed}
+        budget, launcher = CoreBudget(self.num_cores), ProcessLauncher()
+        Multiprocessor.core_budget, Multiprocessor.launcher = budget, launcher
+        self.timings = {}
+        start = time.time()
+        try:
+            with ThreadPoolExecutor(max_workers=self.num_cores) as executor:
+                try:
+                    self._schedule(
+                        needed, deps, execute, start, executor, budget, launcher
+                    )
+                finally:
+                    launcher.close()  # Otherwise, the phases still running could wait forever
+        finally:
+            Multiprocessor.core_budget, Multiprocessor.launcher = None, None
+        self._print_report(nodes, deps, time.time() - start)
+
+    def _schedule(
+        self,
+        needed: Set[int],
+        deps: Dict[int, Set[int]],
+        execute: Callable[[int], None],
+        start: float,
+        executor: ThreadPoolExecutor,
+        budget: CoreBudget,
+        launcher: ProcessLauncher,
+    ) -> None:
+        done, running = set(), {}
+        while len(done) < len(needed):
+            # Start the ready phases, in list order, as long as there are free cores
+            for idx in sorted(needed):
+                if idx in done or idx in running.values():
+                    continue
+                if not all(dep in done for dep in deps[idx]):
+                    continue
+                if budget.acquire(1, blocking=False) == 0:
+                    break
+                future = executor.submit(self._timed, execute, idx, start)
+                future.add_done_callback(lambda _: launcher.wake())
+                running[future] = idx
+
+            # Fork the workers requested by the phases until one finishes. The timeout catches cores released by a
+            # Multiprocessor
+            launcher.serve(timeout=1)
+            finished = [future for future in running if future.done()]
+            for future in finished:
+                idx = running.pop(future)
+                budget.release(1)
+                future.result()  # Raises the exceptions of the phase
+                done.add(idx)
+
+    @staticmethod
+    def get_needed(nodes: List, targets: List[int]) -> Set[int]:
+        needed, to_visit = set(), [t for t in targets if not nodes[t].cached]
+        while len(to_visit) > 0:
+            idx = to_visit.pop()
+            if idx in needed:
+                continue
+            needed.add(idx)
+            if nodes[idx].cached:  # The result is read, the inputs are not necessary
+                continue
+            to_visit.extend(inp[0] for inp in nodes[idx].inputs)
+        return needed
+
+    @staticmethod
+    def _get_deps(nodes: List, idx: int, needed: Set[int]) -> Set[int]:
+        if nodes[idx].cached:
+            return set()
+        return set(inp[0] for inp in nodes[idx].inputs if inp[0] in needed)
+
+    def _timed(self, execute: Callable[[int], None], idx: int, start: float):
+        phase_start = time.time() - start
+        execute(idx)
+        self.timings[idx] = (phase_start, time.time() - start)
+
+    def _print_report(
+        self, nodes: List, deps: Dict[int, Set[int]], total: float
+    ) -> None:
+        if len(self.timings) == 0:
+            return
+        # Longest chain of dependent phases, weighted by the phase durations
+        path_time, path_prev = {}, {}
+        for idx in sorted(deps):
+            prev = max(deps[idx], key=lambda d: path_time[d], default=None)
+            path_prev[idx] = prev
+            duration = self.timings[idx][1] - self.timings[idx][0]
+            path_time[idx] = duration + (0.0 if prev is None else path_time[prev])
+        last = max(path_time, key=lambda d: path_time[d])
+        critical = []
+        while last is not None:
+            critical.append(last)
+            last = path_prev[last]
+        critical.reverse()
+
+        print(f"Schedule report, {self.num_cores} cores")
+        for idx in sorted(deps):
+            phase_start, phase_end = self.timings[idx]
+            marker = "*" if idx in critical else " "
+            print(
+                f"{marker} {nodes[idx].phase.name}: {phase_start:.2f}s - {phase_end:.2f}s, "
+                f"took {phase_end - phase_start:.2f}s"
+            )
+        critical_names = " -> ".join(nodes[idx].phase.name for idx in critical)
+        print(
+            f"Critical path: {critical_names}, {path_time[critical[-1]]:.2f}s of {total:.2f}s total"
+        )
+        print("")
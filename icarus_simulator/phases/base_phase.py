@@ -8,16 +8,19 @@ The _compute() method, which accepts any parameter in any number, contains the c
     _compute() is intended as a skeleton, where interchangeable steps are determined by BaseStrategy objects
 The methods name() and strategies() are used by IcarusSimulator to manage inter-phase dependencies and filenames.
 Moreover, this base class provides some basic logs and the resultfile dumping logic.
+Results holding array-backed outputs are persisted in the memory-mapped columnar format, see result_store.py.
+The input values are passed lazily, so that upstream results are not loaded when the result file can be read.
+Phases whose result depends on the simulated time (e.g. LSNPhase) set time_variant, and implement at_epoch_offset(),
+which is used by the time-series mode of IcarusSimulator to create the phase of each snapshot.
 
 For an extension example, see any provided phase class. All files in this directory are library-provided phases.
 """
-import os
 import time
 
 from abc import abstractmethod
-from typing import List, Any, Tuple
-from compress_pickle import compress_pickle
+from typing import List, Any, Tuple, Callable
 
+from icarus_simulator.result_store import result_exists, load_result, dump_result
 from icarus_simulator.strategies.base_strat import BaseStrat
 from icarus_simulator.structure_definitions import Pname
 
@@ -45,6 +48,14 @@ class BasePhase:
     def _strategies(self) -> List[BaseStrat]:
         raise NotImplementedError
 
+    @property
+    def time_variant(self) -> bool:
+        return False
+
+    def at_epoch_offset(self, offset: float) -> "BasePhase":
+        # Copy of the phase for a snapshot at the given epoch offset in seconds, only for time-variant phases
+        raise NotImplementedError
+
     @abstractmethod
     def _compute(self, *args) -> Tuple:
         # Compute the result here, and always return a tuple, even if it has just one element in it!
@@ -62,20 +73,21 @@ class BasePhase:
             self.name + "(" + "".join([st.description for st in self._strategies]) + ")"
         )
 
-    def execute_phase(self, input_values: List[Any], fname: str):
+    def execute_phase(self, get_input_values: Callable[[], List[Any]], fname: str):
+        # Inputs are requested through get_input_values only if the result must be computed
         print(f"{self.name} phase")
         start = time.time()
         read = True
         # If a results file is present, read it. Else, compute the result.
-        if self.read_persist and os.path.isfile(fname):
+        if self.read_persist and result_exists(fname):
             print(f"{self.name} reading")
-            result = compress_pickle.load(
-                fname, compression="bz2", set_default_extension=False
-            )
+            result = load_result(fname)
             print(f"{self.name} read in {time.time() - start}")
         else:
             read = False
+            input_values = get_input_values()
             print(f"{self.name} computing")
+            start = time.time()
             assert len(input_values) == len(self.input_properties)
             result = self._compute(*input_values)
             assert len(result) == len(self.output_properties)
@@ -87,9 +99,7 @@ class BasePhase:
         # If the data has been computed and should be persisted, save it to file
         if self.persist and not read:
             st = time.time()
-            compress_pickle.dump(
-                result, fname, compression="bz2", set_default_extension=False
-            )
+            dump_result(result, fname)
             print(f"{self.name} write: {time.time() - st}")
         print(f"{self.name} finished in {time.time() - start}")
         print("")
@@ -43,12 +43,14 @@ class CoveragePhase(BasePhase):
     def _compute(self, grid_pos: GridPos, sat_pos: SatPos) -> Tuple[GridPos, Coverage]:
         # Compute the coverage
         coverage = self.cov_strat.compute(grid_pos, sat_pos)
-        # Optimise coverage and grid by removing the uncovered points
+        # Optimise coverage and grid by removing the uncovered points. The input grid is shared, and is not modified
         gplen = len(grid_pos)
-        uncovered_gnds = [gnd for gnd in coverage if len(coverage[gnd].keys()) == 0]
+        uncovered_gnds = set(gnd for gnd in coverage if len(coverage[gnd].keys()) == 0)
         for gnd in uncovered_gnds:
             del coverage[gnd]
-            del grid_pos[gnd]
+        grid_pos = grid_pos.filter(
+            [gnd not in uncovered_gnds for gnd in grid_pos.ids.tolist()]
+        )
         print(f"Earth grid size reduced from {gplen} to {len(grid_pos)}")
         return grid_pos, coverage
 
@@ -48,10 +48,7 @@ class GridPhase(BasePhase):
 
     def _check_result(self, result: Tuple[GridPos, int]) -> None:
         gp, full_length = result
-        for idx in [0, 1]:
-            if idx in gp:
-                gp[full_length + idx] = gp[idx]
-                del gp[idx]
+        gp.relabel({idx: full_length + idx for idx in [0, 1]})
 
         for idx in gp:
             assert idx > 1
@@ -26,6 +26,7 @@ from icarus_simulator.structure_definitions import (
     Edge,
     AttackInfo,
     AttackData,
+    AttackContext,
 )
 
 
@@ -45,10 +46,13 @@ class LinkAttackPhase(BasePhase):
         edges_in: Pname,
         bw_in: Pname,
         latk_out: Pname,
+        group_size: int = 1,
     ):
         super().__init__(read_persist, persist)
         self.num_procs = num_procs
         self.num_batches = num_batches
+        # Number of targets whose feasibility problems are prepared together
+        self.group_size = group_size
         self.geo_constr_strat: BaseGeoConstraintStrat = geo_constr_strat
         self.filter_strat: BasePathFilteringStrat = filter_strat
         self.feas_strat: BaseFeasStrat = feas_strat
@@ -84,9 +88,11 @@ class LinkAttackPhase(BasePhase):
         edge_data: EdgeData,
         bw_data: BwData,
     ) -> Tuple[AttackData]:
-        # Elaborate a list of the edges to be attacked
-        edges = list(bw_data.keys())
+        # Elaborate a list of the edges to be attacked, in groups of neighboring edges
+        edges = group_targets(list(bw_data.keys()), self.group_size)
         allowed_sources = self.geo_constr_strat.compute(grid_pos)
+        atk_ctx = AttackContext.from_bw_data(bw_data)
+        self.filter_strat.prepare(edge_data, path_data)  # Before forking the workers
         # Start a multithreaded computation
         multi = AttackMultiproc(
             self.num_procs,
@@ -98,20 +104,30 @@ class LinkAttackPhase(BasePhase):
                 self.optim_strat,
                 path_data,
                 edge_data,
-                bw_data,
+                atk_ctx,
                 allowed_sources,
             ),
         )
         ret_tuple = (multi.process_batches(),)  # It must be a tuple!
+        self.filter_strat.release()
         return ret_tuple
 
     def _check_result(self, result: Tuple[AttackData]) -> None:
         return
 
 
+def group_targets(edges: List[Edge], group_size: int) -> List[Tuple[Edge, ...]]:
+    # Edges of the same satellite share most of their directions: sort them by satellite, and split in groups
+    assert group_size > 0
+    if group_size == 1:  # Nothing to share, keep the order of the edges
+        return [(edge,) for edge in edges]
+    edges = sorted(edges, key=lambda e: (e[0] if e[0] != -1 else e[1], e))
+    return [tuple(edges[i : i + group_size]) for i in range(0, len(edges), group_size)]
+
+
 class AttackMultiproc(Multiprocessor):
     def _single_sample_process(
-        self, sample: Edge, process_result: AttackData, params: Tuple
+        self, sample: Tuple[Edge, ...], process_result: AttackData, params: Tuple
     ) -> None:
         filter_strat: BasePathFilteringStrat
         feas_strat: BaseFeasStrat
@@ -122,37 +138,46 @@ class AttackMultiproc(Multiprocessor):
             optim_strat,
             path_data,
             edge_data,
-            bw_data,
+            atk_ctx,
             allowed_sources,
         ) = params
-        # This method computes the attack phases.
+        # This method computes the attack phases, for a group of targets.
         # A1 is comprised of all the previously done work until here.
         # A2 is instead irrelevant as there is no bneck choice.
         # A3: path filtering
-        direction_data = filter_strat.compute(
-            [sample], edge_data, path_data, allowed_sources
-        )
+        targets = [[edge] for edge in sample]
+        direction_datas = [
+            filter_strat.compute(target, edge_data, path_data, allowed_sources)
+            for target in targets
+        ]
 
-        # A4: feasibility check
-        uplink_size = max(
-            bw_data[ed].capacity for ed in bw_data if ed[0] == -1
-        )  # Max in case of weird bw assignments
-        atk_flow_set, on_trg, detect = feas_strat.compute(
-            [sample], path_data, bw_data, direction_data, uplink_size
-        )
-        if atk_flow_set is None:
-            process_result[sample] = None
-            return
-
-        # A5: iterative optimisation
-        # We firstly need the maximum increase value possible, that is maximum capacity of all uplinks
-        atk_flow_set, on_trg, detect = optim_strat.compute(
-            [sample], path_data, bw_data, direction_data, uplink_size, feas_strat
+        # The feasibility problems of the group are built together, to share the construction work
+        problems = feas_strat.prepare_batch(
+            targets, path_data, atk_ctx, direction_datas
         )
+        for target, direction_data, problem in zip(targets, direction_datas, problems):
+            # A4: feasibility check
+            uplink_size = atk_ctx.uplink_size
+            atk_flow_set, on_trg, detect = problem.solve(uplink_size)
+            if atk_flow_set is None:
+                process_result[target[0]] = None
+                continue
 
-        process_result[sample] = AttackInfo(
-            cost=sum([el[1] for el in atk_flow_set]),
-            detectability=detect,
-            flows_on_trg=on_trg,
-            atkflowset=atk_flow_set,
-        )
+            # A5: iterative optimisation
+            # We firstly need the maximum increase value possible, that is maximum capacity of all uplinks
+            atk_flow_set, on_trg, detect = optim_strat.compute(
+                target,
+                path_data,
+                atk_ctx,
+                direction_data,
+                uplink_size,
+                feas_strat,
+                problem,
+            )
+
+            process_result[target[0]] = AttackInfo(
+                cost=sum([el[1] for el in atk_flow_set]),
+                detectability=detect,
+                flows_on_trg=on_trg,
+                atkflowset=atk_flow_set,
+            )
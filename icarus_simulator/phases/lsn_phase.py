@@ -1,12 +1,13 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
 
+import copy
 import networkx as nx
 from typing import Tuple, List
 
 from icarus_simulator.phases.base_phase import BasePhase
 from icarus_simulator.strategies.lsn.base_lsn_strat import BaseLSNStrat
 from icarus_simulator.strategies.base_strat import BaseStrat
-from icarus_simulator.structure_definitions import SatPos, Pname, IslInfo
+from icarus_simulator.structure_definitions import SatPos, Pname, Isls
 
 
 class LSNPhase(BasePhase):
@@ -39,7 +40,16 @@ class LSNPhase(BasePhase):
     def name(self) -> str:
         return "LSN"
 
-    def _compute(self) -> Tuple[SatPos, nx.Graph, List[IslInfo]]:
+    @property
+    def time_variant(self) -> bool:
+        return True
+
+    def at_epoch_offset(self, offset: float) -> "LSNPhase":
+        phase = copy.copy(self)
+        phase.lsn_strat = self.lsn_strat.at_epoch_offset(offset)
+        return phase
+
+    def _compute(self) -> Tuple[SatPos, nx.Graph, Isls]:
         # Call the strategy to generate the network
         sat_pos, nw, isls = self.lsn_strat.compute()
         return sat_pos, nw, isls
@@ -1,5 +1,7 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
 
+import numpy as np
+
 from typing import List, Tuple
 
 from icarus_simulator.phases.base_phase import BasePhase
@@ -66,6 +68,5 @@ class TrafficPhase(BasePhase):
 
     def _check_result(self, result: Tuple[BwData]) -> None:
         bw_data = result[0]
-        for bd in bw_data.values():
-            assert bd.idle_bw <= bd.capacity
+        assert np.all(bw_data.idle_bw <= bw_data.capacity)
         return
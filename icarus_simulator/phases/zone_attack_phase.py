@@ -1,8 +1,9 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
 
 import itertools
+import numpy as np
+
 from typing import List, Tuple
-from geopy.distance import great_circle
 
 from icarus_simulator.phases.base_phase import BasePhase
 from icarus_simulator.strategies.base_strat import BaseStrat
@@ -35,6 +36,7 @@ from icarus_simulator.structure_definitions import (
     GridPos,
     Pname,
     BwData,
+    AttackContext,
     PathData,
     EdgeData,
     AttackData,
@@ -42,7 +44,7 @@ from icarus_simulator.structure_definitions import (
     PathEdgeData,
     ZoneAttackInfo,
 )
-from icarus_simulator.utils import get_ordered_idx, get_edges
+from icarus_simulator.utils import get_ordered_idx, get_edges, great_circle_dists
 
 
 class ZoneAttackPhase(BasePhase):
@@ -115,6 +117,10 @@ class ZoneAttackPhase(BasePhase):
         atk_data: AttackData,
     ) -> Tuple[AttackData]:
         allowed_sources = self.geo_constr_strat.compute(grid_pos)
+        atk_ctx = AttackContext.from_bw_data(bw_data)
+        self.filter_strat.prepare(edge_data, path_data)  # Before forking the workers
+        self.build_strat.prepare(grid_pos)
+        grid_units = grid_pos.unit_vectors()  # For the distances between the zones
         # Select the centres of the zones to be disconnected
         zone_pairs = self.select_strat.compute(grid_pos)
         # Start a multithreaded computation
@@ -130,8 +136,9 @@ class ZoneAttackPhase(BasePhase):
                 self.feas_strat,
                 self.optim_strat,
                 grid_pos,
+                grid_units,
                 path_data,
-                bw_data,
+                atk_ctx,
                 edge_data,
                 atk_data,
                 allowed_sources,
@@ -139,6 +146,8 @@ class ZoneAttackPhase(BasePhase):
             verbose=True,
         )
         ret_tuple = (multi.process_batches(),)  # It must be a tuple!
+        self.filter_strat.release()
+        self.build_strat.release()
         return ret_tuple
 
     def _check_result(self, result: Tuple[AttackData]) -> None:
@@ -156,8 +165,9 @@ class ZoneAttackMultiproc(Multiprocessor):
         feas_strat: BaseFeasStrat
         optim_strat: BaseOptimStrat
         grid_pos: GridPos
+        grid_units: np.ndarray
         path_data: PathData
-        bw_data: BwData
+        atk_ctx: AttackContext
         edge_data: EdgeData
         atk_data: AttackData
         (
@@ -168,8 +178,9 @@ class ZoneAttackMultiproc(Multiprocessor):
             feas_strat,
             optim_strat,
             grid_pos,
+            grid_units,
             path_data,
-            bw_data,
+            atk_ctx,
             edge_data,
             atk_data,
             allowed_sources,
@@ -185,13 +196,10 @@ class ZoneAttackMultiproc(Multiprocessor):
             return
 
         # Find the minimum distance and all (desirable by routing phase) paths between zones
-        min_dist = min(
-            great_circle(
-                (grid_pos[idx1].lat, grid_pos[idx1].lon),
-                (grid_pos[idx2].lat, grid_pos[idx2].lon),
-            ).meters
-            for idx1 in zone1
-            for idx2 in zone2
+        min_dist = float(
+            great_circle_dists(
+                grid_units[grid_pos.rows(zone1)], grid_units[grid_pos.rows(zone2)]
+            ).min()
         )
         cross_zone_paths = compute_zone_crossing_paths(zone1, zone2, path_data)
 
@@ -213,11 +221,9 @@ class ZoneAttackMultiproc(Multiprocessor):
             return
 
         # Compute the possible heuristically-determined bottlenecks and check which one is the best
-        uplink_size = max(
-            bw_data[ed].capacity for ed in bw_data if ed[0] == -1
-        )  # Max in case of weird bw assignments
+        uplink_size = atk_ctx.uplink_size
         possible_bnecks = bneck_strat.compute(
-            bw_data, atk_data, path_edges, len(cross_zone_paths)
+            atk_ctx, atk_data, path_edges, len(cross_zone_paths)
         )
         best_atk_flow_set, best_on_trg, best_detect, best_bneck = (
             None,
@@ -232,7 +238,7 @@ class ZoneAttackMultiproc(Multiprocessor):
 
             # A4: feasibility check
             atk_flow_set, on_trg, detect = feas_strat.compute(
-                bneck, path_data, bw_data, direction_data, uplink_size
+                bneck, path_data, atk_ctx, direction_data, uplink_size
             )
             if atk_flow_set is None:
                 continue
@@ -240,7 +246,7 @@ class ZoneAttackMultiproc(Multiprocessor):
             # A5: iterative optimisation
             # We firstly need the maximum increase value possible, that is maximum capacity of all uplinks
             atk_flow_set, on_trg, detect = optim_strat.compute(
-                bneck, path_data, bw_data, direction_data, uplink_size, feas_strat
+                bneck, path_data, atk_ctx, direction_data, uplink_size, feas_strat
             )
             # Deterministic allocation, therefore cost = on_trg
             if detect < best_detect or (detect == best_detect and on_trg < best_on_trg):
@@ -0,0 +1,224 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+"""
+Content-addressed cache for the phase result files, used by IcarusSimulator.
+
+Each phase result is identified by a key, the stable hash of the phase description (phase name and strategy
+parameters) and of the keys of all the upstream results the phase consumes. The result file name only contains the
+phase name and the key, so that names do not grow with the pipeline depth.
+A small sqlite index in the results directory maps each key to the human-readable description of the whole upstream
+computation, and records size, checksum and last access time of each result. This makes it possible to detect
+corrupted files, and to evict the least recently used results when the directory grows too large.
+
+The eviction can be run from the command line, e.g. to shrink the results directory to 50GB:
+    python -m icarus_simulator.result_cache result_dumps --max-size 50G
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+
+from contextlib import contextmanager
+from typing import Iterable, Optional, List, Tuple, Iterator
+
+from icarus_simulator.result_store import (
+    columnar_dirname,
+    remove_result,
+    series_member,
+    split_member,
+    read_member_bytes,
+    SERIES_EXT,
+)
+
+INDEX_FNAME = "index.sqlite"
+SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+class ResultCache:
+    def __init__(self, directory: str, verify: bool = False):
+        self.directory = directory
+        self.verify = (
+            verify  # If True, validate the full checksum and not only the size
+        )
+        os.makedirs(directory, exist_ok=True)
+        with self._index() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, fname TEXT NOT NULL, "
+                "description TEXT NOT NULL, size INTEGER NOT NULL, checksum TEXT NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def compute_key(phase_description: str, upstream_keys: Iterable[str]) -> str:
+        content = json.dumps(
+            {"phase": phase_description, "upstream": sorted(set(upstream_keys))}
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str, phase_name: str) -> str:
+        return os.path.join(self.directory, f"{phase_name}-{key}.pkl.bz2")
+
+    def series_path_for(self, series_key: str, phase_name: str, offset: float) -> str:
+        # Member of the time-indexed dataset of a phase, see result_store.py
+        dataset_fname = os.path.join(
+            self.directory, f"{phase_name}-{series_key}{SERIES_EXT}"
+        )
+        return series_member(dataset_fname, offset)
+
+    def validate(self, key: str, fname: str) -> bool:
+        # Check the result file against the index. Corrupted files are deleted, so that the phase recomputes them.
+        size, checksum = _measure(fname, self.verify)
+        entry = self._get_entry(key)
+        if size is None:
+            if entry is not None:  # The file was deleted by hand
+                self._delete_entry(key)
+            return False
+        if (
+            entry is None
+        ):  # Result written outside of the index: the dump is atomic, so adopt it
+            return True
+        if size != entry[3] or (self.verify and checksum != entry[4]):
+            print(f"Corrupted result {fname}, removing it")
+            remove_result(fname)
+            self._delete_entry(key)
+            return False
+        return True
+
+    def register(self, key: str, fname: str, description: str, written: bool) -> None:
+        # Record a result after it was read or written, updating its access time
+        now = time.time()
+        entry = self._get_entry(key)
+        if not written and entry is not None and entry[1] == fname:
+            size, _ = _measure(fname, False)
+            if size == entry[3]:
+                with self._index() as conn:
+                    conn.execute(
+                        "UPDATE results SET last_access = ? WHERE key = ?", (now, key)
+                    )
+                return
+        size, checksum = _measure(fname, True)
+        if size is None:  # The result was not persisted
+            return
+        with self._index() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, fname, description, size, checksum, now, now),
+            )
+
+    def entries(self) -> List[Tuple]:
+        # (key, fname, description, size, checksum, created, last_access), least recently used first
+        with self._index() as conn:
+            return conn.execute(
+                "SELECT * FROM results ORDER BY last_access ASC"
+            ).fetchall()
+
+    def total_size(self) -> int:
+        return sum(entry[3] for entry in self.entries())
+
+    def evict(
+        self, max_size: Optional[int] = None, max_idle_days: Optional[float] = None
+    ) -> List[str]:
+        # Remove the least recently used results until the directory is below max_size bytes, and all the results
+        # not accessed in the last max_idle_days. Returns the descriptions of the evicted results.
+        entries = self.entries()
+        total = sum(entry[3] for entry in entries)
+        min_access = None
+        if max_idle_days is not None:
+            min_access = time.time() - max_idle_days * 86400
+        evicted = []
+        for key, fname, description, size, _, _, last_access in entries:
+            too_big = max_size is not None and total > max_size
+            too_old = min_access is not None and last_access < min_access
+            if not too_big and not too_old:
+                continue
+            remove_result(fname)
+            self._delete_entry(key)
+            total -= size
+            evicted.append(description)
+        return evicted
+
+    @contextmanager
+    def _index(self) -> Iterator[sqlite3.Connection]:
+        # A new connection for each operation, so that the cache can be used from multiple threads
+        conn = sqlite3.connect(os.path.join(self.directory, INDEX_FNAME), timeout=60)
+        try:
+            with conn:  # Commits, or rolls back on exceptions
+                yield conn
+        finally:
+            conn.close()
+
+    def _get_entry(self, key: str) -> Optional[Tuple]:
+        with self._index() as conn:
+            return conn.execute(
+                "SELECT * FROM results WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _delete_entry(self, key: str) -> None:
+        with self._index() as conn:
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+
+
+def _measure(fname: str, with_checksum: bool) -> Tuple[Optional[int], Optional[str]]:
+    # Size and sha256 of a result, in any of the result formats
+    if split_member(fname)[1] is not None:
+        data = read_member_bytes(fname)
+        if data is None:
+            return None, None
+        return len(data), hashlib.sha256(data).hexdigest() if with_checksum else None
+    dirname = columnar_dirname(fname)
+    if os.path.isdir(dirname):
+        paths = [os.path.join(dirname, f) for f in sorted(os.listdir(dirname))]
+    elif os.path.isfile(fname):
+        paths = [fname]
+    else:
+        return None, None
+    size = sum(os.path.getsize(p) for p in paths)
+    if not with_checksum:
+        return size, None
+    sha = hashlib.sha256()
+    for p in paths:
+        with open(p, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+    return size, sha.hexdigest()
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().upper().rstrip("B")
+    if size and size[-1] in SIZE_UNITS:
+        return int(float(size[:-1]) * SIZE_UNITS[size[-1]])
+    return int(size)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect and evict the cached results of the Icarus simulator."
+    )
+    parser.add_argument("directory", help="the results directory")
+    parser.add_argument(
+        "--max-size", help="evict LRU results above this size, e.g. 50G"
+    )
+    parser.add_argument(
+        "--max-idle-days", type=float, help="evict results not used for this long"
+    )
+    parser.add_argument("--list", action="store_true", help="list the cached results")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.directory)
+    if args.list:
+        for key, fname, description, size, _, _, last_access in cache.entries():
+            access = time.strftime("%Y-%m-%d %H:%M", time.localtime(last_access))
+            print(
+                f"{key[:12]}  {size / SIZE_UNITS['M']:10.1f}MB  {access}  {description}"
+            )
+    if args.max_size is not None or args.max_idle_days is not None:
+        max_size = None if args.max_size is None else parse_size(args.max_size)
+        evicted = cache.evict(max_size, args.max_idle_days)
+        for description in evicted:
+            print(f"Evicted {description}")
+        print(f"Evicted {len(evicted)} results, {cache.total_size()} bytes left")
+
+
+if __name__ == "__main__":
+    main()
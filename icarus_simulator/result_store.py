@@ -0,0 +1,237 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+"""
+Persistence logic for the phase results, used by BasePhase to dump and read the result files.
+
+Two on-disk formats are supported:
+    - a single bz2-compressed pickle file, used when the result only contains generic python structures;
+    - a columnar directory, used when at least one of the outputs is array-backed. Every array-backed output is
+      written as raw .npy files, one per column, and a manifest describes how to rebuild the result tuple. Outputs
+      that are not array-backed are pickled individually inside the same directory.
+When a columnar result is read, the arrays are memory-mapped (np.load with mmap_mode="r") instead of unpickled.
+Following phases and plots can therefore start immediately, and only touch the pages they actually need.
+Note that memory-mapped columns are read-only: code that modifies a loaded property must copy the arrays first.
+
+An output is array-backed if it is a numpy array, or if it extends ColumnarProperty.
+
+Results of a time-series simulation can instead be stored as members of a time-indexed dataset: a single sqlite file,
+which holds the bz2-compressed pickle of every snapshot, indexed by the epoch offset in seconds. A member is identified
+by the file name returned by series_member(), which can be passed to all the functions of this module.
+"""
+import os
+import bz2
+import json
+import pickle
+import shutil
+import sqlite3
+import importlib
+import numpy as np
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Tuple, Any, Optional, Iterator
+from compress_pickle import compress_pickle
+
+PICKLE_EXT = ".pkl.bz2"
+COLUMNAR_EXT = ".cols"
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+SERIES_EXT = ".series.sqlite"
+MEMBER_SEP = "::"
+
+
+class ColumnarProperty(ABC):
+    """
+    Interface for the properties that can be stored as a set of named numpy columns.
+    Columns must not have the object dtype. Scalar attributes can be stored as 0-dimensional arrays.
+    """
+
+    @abstractmethod
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    @classmethod
+    @abstractmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "ColumnarProperty":
+        raise NotImplementedError
+
+
+def columnar_dirname(fname: str) -> str:
+    if fname.endswith(PICKLE_EXT):
+        fname = fname[: -len(PICKLE_EXT)]
+    return fname + COLUMNAR_EXT
+
+
+def series_member(dataset_fname: str, offset: float) -> str:
+    return f"{dataset_fname}{MEMBER_SEP}{float(offset)!r}"
+
+
+def split_member(fname: str) -> Tuple[str, Optional[float]]:
+    # Returns the dataset file name and the epoch offset, or the file name and None if it is not a series member
+    if MEMBER_SEP not in fname:
+        return fname, None
+    dataset_fname, offset = fname.rsplit(MEMBER_SEP, 1)
+    return dataset_fname, float(offset)
+
+
+def read_member_bytes(fname: str) -> Optional[bytes]:
+    dataset_fname, offset = split_member(fname)
+    if not os.path.isfile(dataset_fname):
+        return None
+    with _series_db(dataset_fname) as conn:
+        row = conn.execute(
+            "SELECT data FROM snapshots WHERE offset = ?", (offset,)
+        ).fetchone()
+    return None if row is None else row[0]
+
+
+def load_series(dataset_fname: str) -> Dict[float, Tuple]:
+    # Read all the snapshots of a time-indexed dataset, ordered by epoch offset
+    with _series_db(dataset_fname) as conn:
+        rows = conn.execute("SELECT offset, data FROM snapshots ORDER BY offset")
+        return {offset: pickle.loads(bz2.decompress(data)) for offset, data in rows}
+
+
+def is_array_backed(value: Any) -> bool:
+    if isinstance(value, ColumnarProperty):
+        return True
+    return isinstance(value, np.ndarray) and value.dtype != object
+
+
+def result_exists(fname: str) -> bool:
+    if split_member(fname)[1] is not None:
+        return read_member_bytes(fname) is not None
+    manifest = os.path.join(columnar_dirname(fname), MANIFEST)
+    return os.path.isfile(manifest) or os.path.isfile(fname)
+
+
+def remove_result(fname: str) -> None:
+    dataset_fname, offset = split_member(fname)
+    if offset is not None:
+        if os.path.isfile(dataset_fname):
+            with _series_db(dataset_fname) as conn:
+                conn.execute("DELETE FROM snapshots WHERE offset = ?", (offset,))
+        return
+    dirname = columnar_dirname(fname)
+    if os.path.isdir(dirname):
+        shutil.rmtree(dirname)
+    if os.path.isfile(fname):
+        os.remove(fname)
+
+
+def dump_result(result: Tuple, fname: str) -> None:
+    # Series members are written in a single transaction, and are therefore never truncated
+    dataset_fname, offset = split_member(fname)
+    if offset is not None:
+        data = bz2.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        with _series_db(dataset_fname) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?)", (offset, data)
+            )
+        return
+
+    # Generic results keep the single-file format. Dump to a temporary file, so that the result is never truncated
+    if not any(is_array_backed(val) for val in result):
+        compress_pickle.dump(
+            result, fname + ".tmp", compression="bz2", set_default_extension=False
+        )
+        remove_result(fname)
+        os.replace(fname + ".tmp", fname)
+        return
+
+    # Write to a temporary directory first, so that an interrupted dump never looks like a valid result
+    dirname = columnar_dirname(fname)
+    tmp_dirname = dirname + ".tmp"
+    if os.path.isdir(tmp_dirname):
+        shutil.rmtree(tmp_dirname)
+    os.makedirs(tmp_dirname)
+    outputs = []
+    for idx, val in enumerate(result):
+        if isinstance(val, ColumnarProperty):
+            cls = type(val)
+            columns = {}
+            for col_name, col in val.to_columns().items():
+                col_fname = f"{idx}-{col_name}.npy"
+                np.save(os.path.join(tmp_dirname, col_fname), np.asarray(col))
+                columns[col_name] = col_fname
+            outputs.append(
+                {
+                    "kind": "columns",
+                    "class": f"{cls.__module__}:{cls.__qualname__}",
+                    "columns": columns,
+                }
+            )
+        elif is_array_backed(val):
+            arr_fname = f"{idx}.npy"
+            np.save(os.path.join(tmp_dirname, arr_fname), val)
+            outputs.append({"kind": "array", "file": arr_fname})
+        else:
+            pkl_fname = f"{idx}{PICKLE_EXT}"
+            compress_pickle.dump(
+                val,
+                os.path.join(tmp_dirname, pkl_fname),
+                compression="bz2",
+                set_default_extension=False,
+            )
+            outputs.append({"kind": "pickle", "file": pkl_fname})
+    with open(os.path.join(tmp_dirname, MANIFEST), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "outputs": outputs}, f, indent=1)
+
+    # Replace any previous version of the result, in both formats
+    remove_result(fname)
+    os.rename(tmp_dirname, dirname)
+
+
+def load_result(fname: str) -> Tuple:
+    if split_member(fname)[1] is not None:
+        return pickle.loads(bz2.decompress(read_member_bytes(fname)))
+    dirname = columnar_dirname(fname)
+    manifest_fname = os.path.join(dirname, MANIFEST)
+    if not os.path.isfile(manifest_fname):
+        return compress_pickle.load(
+            fname, compression="bz2", set_default_extension=False
+        )
+
+    with open(manifest_fname) as f:
+        manifest = json.load(f)
+    assert manifest["version"] == FORMAT_VERSION
+    result = []
+    for out in manifest["outputs"]:
+        if out["kind"] == "columns":
+            columns = {
+                col_name: np.load(os.path.join(dirname, col_fname), mmap_mode="r")
+                for col_name, col_fname in out["columns"].items()
+            }
+            result.append(_import_class(out["class"]).from_columns(columns))
+        elif out["kind"] == "array":
+            result.append(np.load(os.path.join(dirname, out["file"]), mmap_mode="r"))
+        else:
+            result.append(
+                compress_pickle.load(
+                    os.path.join(dirname, out["file"]),
+                    compression="bz2",
+                    set_default_extension=False,
+                )
+            )
+    return tuple(result)
+
+
+def _import_class(path: str) -> type:
+    module_name, qualname = path.split(":")
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+@contextmanager
+def _series_db(dataset_fname: str) -> Iterator[sqlite3.Connection]:
+    # A new connection for each operation, so that snapshots can be written from multiple threads
+    conn = sqlite3.connect(dataset_fname, timeout=60)
+    try:
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots (offset REAL PRIMARY KEY, data BLOB NOT NULL)"
+            )
+            yield conn
+    finally:
+        conn.close()
@@ -47,3 +47,26 @@ def geo2cart(geo_coord: GeodeticPosition) -> CartCoords:
 
     assert rad >= EARTH_RADIUS - 1000  # Allow for approximation error
     return cart
+
+
+def geo2cart_array(lat: np.ndarray, lon: np.ndarray, elev: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of geo2cart, converts arrays of {lat, long, elevation} points to cartesian (x, y, z).
+    Args:
+        lat: np.ndarray. Latitudes of the points, in degrees.
+        lon: np.ndarray. Longitudes of the points, in degrees.
+        elev: np.ndarray. Elevations of the points wrt Earth surface.
+
+    Returns:
+        np.ndarray: Array of shape (n, 3) of cartesian coordinates.
+    """
+    theta = np.deg2rad(np.asarray(lon, dtype=np.float64))
+    phi = np.deg2rad(90 - np.asarray(lat, dtype=np.float64))
+    r = np.asarray(elev, dtype=np.float64) + EARTH_RADIUS
+    x = r * np.sin(phi) * np.cos(theta)
+    y = r * np.sin(phi) * np.sin(theta)
+    z = r * np.cos(phi)
+    cart = np.stack((x, y, z), axis=-1)
+
+    assert np.all(np.sqrt(np.sum(np.square(cart), axis=-1)) >= EARTH_RADIUS - 1000)
+    return cart
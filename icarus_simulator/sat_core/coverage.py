@@ -1,7 +1,7 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
 
 
-from typing import Dict, Tuple
+from typing import Dict, Tuple, List
 import pandas as pd
 import networkx as nx
 import numpy as np
@@ -81,26 +81,52 @@ def positions_satellite_coverage(
 
     Returns: All the distances {ground_idx:{sat_idx: dist}}
     """
-    all_dist = {idx: {} for idx in grid_pos}
-    # The dictionary format we use conflicts with this algorithm's format -> index map
-    # Put grid points into a KD-tree
-    index, id_map, grid_cart = 0, {}, np.zeros((len(grid_pos), 3))
-    for grid_id in grid_pos:
-        id_map[index] = grid_id  # map indices to sat indices
+    grid_ids = list(grid_pos.keys())
+    grid_cart = np.zeros((len(grid_pos), 3))
+    for index, grid_id in enumerate(grid_ids):
         grid_cart[index] = geo2cart(grid_pos[grid_id])
-        index += 1
+    sat_ids = list(sat_pos.keys())
+    sat_cart = np.zeros((len(sat_pos), 3))
+    for index, sat_id in enumerate(sat_ids):
+        sat_cart[index] = geo2cart(sat_pos[sat_id])
+    sat_elev = np.array([sat_pos[sat_id]["elev"] for sat_id in sat_ids])
+    return cart_satellite_coverage(
+        grid_ids, grid_cart, sat_ids, sat_cart, sat_elev, min_elev_angle
+    )
+
+
+def cart_satellite_coverage(
+    grid_ids: List[int],
+    grid_cart: np.ndarray,
+    sat_ids: List[int],
+    sat_cart: np.ndarray,
+    sat_elev: np.ndarray,
+    min_elev_angle: int,
+) -> Dict[int, Dict[int, float]]:
+    """
+    Same as positions_satellite_coverage, with the positions already converted to cartesian coordinates.
+    Args:
+    grid_ids: List of ints. Indices of the points in the ground grid
+    grid_cart: np.ndarray of shape (len(grid_ids), 3). Cartesian positions of the points in the ground grid
+    sat_ids: List of ints. Indices of the satellites
+    sat_cart: np.ndarray of shape (len(sat_ids), 3). Cartesian positions of the satellites
+    sat_elev: np.ndarray of shape (len(sat_ids),). Elevations of the satellites
+    min_elev_angle: Minimum elevation angle of the satellites
+
+    Returns: All the distances {ground_idx:{sat_idx: dist}}
+    """
+    all_dist = {idx: {} for idx in grid_ids}
+    # Put grid points into a KD-tree, the tree indices are the positions in grid_ids
     kd = KDTree(grid_cart)
 
-    # Query all the satellites using the max_dist
-    for sat_idx, sat in sat_pos.items():
-        max_dist = max_ground_sat_dist(sat["elev"], min_elev_angle)
-        covered_grid_ids, distances = kd.query_radius(
-            [geo2cart(sat)], r=max_dist, count_only=False, return_distance=True
-        )
-        covered_grid_ids = covered_grid_ids[0]
-        distances = distances[0]
+    # Query all the satellites at once, each with its own max_dist
+    max_dists = max_ground_sat_dist(np.asarray(sat_elev), min_elev_angle)
+    covered, distances = kd.query_radius(
+        sat_cart, r=max_dists, count_only=False, return_distance=True
+    )
+    for sat_idx, sat_covered, sat_distances in zip(sat_ids, covered, distances):
         # Convert all the indices back
-        for i in range(len(distances)):
-            grid_idx = id_map[covered_grid_ids[i]]
-            all_dist[grid_idx][sat_idx] = distances[i]
+        for i in range(len(sat_distances)):
+            grid_idx = grid_ids[sat_covered[i]]
+            all_dist[grid_idx][sat_idx] = sat_distances[i]
     return all_dist
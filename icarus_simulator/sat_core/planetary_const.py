@@ -5,6 +5,8 @@ from scipy.constants import G
 
 # Average great-circle radius in meters.
 EARTH_RADIUS = 6371 * 1000
+# Mean earth radius in meters used for the great-circle distances, as in geopy.
+GREAT_CIRCLE_RADIUS = 6371.009 * 1000
 # Average duration of a day in seconds.
 SEC_IN_DAY = 86400
 # Earth mass
@@ -11,11 +11,12 @@ from icarus_simulator.structure_definitions import (
     PathData,
     Edge,
     DirectionData,
-    BwData,
+    AttackContext,
     AtkFlowSet,
 )
 from icarus_simulator.strategies.atk_feasibility_check.base_feas_strat import (
     BaseFeasStrat,
+    FeasProblem,
 )
 from icarus_simulator.strategies.base_strat import BaseStrat
 
@@ -26,9 +27,11 @@ class BaseOptimStrat(BaseStrat):
         self,
         congest_edges: List[Edge],
         path_data: PathData,
-        bw_data: BwData,
+        atk_ctx: AttackContext,
         direction_data: DirectionData,
         uplink_max_val: int,
         feas_strat: BaseFeasStrat,
+        problem: Optional[FeasProblem] = None,
     ) -> Tuple[Optional[AtkFlowSet], int, int]:
+        # The feasibility problem of the target can be passed if already prepared, e.g. by prepare_batch
         raise NotImplementedError
@@ -7,15 +7,18 @@ from icarus_simulator.strategies.atk_detect_optimisation.base_optim_strat import
 )
 from icarus_simulator.strategies.atk_feasibility_check.base_feas_strat import (
     BaseFeasStrat,
+    FeasProblem,
 )
 from icarus_simulator.structure_definitions import (
     Edge,
     PathData,
     DirectionData,
-    BwData,
+    AttackContext,
     AtkFlowSet,
 )
 
+LP_TOL = 1e-6  # Tolerance on the lowest uplink bound found by the feasibility problem
+
 
 class BinSearchOptimStrat(BaseOptimStrat):
     def __init__(self, rate: float, **kwargs):
@@ -37,39 +40,50 @@ class BinSearchOptimStrat(BaseOptimStrat):
         self,
         congest_edges: List[Edge],
         path_data: PathData,
-        bw_data: BwData,
+        atk_ctx: AttackContext,
         direction_data: DirectionData,
         uplink_max_val: int,
         feas_strat: BaseFeasStrat,
+        problem: Optional[FeasProblem] = None,
     ) -> Tuple[Optional[AtkFlowSet], int, int]:
 
+        # The structure of the feasibility problem only depends on the target, only the uplink bound changes
+        if problem is None:
+            problem = feas_strat.prepare(
+                congest_edges, path_data, atk_ctx, direction_data
+            )
+
         # If the rate is 0, no optimisation is required
         if self.rate == 0.0:
-            return feas_strat.compute(
-                congest_edges, path_data, bw_data, direction_data, uplink_max_val
-            )
+            return problem.solve(uplink_max_val)
+
+        # If the feasibility strategy can solve for the lowest uplink bound directly, the search is not needed
+        min_val = problem.min_uplink_increase()
+        if min_val is not None:
+            final_val = min(max(int(ceil(min_val - LP_TOL)), 1), uplink_max_val)
+        else:
+            final_val = self._search(problem, uplink_max_val)
+
+        # Based on the optimisation rate chosen, re-run for the correct value
+        val_range = uplink_max_val - final_val
+        val_incr = int(
+            self.rate * val_range
+        )  # Taking floor here ensures that ceil is taken in next line
+        req_detect = uplink_max_val - val_incr
+        return problem.solve(req_detect)
 
+    @staticmethod
+    def _search(problem: FeasProblem, uplink_max_val: int) -> int:
         # Start a binary search algorithm to find the lowest increase constraint st the problem is feasible
         # Idea: left always infeasible, right always feasible, right is INCLUSIVE
         left, right = 0, uplink_max_val
         final_val = uplink_max_val
         while left != right - 1:
             half = left + int(ceil((right - left) / 2))
-            temp_atk_flow_set, _, _ = feas_strat.compute(
-                congest_edges, path_data, bw_data, direction_data, half
-            )
+            temp_atk_flow_set, _, _ = problem.solve(half)
             if temp_atk_flow_set is not None:  # If optimal
                 final_val = half
                 right = half
             else:  # If infeasible
                 left = half
-
-        # Based on the optimisation rate chosen, re-run for the correct value
-        val_range = uplink_max_val - final_val
-        val_incr = int(
-            self.rate * val_range
-        )  # Taking floor here ensures that ceil is taken in next line
-        req_detect = uplink_max_val - val_incr
-        return feas_strat.compute(
-            congest_edges, path_data, bw_data, direction_data, req_detect
-        )
+        return final_val
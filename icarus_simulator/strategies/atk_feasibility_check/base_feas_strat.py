@@ -12,7 +12,7 @@ from icarus_simulator.structure_definitions import (
     PathData,
     Edge,
     DirectionData,
-    BwData,
+    AttackContext,
     AtkFlowSet,
 )
 
@@ -23,8 +23,51 @@ class BaseFeasStrat(BaseStrat):
         self,
         congest_edges: List[Edge],
         path_data: PathData,
-        bw_data: BwData,
+        atk_ctx: AttackContext,
         direction_data: DirectionData,
         max_uplink_increase: int,
     ) -> Tuple[Optional[AtkFlowSet], int, int]:
         raise NotImplementedError
+
+    def prepare(
+        self,
+        congest_edges: List[Edge],
+        path_data: PathData,
+        atk_ctx: AttackContext,
+        direction_data: DirectionData,
+    ) -> "FeasProblem":
+        # Feasibility problem of a target, to be solved for different uplink bounds. Override to build it only once
+        return FeasProblem(self, congest_edges, path_data, atk_ctx, direction_data)
+
+    def prepare_batch(
+        self,
+        targets: List[List[Edge]],
+        path_data: PathData,
+        atk_ctx: AttackContext,
+        direction_datas: List[DirectionData],
+    ) -> List["FeasProblem"]:
+        # Feasibility problems of a group of targets. Override to share the construction work among the targets
+        return [
+            self.prepare(congest_edges, path_data, atk_ctx, direction_data)
+            for congest_edges, direction_data in zip(targets, direction_datas)
+        ]
+
+
+class FeasProblem:
+    def __init__(
+        self,
+        strat: BaseFeasStrat,
+        congest_edges: List[Edge],
+        path_data: PathData,
+        atk_ctx: AttackContext,
+        direction_data: DirectionData,
+    ):
+        self.strat = strat
+        self.args = (congest_edges, path_data, atk_ctx, direction_data)
+
+    def solve(self, max_uplink_increase: int) -> Tuple[Optional[AtkFlowSet], int, int]:
+        return self.strat.compute(*self.args, max_uplink_increase)
+
+    def min_uplink_increase(self) -> Optional[float]:
+        # The lowest uplink bound for which the problem is feasible, None if unknown
+        return None
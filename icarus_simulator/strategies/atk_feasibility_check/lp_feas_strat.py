@@ -1,25 +1,35 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
 import numpy as np
+import scipy.sparse as sp
+from itertools import chain
 from math import ceil
 from typing import List, Optional, Tuple
 
 from icarus_simulator.strategies.atk_feasibility_check.base_feas_strat import (
     BaseFeasStrat,
+    FeasProblem,
 )
 from icarus_simulator.structure_definitions import (
     Edge,
     PathData,
     DirectionData,
-    BwData,
+    AttackContext,
     AtkFlowSet,
-    PathEdgeData,
+    TuplePath,
 )
+from icarus_simulator.lp_solver import get_solver, SOLVERS
+from icarus_simulator.tables import segment_positions
 from icarus_simulator.utils import get_edges
 
+LP_TOL = 1e-6
 
+
+# The LP is solved by the backend named solver, see lp_solver.py. Gurobi needs a license, HiGHS needs scipy>=1.6.
 class LPFeasStrat(BaseFeasStrat):
-    def __init__(self, **kwargs):
+    def __init__(self, solver: str = "gurobi", **kwargs):
         super().__init__()
+        assert solver in SOLVERS
+        self.solver = solver
         if len(kwargs) > 0:
             pass  # Appease the unused param inspection
 
@@ -28,38 +38,128 @@ class LPFeasStrat(BaseFeasStrat):
         return "lp"
 
     @property
-    def param_description(self) -> None:
-        return None
+    def param_description(self) -> str:
+        return self.solver
 
     # Important note: this only works for single-target attacks!
     def compute(
         self,
         congest_edges: List[Edge],
         path_data: PathData,
-        bw_data: BwData,
+        atk_ctx: AttackContext,
         direction_data: DirectionData,
         max_uplink_increase: int,
     ) -> Tuple[Optional[AtkFlowSet], int, int]:
+        return self.prepare(congest_edges, path_data, atk_ctx, direction_data).solve(
+            max_uplink_increase
+        )
 
-        directions = list(direction_data.keys())
-
-        if len(directions) == 0:
-            return None, -1, -1
+    def prepare(
+        self,
+        congest_edges: List[Edge],
+        path_data: PathData,
+        atk_ctx: AttackContext,
+        direction_data: DirectionData,
+    ) -> FeasProblem:
+        return self.prepare_batch(
+            [congest_edges], path_data, atk_ctx, [direction_data]
+        )[0]
 
-        # Go through the edges and find out their coverage and their max bw
+    def prepare_batch(
+        self,
+        targets: List[List[Edge]],
+        path_data: PathData,
+        atk_ctx: AttackContext,
+        direction_datas: List[DirectionData],
+    ) -> List[FeasProblem]:
+        # The edges of the directions of all the targets are looked up at once, and the rows of each problem are then
+        # sliced from the shared arrays
         # IMPORTANT: take the sum of variables as total bw, and as objective, to avoid having pass-through directions
         # counted two times
-        direction_edges: PathEdgeData = {}
-        tot_needed = 0
-        for idx, p in enumerate(directions):
-            for ed in get_edges(p):
-                if ed not in direction_edges and ed not in congest_edges:
-                    direction_edges[ed] = set()
-                elif ed not in direction_edges and ed in congest_edges:
-                    tot_needed += bw_data[ed].get_remaining_bw()
-                    direction_edges[ed] = set()
-                direction_edges[ed].add(idx)
+        dir_lists = [list(direction_data.keys()) for direction_data in direction_datas]
+        all_dirs = list(chain.from_iterable(dir_lists))
+        dir_lens = np.array([len(p) for p in all_dirs], dtype=np.int64)
+        nodes = np.fromiter(
+            chain.from_iterable(all_dirs), dtype=np.int64, count=int(dir_lens.sum())
+        )
+        dir_hops = np.maximum(dir_lens - 1, 0)
+        hop_pos = segment_positions(np.cumsum(dir_lens) - dir_lens, dir_hops)
+        hop_edges = atk_ctx.edge_index.lookup(nodes[hop_pos], nodes[hop_pos + 1])
+
+        # Each hop is in the column of its direction, and in the row of its edge in the problem of its target.
+        # The rows follow the order in which the edges are first met along the directions
+        num_dirs = np.array([len(dirs) for dirs in dir_lists], dtype=np.int64)
+        hop_dirs = np.repeat(np.arange(len(all_dirs)), dir_hops)
+        dir_targets = np.repeat(np.arange(len(targets)), num_dirs)
+        hop_targets = dir_targets[hop_dirs]
+        hop_cols = hop_dirs - (np.cumsum(num_dirs) - num_dirs)[hop_targets]
+        num_edges = len(atk_ctx.remaining_bw)
+        keys, first, inverse = np.unique(
+            hop_targets * num_edges + hop_edges, return_index=True, return_inverse=True
+        )
+        order = np.argsort(first, kind="stable")
+        rank = np.empty(len(keys), dtype=np.int64)
+        rank[order] = np.arange(len(keys))
+        row_edges, row_targets = keys[order] % num_edges, keys[order] // num_edges
+        target_rows = np.searchsorted(row_targets, np.arange(len(targets) + 1))
+        hop_rows = rank[inverse.reshape(-1)] - target_rows[hop_targets]
+        target_hops = np.searchsorted(hop_targets, np.arange(len(targets) + 1))
+
+        problems = []
+        for t, congest_edges in enumerate(targets):
+            r_start, r_end = target_rows[t], target_rows[t + 1]
+            h_start, h_end = target_hops[t], target_hops[t + 1]
+            problems.append(
+                LPFeasProblem.from_rows(
+                    self.solver,
+                    congest_edges,
+                    atk_ctx,
+                    direction_datas[t],
+                    dir_lists[t],
+                    row_edges[r_start:r_end],
+                    hop_rows[h_start:h_end],
+                    hop_cols[h_start:h_end],
+                )
+            )
+        return problems
+
+
+class LPFeasProblem(FeasProblem):
+    # The constraint matrix only depends on the target, the uplink bound only changes the right-hand side
+    def __init__(
+        self,
+        solver: str,
+        direction_data: DirectionData,
+        directions: List[TuplePath],
+        numpy_g: sp.csr_matrix,
+        remaining: np.ndarray,
+        sign: np.ndarray,
+        is_uplink: np.ndarray,
+        tot_needed: float,
+    ):
+        self.solver = solver
+        self.direction_data = direction_data
+        self.directions = directions
+        self.numpy_g, self.remaining, self.sign, self.is_uplink = (
+            numpy_g,
+            remaining,
+            sign,
+            is_uplink,
+        )
+        self.tot_needed = tot_needed
+        self.numpy_c = np.ones(len(directions))
 
+    @staticmethod
+    def from_rows(
+        solver: str,
+        congest_edges: List[Edge],
+        atk_ctx: AttackContext,
+        direction_data: DirectionData,
+        directions: List[TuplePath],
+        row_edges: np.ndarray,
+        hop_rows: np.ndarray,
+        hop_cols: np.ndarray,
+    ) -> "LPFeasProblem":
         # Formulate the linear program
         # The variables are the bw in flows assigned to each direction, the constraints are the bw limitations of edges
         # In each row of the constraint matrix, the index to the corresponding path will be set to 1
@@ -67,62 +167,67 @@ class LPFeasStrat(BaseFeasStrat):
         # Matrix for leq inequalities
         # Num of columns is number of directions, so len(directions)
         # Num of rows is complicated:
-        #  - each path gets a constraint for bw >= 0                           len(directions)
-        #  - each edge gets a constraint for bw <= cap                         len(direction_edges)
+        #  - each edge of the directions gets a constraint for bw <= cap       len(row_edges)
         #  - each congest edge gets an additional constr to make equality      len(congest_edges)
         # We need to track where each uplink edge is in the matrix in order to update the constraints
-        num_rows = len(direction_edges) + len(congest_edges)
-        numpy_g = np.zeros((num_rows, len(directions)))
-        numpy_h = np.zeros(num_rows)
-        numpy_c = np.ones(len(directions))
-
-        curr_row = 0
-        # All edges need the less-than constraint
-        for e in direction_edges:
-            if e[0] == -1:
-                numpy_h[curr_row] = min(
-                    bw_data[e].get_remaining_bw(), max_uplink_increase
-                )
-            else:
-                numpy_h[curr_row] = bw_data[e].get_remaining_bw()
-            for j in direction_edges[e]:
-                numpy_g[curr_row, j] = 1.0
-            curr_row += 1
+        # The matrix is sparse, each row only holds the few directions crossing the edge
+        congest_ids = atk_ctx.edge_index.lookup(
+            [e[0] for e in congest_edges], [e[1] for e in congest_edges]
+        )
+        g_rows, g_cols = [hop_rows], [hop_cols]
+        g_vals = [np.ones(len(hop_rows))]
 
         # Congest edges also need the greater-than constraint -> invert sign!
-        for e in congest_edges:
-            if e[0] == -1:
-                numpy_h[curr_row] = -min(
-                    bw_data[e].get_remaining_bw(), max_uplink_increase
-                )
-            else:
-                numpy_h[curr_row] = -bw_data[e].get_remaining_bw()
-            for j in direction_edges[e]:
-                numpy_g[curr_row, j] = -1.0
-            curr_row += 1
-
-        # Prepare Gurobi problem -> we import gurobi here as not everybody may habve it installed!
-        import gurobipy as gp
-        from gurobipy import GRB
-
-        env = gp.Env(empty=True)
-        env.setParam("OutputFlag", 0)
-        env.start()
-        m = gp.Model("attack", env=env)
-        x = m.addMVar(shape=len(directions), lb=0.0, name="x")
-        m.setObjective(numpy_c @ x, GRB.MINIMIZE)  # @ is matrix product!
-        # noinspection PyArgumentList
-        m.addConstr(numpy_g @ x <= numpy_h, name="c")
-        m.optimize()
-
-        if m.status != GRB.OPTIMAL:  # LP not feasible, attack not possible!
+        tot_needed = 0
+        for ed_id in row_edges[np.isin(row_edges, congest_ids)]:
+            tot_needed += atk_ctx.remaining_bw[ed_id].item()
+        for i, ed_id in enumerate(congest_ids):
+            cols = hop_cols[row_edges[hop_rows] == ed_id]
+            g_rows.append(np.full(len(cols), len(row_edges) + i))
+            g_cols.append(cols)
+            g_vals.append(-np.ones(len(cols)))
+        edge_ids = np.concatenate((row_edges, congest_ids))
+        sign = np.ones(len(edge_ids))
+        sign[len(row_edges) :] = -1.0
+        numpy_g = sp.csr_matrix(
+            (
+                np.concatenate(g_vals),
+                (np.concatenate(g_rows), np.concatenate(g_cols)),
+            ),
+            shape=(len(edge_ids), len(directions)),
+        )
+        return LPFeasProblem(
+            solver,
+            direction_data,
+            directions,
+            numpy_g,
+            atk_ctx.remaining_bw[edge_ids].astype(np.float64),
+            sign,
+            atk_ctx.bw_data.from_nodes[edge_ids] == -1,
+            tot_needed,
+        )
+
+    def solve(self, max_uplink_increase: int) -> Tuple[Optional[AtkFlowSet], int, int]:
+        directions = self.directions
+        if len(directions) == 0:
+            return None, -1, -1
+
+        bound = np.where(
+            self.is_uplink,
+            np.minimum(self.remaining, max_uplink_increase),
+            self.remaining,
+        )
+        lp_vars = get_solver(self.solver).minimize(
+            self.numpy_c, self.numpy_g, self.sign * bound
+        )
+        if lp_vars is None:  # LP not feasible, attack not possible!
             return None, -1, -1
 
         # Gather info about the amount of flow each direction sends
-        lp_vars, directions_bw, edges_bw = m.getVars(), {}, {}
+        directions_bw, edges_bw = {}, {}
         for i in range(len(directions)):
-            # Get the value of the variable
-            val = int(lp_vars[i].x)
+            # Get the value of the variable, the tolerance absorbs the solver rounding
+            val = int(lp_vars[i] + LP_TOL)
             if val > 0:
                 directions_bw[directions[i]] = val
                 for ed in get_edges(directions[i]):
@@ -133,11 +238,11 @@ class LPFeasStrat(BaseFeasStrat):
         # Find a conformant atkflowset, distribute each direction equally among the originating pairs
         atk_flow_set = set()
         for dire, bw in directions_bw.items():
-            tot_pairs = len(direction_data[dire])
+            tot_pairs = len(self.direction_data[dire])
             flows_per_pair = max(
                 5, int(ceil(bw / tot_pairs))
             )  # Enforce a min of 5 per pair for attack efficiency
-            for pair in direction_data[dire]:
+            for pair in self.direction_data[dire]:
                 if bw == 0:
                     break
                 flows = min(flows_per_pair, bw)
@@ -146,6 +251,33 @@ class LPFeasStrat(BaseFeasStrat):
 
         return (
             atk_flow_set,
-            tot_needed,
+            self.tot_needed,
             max(edges_bw[ed] for ed in edges_bw if ed[0] == -1),
         )
+
+    def min_uplink_increase(self) -> Optional[float]:
+        # Solve for the uplink bound directly, as a variable u: min u st. the flows on each uplink are at most u.
+        # This does not work if a target is an uplink, as its equality constraint would be min(remaining, u)
+        if len(self.directions) == 0 or np.any(self.is_uplink & (self.sign < 0)):
+            return None
+        uplink_rows = np.flatnonzero(self.is_uplink)
+        bound_col = sp.csr_matrix(
+            (-np.ones(len(uplink_rows)), (uplink_rows, np.zeros(len(uplink_rows)))),
+            shape=(len(self.sign), 1),
+        )
+        numpy_g = sp.vstack(
+            (
+                sp.hstack((self.numpy_g, sp.csr_matrix((len(self.sign), 1)))),
+                sp.hstack((self.numpy_g, bound_col))[uplink_rows],
+            ),
+            format="csr",
+        )
+        numpy_h = np.concatenate(
+            (self.sign * self.remaining, np.zeros(len(uplink_rows)))
+        )
+        numpy_c = np.zeros(len(self.directions) + 1)
+        numpy_c[-1] = 1.0
+        lp_vars = get_solver(self.solver).minimize(numpy_c, numpy_g, numpy_h)
+        if lp_vars is None:
+            return None
+        return lp_vars[-1]
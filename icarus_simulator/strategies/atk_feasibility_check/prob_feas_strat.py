@@ -1,20 +1,27 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
+import numpy as np
+
 from math import sqrt, log, ceil
+from itertools import chain
 from typing import List, Optional, Tuple
 
 from icarus_simulator.strategies.atk_feasibility_check.base_feas_strat import (
     BaseFeasStrat,
+    FeasProblem,
 )
 from icarus_simulator.structure_definitions import (
     Edge,
     PathData,
     DirectionData,
-    BwData,
-    PairData,
+    AttackContext,
     AtkFlowSet,
-    PairInfo,
+    SdPair,
 )
-from icarus_simulator.utils import get_ordered_idx, get_edges
+from icarus_simulator.tables import segment_positions
+from icarus_simulator.utils import get_ordered_idx
+
+MIN_WINDOW = 16  # Pairs evaluated at once after an admission, doubled at each window with no admission
+MAX_WINDOW = 4096
 
 
 class ProbFeasStrat(BaseFeasStrat):
@@ -37,153 +44,251 @@ class ProbFeasStrat(BaseFeasStrat):
         self,
         congest_edges: List[Edge],
         path_data: PathData,
-        bw_data: BwData,
+        atk_ctx: AttackContext,
         direction_data: DirectionData,
         max_uplink_increase: int,
     ) -> Tuple[Optional[AtkFlowSet], int, int]:
-        isl_num = int(len([ed for ed in bw_data if -1 not in ed]) / 2)
-        gamma = 1 / (isl_num ** 2)
+        return self.prepare(congest_edges, path_data, atk_ctx, direction_data).solve(
+            max_uplink_increase
+        )
+
+    def prepare(
+        self,
+        congest_edges: List[Edge],
+        path_data: PathData,
+        atk_ctx: AttackContext,
+        direction_data: DirectionData,
+    ) -> FeasProblem:
         assert (
             len(congest_edges) == 1
         )  # Otherwise, this strategy does not work yet. Needs some brain work to adapt.
-        target = congest_edges[0]
-        needed_hosts = bw_data[target].get_remaining_bw()
-
-        # Prepare a list of sorted probabilities -> sort is for the greedy algorithm
-        prob_map: PairData = {}
-        for dire, pairs in direction_data.items():
-            for p in pairs:
-                if p not in prob_map:
-                    prob_map[p] = PairInfo()
-                prob_map[p].prob += 1
-                prob_map[p].directions.add(dire)
-        for p in prob_map:
-            ord_p = get_ordered_idx(p)[0]
-            prob_map[p].prob /= len(path_data[ord_p])
-            prob_map[p].tot = len(path_data[ord_p])
-
-        pair_list = list(prob_map.keys())
-        pair_list.sort(key=lambda k: prob_map[k].prob, reverse=True)
+
+        # A pair is listed once per path in a direction, its probability is the share of its paths that are listed
+        num_dirs = len(direction_data)
+        dir_sizes = [len(pairs) for pairs in direction_data.values()]
+        ends = np.fromiter(
+            chain.from_iterable(chain.from_iterable(direction_data.values())),
+            dtype=np.int64,
+            count=2 * sum(dir_sizes),
+        )
+        srcs, dsts = ends[0::2], ends[1::2]
+        base = int(ends.max(initial=0)) + 1
+        _, firsts, entry_pairs = np.unique(
+            srcs * base + dsts, return_index=True, return_inverse=True
+        )
+        pairs = list(zip(srcs[firsts].tolist(), dsts[firsts].tolist()))
+        tots = np.array(
+            [len(path_data[get_ordered_idx(p)[0]]) for p in pairs], dtype=np.int64
+        )
+        probs = np.bincount(entry_pairs, minlength=len(pairs)) / tots
+
+        # Sort the pairs by decreasing probability for the greedy algorithm, ties in order of appearance
+        order = np.lexsort((firsts, -probs))
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        entry_dirs = np.repeat(np.arange(num_dirs, dtype=np.int64), dir_sizes)
+
+        # Links of each direction, without the last edge, which is the flooded one.
+        # The links of the direction number i are dir_links[dir_ptr[i]:dir_ptr[i + 1]]
+        dir_lens = np.array([len(dire) for dire in direction_data], dtype=np.int64)
+        nodes = np.fromiter(
+            chain.from_iterable(direction_data),
+            dtype=np.int64,
+            count=int(dir_lens.sum()),
+        )
+        dir_hops = np.maximum(dir_lens - 2, 0)
+        dir_ptr = np.concatenate(([0], np.cumsum(dir_hops)))
+        node_starts = np.cumsum(dir_lens) - dir_lens
+        hop_pos = segment_positions(node_starts, dir_hops)
+        # The links are numbered locally, links[i] is the row in bw_data of the local link i
+        links, dir_links = np.unique(
+            atk_ctx.edge_index.lookup(nodes[hop_pos], nodes[hop_pos + 1]),
+            return_inverse=True,
+        )
+        num_links = len(links)
+
+        # Count how many directions of each pair traverse each link, for all the pairs at once.
+        # The links of the pair number i, in sorted order, are pair_links[pair_ptr[i]:pair_ptr[i + 1]]
+        pd_keys = np.unique(rank[entry_pairs] * num_dirs + entry_dirs)
+        pd_pairs, pd_dirs = pd_keys // num_dirs, pd_keys % num_dirs
+        entries = segment_positions(dir_ptr[pd_dirs], dir_hops[pd_dirs])
+        keys, link_counts = np.unique(
+            np.repeat(pd_pairs, dir_hops[pd_dirs]) * num_links + dir_links[entries],
+            return_counts=True,
+        )
+        key_pairs = keys // num_links
+        link_probs = link_counts / tots[order][key_pairs]
+        # The links that all the directions of a pair traverse come first
+        uncertain = link_probs != 1.0
+        by_pair = np.lexsort((uncertain, key_pairs))
+        pair_ptr = np.searchsorted(key_pairs, np.arange(len(pairs) + 1))
+        certain_ends = pair_ptr[:-1] + np.bincount(
+            key_pairs[~uncertain], minlength=len(pairs)
+        )
+
+        return ProbFeasProblem(
+            self.beta,
+            atk_ctx,
+            congest_edges[0],
+            [pairs[i] for i in order.tolist()],
+            probs[order],
+            links,
+            keys[by_pair] % num_links,
+            link_probs[by_pair],
+            pair_ptr,
+            certain_ends,
+        )
+
+
+class ProbFeasProblem(FeasProblem):
+    # The pairs and the links they traverse only depend on the target, the uplink bound only changes the link caps
+    def __init__(
+        self,
+        beta: float,
+        atk_ctx: AttackContext,
+        target: Edge,
+        pair_list: List[SdPair],
+        pair_probs: np.ndarray,
+        links: np.ndarray,
+        pair_links: np.ndarray,
+        link_probs: np.ndarray,
+        pair_ptr: np.ndarray,
+        certain_ends: np.ndarray,
+    ):
+        self.beta = beta
+        self.atk_ctx = atk_ctx
+        self.target = target
+        self.pair_list, self.pair_probs = pair_list, pair_probs
+        self.pair_links, self.link_probs = pair_links, link_probs
+        # The pairs are sorted by decreasing probability, which is at most 1, so the certain ones come first
+        self.num_certain = int(np.count_nonzero(pair_probs == 1.0))
+        # The links of the pair number i with probability 1 end at certain_ends[i]
+        self.pair_ptr, self.ptr_list = pair_ptr, pair_ptr.tolist()
+        self.certain_ends = certain_ends.tolist()
+        self.no_empty = bool(np.all(pair_ptr[1:] > pair_ptr[:-1]))
+        # The link state only covers the links of the pairs, in the local numbering.
+        # The bound of a link is its cap if the link is certain for the pair, its max mean otherwise
+        self.num_links = len(links)
+        self.bound_pos = pair_links + self.num_links * (link_probs != 1.0)
+        self.is_uplink = atk_ctx.bw_data.from_nodes[links] == -1
+        self.remaining = atk_ctx.remaining_bw[links].astype(np.float64)
+        self.log_gamma = log(1 / (atk_ctx.isl_num ** 2))
+
+    def solve(self, max_uplink_increase: int) -> Tuple[Optional[AtkFlowSet], int, int]:
+        beta, log_gamma = self.beta, self.log_gamma
+        needed_hosts = self.atk_ctx.get_remaining_bw(self.target)
+        pair_links, link_probs, pair_probs = (
+            self.pair_links,
+            self.link_probs,
+            self.pair_probs,
+        )
+
+        uplink_remaining = np.minimum(self.remaining, max_uplink_increase)
+        caps = np.where(self.is_uplink, uplink_remaining, self.remaining)
+        bounds = np.concatenate((caps, _max_means(caps, log_gamma)))
+        link_caps, link_max_means = bounds[: self.num_links], bounds[self.num_links :]
+        link_means = np.zeros(self.num_links)
 
         # Compute the probabilistic structure
         mean, min_mean = (
             0.0,
-            sqrt(log(self.beta) * (log(self.beta) - 2 * needed_hosts))
-            + needed_hosts
-            - log(self.beta),
+            sqrt(log(beta) * (log(beta) - 2 * needed_hosts)) + needed_hosts - log(beta),
         )
-        link_means, link_max_means, link_caps = {}, {}, {}
         atk_flow_set = set()
 
-        # For each pair, check how many sdpairs we can add to the attack set
-        for pair in pair_list:
-            # Count how many directions in the pair traverse each edge
-            prob, tot, dirs = (
-                prob_map[pair].prob,
-                prob_map[pair].tot,
-                prob_map[pair].directions,
-            )
-            link_counts = {}
-            for di in dirs:
-                for link in get_edges(
-                    di, excl_end=1
-                ):  # -1, because the last edge is the flooded one
-                    if link not in link_means:
-                        if link[0] == -1:
-                            cap = min(
-                                bw_data[link].get_remaining_bw(), max_uplink_increase
-                            )
-                        else:
-                            cap = bw_data[link].get_remaining_bw()
-                        link_caps[link], link_means[link] = cap, 0.0
-                        link_max_means[link] = (
-                            -sqrt(log(gamma) * (log(gamma) - 8 * cap))
-                            - log(gamma)
-                            + 2 * cap
-                        ) / 2
-                    if link not in link_counts:
-                        link_counts[link] = 0
-                    link_counts[link] += 1
+        # For each pair, check how many sdpairs we can add to the attack set.
+        # The state only changes when a pair is added, so the fits of a window of pairs are computed at once,
+        # and the pairs before the first one that fits are skipped
+        ptr, certain_ends = self.ptr_list, self.certain_ends
+        num_pairs, pos, window = len(self.pair_list), 0, MIN_WINDOW
+        last_visited = num_pairs - 1
+        while pos < num_pairs:
+            stop = min(pos + window, num_pairs)
 
             # Compute minimum number of hosts needed to flood
-            if prob == 1.0:
-                fits = int(ceil(needed_hosts - mean))
-            else:
-                fits = int(ceil((min_mean - mean) / prob))
+            fits_w = np.ceil((min_mean - mean) / pair_probs[pos:stop])
+            if pos < self.num_certain:
+                fits_w[: self.num_certain - pos] = ceil(needed_hosts - mean)
 
             # Enforce no self-bnecks: Check how many can fit in the links without having too large link mean
-            for link in link_counts:
-                link_prob = link_counts[link] / tot
-                if link_prob == 1.0:
-                    fits_link = int(link_caps[link] - link_means[link])
+            e_start, e_end = ptr[pos], ptr[stop]
+            if e_end > e_start:
+                # The probability of the certain links is 1, so the division keeps their fits unchanged
+                fits_links = (
+                    bounds[self.bound_pos[e_start:e_end]]
+                    - link_means[pair_links[e_start:e_end]]
+                ) / link_probs[e_start:e_end]
+                # The truncation is monotonic, so the minimum of each pair is truncated once
+                seg_starts = self.pair_ptr[pos:stop] - e_start
+                if self.no_empty:
+                    links_min = np.minimum.reduceat(fits_links, seg_starts)
                 else:
-                    fits_link = int(
-                        (link_max_means[link] - link_means[link]) / link_prob
+                    non_empty = self.pair_ptr[pos + 1 : stop + 1] > seg_starts + e_start
+                    links_min = np.full(stop - pos, np.inf)
+                    links_min[non_empty] = np.minimum.reduceat(
+                        fits_links, seg_starts[non_empty]
                     )
-                fits = min(fits, fits_link)
-                if fits <= 0:
-                    break
-            # If no host can fit, continue to next pair
-            if fits <= 0:
+                fits_w = np.minimum(fits_w, np.trunc(links_min))
+
+            # If no host can fit, continue to the next window
+            first = int(np.argmax(fits_w > 0))
+            if fits_w[first] <= 0:
+                pos, window = stop, min(2 * window, MAX_WINDOW)
                 continue
+            pair_num, fits = pos + first, int(fits_w[first])
+            pos, window = pair_num + 1, MIN_WINDOW
 
             # Update min/max means if prob is 1, otw update mean
-            if prob == 1.0:
+            if pair_num < self.num_certain:
                 needed_hosts -= fits
                 if needed_hosts <= 0:
                     min_mean = 0.0
                 else:
                     min_mean = (
-                        sqrt(log(self.beta) * (log(self.beta) - 2 * needed_hosts))
+                        sqrt(log(beta) * (log(beta) - 2 * needed_hosts))
                         + needed_hosts
-                        - log(self.beta)
+                        - log(beta)
                     )
             else:
-                mean += prob * fits
+                mean += float(pair_probs[pair_num]) * fits
 
-            atk_flow_set.add((pair, fits))
+            atk_flow_set.add((self.pair_list[pair_num], fits))
             if mean >= min_mean:  # Do not update link means if you can exit
+                last_visited = pair_num
                 break
 
-            for link in link_counts:
-                link_prob = link_counts[link] / tot
-                # If the prob is 1, allocation is deterministic: all hosts will be allocated to the current link
-                # In this case, update the cap and the max_mean, without updating the mean
-                # Otherwise, update the mean
-                if link_prob == 1.0:
-                    link_caps[link] = max(link_caps[link] - fits, 0)
-                    cap = link_caps[link]
-                    # We do not need any if/else here, because the max with 0 takes care of it
-                    link_max_means[link] = max(
-                        (
-                            -sqrt(log(gamma) * (log(gamma) - 8 * cap))
-                            - log(gamma)
-                            + 2 * cap
-                        )
-                        / 2,
-                        0,
-                    )
-                else:
-                    link_means[link] += (link_counts[link] / tot) * fits
+            # If the prob is 1, allocation is deterministic: all hosts will be allocated to the current link
+            # In this case, update the cap and the max_mean, without updating the mean
+            # Otherwise, update the mean. The links of a pair are distinct
+            start, mid, end = ptr[pair_num], certain_ends[pair_num], ptr[pair_num + 1]
+            if mid > start:
+                certain_links = pair_links[start:mid]
+                caps = np.maximum(link_caps[certain_links] - fits, 0)
+                link_caps[certain_links] = caps
+                # We do not need any if/else here, because the max with 0 takes care of it
+                link_max_means[certain_links] = np.maximum(
+                    _max_means(caps, log_gamma), 0
+                )
+            if end > mid:
+                link_means[pair_links[mid:end]] += link_probs[mid:end] * fits
 
         if mean < min_mean:  # If not successful, return None
             return None, -1, -1
 
         # Determine the probabilistic number of flows on target and the maximum increase
         on_trg = ceil(
-            mean + bw_data[target].get_remaining_bw() - needed_hosts
+            mean + self.atk_ctx.get_remaining_bw(self.target) - needed_hosts
         )  # mean covers needed_hosts, not rest
-        detect = -1
-        for link in link_caps:
-            if link[0] == -1:
-                incr = ceil(
-                    link_means[link]
-                    + min(  # This covers the final capacity, the next line accounts for optim
-                        bw_data[link].get_remaining_bw(), max_uplink_increase
-                    )
-                    - link_caps[link]
-                )
-                if incr > detect:
-                    detect = incr
+        # Only the links of the visited pairs are considered
+        seen = np.zeros(len(link_caps), dtype=bool)
+        seen[pair_links[: ptr[last_visited + 1]]] = True
+        seen &= self.is_uplink
+        if not np.any(seen):
+            return atk_flow_set, on_trg, -1
+        # This covers the final capacity, the next line accounts for optim
+        incr = link_means[seen] + uplink_remaining[seen] - link_caps[seen]
+        return atk_flow_set, on_trg, max(int(ceil(np.max(incr))), -1)
+
 
-        return atk_flow_set, on_trg, detect
+def _max_means(caps: np.ndarray, log_gamma: float) -> np.ndarray:
+    return (-np.sqrt(log_gamma * (log_gamma - 8 * caps)) - log_gamma + 2 * caps) / 2
@@ -4,15 +4,15 @@ import json
 import numpy as np
 
 from typing import Set, List
-from geopy.distance import great_circle
 from scipy.spatial.ckdtree import cKDTree
 from shapely.geometry import Polygon, shape, Point
 
-from icarus_simulator.sat_core.coordinate_util import geo2cart
+from icarus_simulator.sat_core.coordinate_util import geo2cart_array
 from icarus_simulator.strategies.atk_geo_constraint.base_geo_constraint_strat import (
     BaseGeoConstraintStrat,
 )
 from icarus_simulator.structure_definitions import GridPos
+from icarus_simulator.utils import unit_vectors, paired_great_circle_dists
 
 dirname = os.path.dirname(__file__)
 strategies_dirname = os.path.split(dirname)[0]
@@ -62,8 +62,9 @@ def get_allowed_gridpoints(geo_location: str, grid_pos: GridPos, geo_data) -> Se
     shp = Polygon()
     for idx, geo in enumerate(geometries):
         shp = shp.union(shape(geo))
-    for idx, pos in grid_pos.items():
-        if Point(pos.lat, pos.lon).within(shp):
+    grid_ids = grid_pos.ids.tolist()
+    for idx, lat, lon in zip(grid_ids, grid_pos.lat, grid_pos.lon):
+        if Point(lat, lon).within(shp):
             allowed_points.add(idx)
 
     # Extract the border points
@@ -81,29 +82,14 @@ def get_allowed_gridpoints(geo_location: str, grid_pos: GridPos, geo_data) -> Se
     # plotter.plot_points({idx: GeodeticPosInfo({"lat": x[idx], "lon": y[idx], "elev": 0.0})
     #                       for idx in range(len(x))}, "GRID", "TEST", "aa", "asas",)
 
-    grid_cart = np.zeros((len(grid_pos), 3))
-    grid_map = {}
-    i = 0
-    for idx, pos in grid_pos.items():
-        grid_map[i] = idx
-        grid_cart[i] = geo2cart({"elev": 0, "lon": pos.lon, "lat": pos.lat})
-        i += 1
-
     # Put the homogeneous grid into a KD-tree and query the border points to include also point slightly in the sea
-    kd = cKDTree(grid_cart)
-    for idx in range(len(x)):
-        _, closest_grid_idx = kd.query(
-            geo2cart({"elev": 0, "lon": y[idx], "lat": x[idx]}), k=1
-        )
-        grid_id = grid_map[closest_grid_idx]
-        if (
-            great_circle(
-                (grid_pos[grid_id].lat, grid_pos[grid_id].lon), (x[idx], y[idx])
-            ).meters
-            < 300000
-        ):
-            # 300000 -> number elaborated to keep the out-of-coast values without including wrong points
-            allowed_points.add(grid_map[closest_grid_idx])
+    kd = cKDTree(grid_pos.cartesian())
+    _, closest_rows = kd.query(geo2cart_array(x, y, np.zeros(len(x))), k=1)
+    dists = paired_great_circle_dists(
+        grid_pos.unit_vectors(closest_rows), unit_vectors(np.array(x), np.array(y))
+    )
+    # 300000 -> number elaborated to keep the out-of-coast values without including wrong points
+    allowed_points.update(grid_pos.ids[closest_rows[dists < 300000]].tolist())
     return allowed_points
 
 
@@ -26,3 +26,11 @@ class BasePathFilteringStrat(BaseStrat):
         allowed_sources: List[int],
     ) -> DirectionData:
         raise NotImplementedError
+
+    def prepare(self, edge_data: EdgeData, path_data: PathData) -> None:
+        # Called once per phase, before the samples are processed. Override to precompute indices on the data
+        return
+
+    def release(self) -> None:
+        # Called once per phase, after the samples are processed. Override to drop what prepare() built
+        return
@@ -1,5 +1,7 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
-from typing import List
+import numpy as np
+
+from typing import List, Optional, Tuple
 
 from icarus_simulator.strategies.atk_path_filtering.base_path_filtering_strat import (
     BasePathFilteringStrat,
@@ -10,9 +12,16 @@ from icarus_simulator.structure_definitions import (
     EdgeData,
     DirectionData,
 )
+from icarus_simulator.tables import PathStore, EdgeIndex, sorted_isin
 
 
 class DirectionalFilteringStrat(BasePathFilteringStrat):
+    def __init__(self, **kwargs):
+        super().__init__()
+        self._index: Optional[DirectionIndex] = None
+        if len(kwargs) > 0:
+            pass  # Appease the unused param inspection
+
     @property
     def name(self) -> str:
         return "dir"
@@ -21,6 +30,13 @@ class DirectionalFilteringStrat(BasePathFilteringStrat):
     def param_description(self) -> None:
         return None
 
+    def prepare(self, edge_data: EdgeData, path_data: PathData) -> None:
+        self._get_index(edge_data, path_data)
+
+    def release(self) -> None:
+        # The index references the edge and path data, which must not outlive the phase
+        self._index = None
+
     def compute(
         self,
         edges: List[Edge],
@@ -28,42 +44,106 @@ class DirectionalFilteringStrat(BasePathFilteringStrat):
         path_data: PathData,
         allowed_sources: List[int],
     ) -> DirectionData:
+        index = self._get_index(edge_data, path_data)
+        first_allowed, last_allowed = index.allowed_endpoints(allowed_sources)
         direction_data = {}
         for edge in edges:
-            inv_ed = (edge[1], edge[0])
-            idxs_in_order = edge_data[edge].paths_through
-            idxs_in_rev = edge_data[inv_ed].paths_through
+            row, inv_row = edge_data.index[edge], edge_data.index[(edge[1], edge[0])]
+            nums_in_order, hops_in_order = index.paths_at(row)
+            nums_in_rev, hops_in_rev = index.paths_at(inv_row)
 
             # Avoid duplicate indices. It can occur that gnd-sat-gnd paths are in both lists
-            set_in_order, set_in_rev = set(idxs_in_order), set(idxs_in_rev)
-            set_in_rev.difference_update(set_in_order)
-            idxs_in_rev = list(set_in_rev)
-
-            # Extract the path in the correct order
-            idxs = idxs_in_order + idxs_in_rev
-            for i, idx in enumerate(idxs):
-                in_order = i < len(idxs_in_order)
-                base_path = path_data[(idx[0], idx[1])][idx[2]][0]
-                pair = idx[0], idx[1]
-                if not in_order:
-                    base_path = base_path[::-1]
-                    pair = idx[1], idx[0]
-                # Skip if the source is not in the allowed sources
-                if -base_path[0] not in allowed_sources:
-                    continue
-
-                # Path truncation
-                # Cut the path at the target if ed[1] != -1. In this case the whole path is kept.
+            # Skip the paths whose source is not in the allowed sources: the source of the reversed paths is the end
+            keep_in_order = first_allowed[nums_in_order]
+            keep_in_rev = last_allowed[nums_in_rev] & ~sorted_isin(
+                nums_in_rev, nums_in_order
+            )
+            nums_in_order, hops_in_order = (
+                nums_in_order[keep_in_order],
+                hops_in_order[keep_in_order],
+            )
+            nums_in_rev, hops_in_rev = (
+                nums_in_rev[keep_in_rev],
+                hops_in_rev[keep_in_rev],
+            )
+            pairs_in_order = zip(
+                edge_data.path_src[nums_in_order].tolist(),
+                edge_data.path_dst[nums_in_order].tolist(),
+            )
+            pairs_in_rev = zip(
+                edge_data.path_dst[nums_in_rev].tolist(),
+                edge_data.path_src[nums_in_rev].tolist(),
+            )
+
+            # Path truncation, without reversing the whole paths. The edge is the hop at the given position
+            # Cut the path at the target if ed[1] != -1. In this case the whole path is kept.
+            # Note that we are not adding ordered pairs! Sending data from a to b is different
+            # than sending from b to a, the probability of hitting the target is different!
+            for num, hop, pair in zip(
+                nums_in_order.tolist(), hops_in_order.tolist(), pairs_in_order
+            ):
+                base_path = index.paths[num]
                 if edge[1] != -1:
-                    last_idx = base_path.index(edge[1])
-                    truncated = tuple([-1] + base_path[1 : last_idx + 1])
+                    truncated = (-1, *base_path[1 : hop + 2])
                 else:
-                    truncated = tuple([-1] + base_path[1:-1] + [-1])
-
-                # Note that we are not adding ordered pairs! Sending data from a to b is different
-                # than sending from b to a, the probability of hitting the target is different!
-                if truncated not in direction_data:
-                    direction_data[truncated] = []
-                direction_data[truncated].append(pair)  # Add multiple times if needed
+                    truncated = (-1, *base_path[1:-1], -1)
+                # Add multiple times if needed
+                direction_data.setdefault(truncated, []).append(pair)
+            for num, hop, pair in zip(
+                nums_in_rev.tolist(), hops_in_rev.tolist(), pairs_in_rev
+            ):
+                base_path = index.paths[num]
+                if edge[1] != -1:
+                    truncated = (-1, *base_path[hop:-1][::-1])
+                else:
+                    truncated = (-1, *base_path[-2:0:-1], -1)
+                direction_data.setdefault(truncated, []).append(pair)
 
         return direction_data
+
+    def _get_index(self, edge_data: EdgeData, path_data: PathData) -> "DirectionIndex":
+        # The index is built once for the data of the phase, and inherited by the worker processes
+        if self._index is None or self._index.edge_data is not edge_data:
+            self._index = DirectionIndex(edge_data, path_data)
+        return self._index
+
+
+class DirectionIndex:
+    # Position of each edge in the paths through it, aligned with the path numbers of the EdgeTable, and the ground
+    # endpoints of every path: the hop number hops[k] of path path_nums[k] is the edge of its row
+    def __init__(self, edge_data: EdgeData, path_data: PathData):
+        self.edge_data = edge_data
+        path_store = PathStore.from_path_data(path_data)
+        path_nums, from_nodes, to_nodes = path_store.hops()
+        hop_offsets = path_store.offsets - np.arange(len(path_store) + 1)
+        hops = np.arange(len(path_nums)) - hop_offsets[path_nums]
+        eds = EdgeIndex(edge_data.edges()).lookup(
+            np.maximum(from_nodes, -1), np.maximum(to_nodes, -1)
+        )
+        known = eds >= 0
+        order = np.lexsort((path_nums[known], eds[known]))
+        assert np.array_equal(path_nums[known][order], edge_data.path_nums)
+        self.hops: np.ndarray = hops[known][order]
+        self.paths: List[List[int]] = [
+            path for lb_set in path_data.values() for path, _ in lb_set
+        ]  # In path number order, not copied
+        self.first: np.ndarray = -path_store.nodes[path_store.offsets[:-1]]
+        self.last: np.ndarray = -path_store.nodes[path_store.offsets[1:] - 1]
+        self._allowed: Optional[Tuple[List[int], np.ndarray, np.ndarray]] = None
+
+    def allowed_endpoints(
+        self, allowed_sources: List[int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Masks of the paths starting and ending in the allowed sources. The phase passes the same list to every sample
+        if self._allowed is None or self._allowed[0] is not allowed_sources:
+            allowed = np.asarray(list(allowed_sources), dtype=np.int64)
+            self._allowed = (
+                allowed_sources,
+                np.isin(self.first, allowed),
+                np.isin(self.last, allowed),
+            )
+        return self._allowed[1], self._allowed[2]
+
+    def paths_at(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.edge_data.indptr[row], self.edge_data.indptr[row + 1]
+        return self.edge_data.path_nums[start:end], self.hops[start:end]
@@ -1 +1,3 @@
 from .bidir_bw_assign_strat import BidirBwAssignStrat
+from .max_min_bw_assign_strat import MaxMinBwAssignStrat
+from .mcf_bw_assign_strat import McfBwAssignStrat
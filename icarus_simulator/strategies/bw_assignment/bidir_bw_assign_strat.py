@@ -1,4 +1,6 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
+import numpy as np
+
 from typing import List
 
 from icarus_simulator.strategies.bw_assignment.base_bw_assig_strat import (
@@ -9,9 +11,13 @@ from icarus_simulator.structure_definitions import (
     PathData,
     EdgeData,
     PathId,
-    BwInfo,
 )
-from icarus_simulator.utils import get_edges
+from icarus_simulator.tables import PathStore, EdgeIndex, BwTable
+
+MIN_CHUNK, MAX_CHUNK = (
+    64,
+    16384,
+)  # Bounds of the number of paths whose admission is checked at once
 
 
 class BidirBwAssignStrat(BaseBwAssignStrat):
@@ -34,47 +40,85 @@ class BidirBwAssignStrat(BaseBwAssignStrat):
     def compute(
         self, path_data: PathData, path_list: List[PathId], edge_data: EdgeData
     ) -> BwData:
-        allocated, dropped = 0, 0
         max_updown = int(self.udl_bw * self.utilisation)
         max_isl = int(self.isl_bw * self.utilisation)
-        bw_data: BwData = {
-            ed: (BwInfo(0, self.isl_bw) if -1 not in ed else BwInfo(0, self.udl_bw))
-            for ed in edge_data
-        }
-
-        # Allocate one quantum per path
-        for path_id in path_list:
-            path = path_data[(path_id[0], path_id[1])][path_id[2]][0]
-            # Convert to -1 notation
-            first, last = -path[0], -path[-1]
-            path[0], path[-1], path_fits = -1, -1, True
-            eds = list(get_edges(path))
-            # Swap last and second edges: optimisation, moved the downlink check at the beginning
-            dlink, sec = eds[-1], eds[1]
-            eds[1], eds[-1] = dlink, sec
-
-            # Check if the addition of this communication would fit in the involved edges
-            for ed in eds:
-                max_link = max_isl
-                if -1 in ed:
-                    max_link = max_updown
-                if (
-                    bw_data[ed].idle_bw + 1 > max_link
-                ):  # Can be equal, we have utilisation
-                    path_fits = False
-                    break
-            # If the path fits, add it to the current bandwidths
-            if path_fits:
-                allocated += 1
-                for ed in get_edges(path):
-                    inv_ed = (ed[1], ed[0])
-                    bw_data[ed].idle_bw += 1
-                    bw_data[inv_ed].idle_bw += 1
-            else:
-                dropped += 1
-            # Swap back the extremes
-            path[0], path[-1] = first, last
+        is_updown = (edge_data.from_nodes == -1) | (edge_data.to_nodes == -1)
+        capacity = np.where(is_updown, self.udl_bw, self.isl_bw)
+        max_link = np.where(is_updown, max_updown, max_isl)
+        idle_bw = np.zeros(len(edge_data), dtype=np.int64)
+
+        # Edge ids of the hops of all the paths
+        path_store = PathStore.from_path_ids(path_data, path_list)
+        eds, inv_eds, hop_offsets = path_store.hop_edges(EdgeIndex(edge_data.edges()))
+        assert np.all(eds >= 0) and np.all(inv_eds >= 0)
+
+        # Allocate one quantum per path, in order
+        admitted = _greedy_admission(eds, inv_eds, hop_offsets, idle_bw, max_link)
+        allocated = int(np.count_nonzero(admitted))
+        dropped = len(path_list) - allocated
 
         # Interesting data prints
         print(f"Alloc, drop, multi_drop: {allocated}, {dropped}")
-        return bw_data
+        return BwTable(edge_data.from_nodes, edge_data.to_nodes, idle_bw, capacity)
+
+
+def _greedy_admission(
+    eds: np.ndarray,
+    inv_eds: np.ndarray,
+    hop_offsets: np.ndarray,
+    idle_bw: np.ndarray,
+    max_link: np.ndarray,
+) -> np.ndarray:
+    # Admit the paths in order. A path fits if idle_bw + 1 <= max_link on each of its edges, and then adds 1 to the
+    # idle_bw of each edge and of its inverse. The hops of path p are eds[hop_offsets[p]:hop_offsets[p + 1]].
+    # The result is the same as checking one path at a time, but the paths are checked in chunks:
+    #   - the paths through an edge that is already full are dropped, as the allocated bandwidth never decreases;
+    #   - for the other paths, the bandwidth allocated before each hop is computed assuming that all the previous
+    #     paths in the chunk fit. All the paths before the first one that does not fit are then admitted at once.
+    # Each partially admitted chunk fills at least one edge, so the number of chunks is bounded by the edges.
+    # The chunk size adapts to the distance between drops.
+    num_paths = len(hop_offsets) - 1
+    admitted = np.zeros(num_paths, dtype=bool)
+    start, chunk = 0, MIN_CHUNK
+    while start < num_paths:
+        end = min(start + chunk, num_paths)
+        hop_start = hop_offsets[start]
+        full = idle_bw >= max_link
+        path_full = np.logical_or.reduceat(
+            full[eds[hop_start : hop_offsets[end]]], hop_offsets[start:end] - hop_start
+        )
+        cands = np.arange(start, end)[~path_full]
+        if len(cands) == 0:
+            start, chunk = end, min(2 * chunk, MAX_CHUNK)
+            continue
+
+        # Hops of the candidate paths, and number of the candidate owning each hop
+        counts = hop_offsets[cands + 1] - hop_offsets[cands]
+        cand_nums = np.repeat(np.arange(len(cands)), counts)
+        hops = np.arange(len(cand_nums)) + np.repeat(
+            hop_offsets[cands] - np.cumsum(counts) + counts, counts
+        )
+        cand_eds, cand_inv = eds[hops], inv_eds[hops]
+
+        # Allocations on the edge of each hop by the previous candidates, each allocating on the edge and its inverse
+        num_cands = len(cands)
+        alloc_keys = np.sort(
+            np.concatenate((cand_eds, cand_inv)) * num_cands
+            + np.concatenate((cand_nums, cand_nums))
+        )
+        prev_alloc = np.searchsorted(
+            alloc_keys, cand_eds * num_cands + cand_nums
+        ) - np.searchsorted(alloc_keys, cand_eds * num_cands)
+        no_fit = idle_bw[cand_eds] + prev_alloc + 1 > max_link[cand_eds]
+        first_drop = cand_nums[np.argmax(no_fit)] if np.any(no_fit) else num_cands
+
+        # Admit the candidates before the first one that does not fit
+        fit_hops = cand_nums < first_drop
+        idle_bw += np.bincount(cand_eds[fit_hops], minlength=len(idle_bw))
+        idle_bw += np.bincount(cand_inv[fit_hops], minlength=len(idle_bw))
+        admitted[cands[:first_drop]] = True
+        if first_drop == num_cands:
+            start, chunk = end, min(2 * chunk, MAX_CHUNK)
+        else:
+            start, chunk = cands[first_drop] + 1, max(2 * first_drop, MIN_CHUNK)
+    return admitted
@@ -0,0 +1,107 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+import numpy as np
+import scipy.sparse as sp
+
+from typing import List
+
+from icarus_simulator.strategies.bw_assignment.base_bw_assig_strat import (
+    BaseBwAssignStrat,
+)
+from icarus_simulator.structure_definitions import (
+    BwData,
+    PathData,
+    EdgeData,
+    PathId,
+)
+from icarus_simulator.tables import PathStore, EdgeIndex, BwTable
+
+SATURATION_TOL = 1e-9  # Relative residual bandwidth below which an edge is saturated
+
+
+# Max-min fair assignment of the sampled quanta, by progressive filling. Every sampled path is a flow demanding one
+# quantum, and the rates of all the flows grow together until they reach the demand or an edge on their path reaches
+# the utilisation limit. Flows through a saturated edge are then frozen, and the others keep growing.
+# As in BidirBwAssignStrat, a flow allocates its rate on every edge of the path and on its inverse.
+class MaxMinBwAssignStrat(BaseBwAssignStrat):
+    def __init__(self, isl_bw: int, udl_bw: int, utilisation: float, **kwargs):
+        super().__init__()
+        self.isl_bw = isl_bw
+        self.udl_bw = udl_bw
+        self.utilisation = utilisation
+        if len(kwargs) > 0:
+            pass  # Appease the unused param inspection
+
+    @property
+    def name(self) -> str:
+        return "maxmin"
+
+    @property
+    def param_description(self) -> str:
+        return f"i{self.isl_bw}ud{self.udl_bw}u{self.utilisation}"
+
+    def compute(
+        self, path_data: PathData, path_list: List[PathId], edge_data: EdgeData
+    ) -> BwData:
+        is_updown = (edge_data.from_nodes == -1) | (edge_data.to_nodes == -1)
+        capacity = np.where(is_updown, self.udl_bw, self.isl_bw)
+        max_link = np.where(
+            is_updown,
+            int(self.udl_bw * self.utilisation),
+            int(self.isl_bw * self.utilisation),
+        ).astype(np.float64)
+
+        # Flows on the same path get the same rate: compute one rate per distinct path, weighted by the flow count
+        ids = np.array(path_list, dtype=np.int64).reshape(-1, 3)
+        ids, flow_counts = np.unique(ids, axis=0, return_counts=True)
+        path_store = PathStore.from_path_ids(path_data, ids.tolist())
+        eds, inv_eds, hop_offsets = path_store.hop_edges(EdgeIndex(edge_data.edges()))
+        assert np.all(eds >= 0) and np.all(inv_eds >= 0)
+
+        # Sparse edge-path matrix: number of times each path allocates on each edge
+        hop_paths = np.repeat(np.arange(len(path_store)), np.diff(hop_offsets))
+        incidence = sp.csr_matrix(
+            (
+                np.ones(2 * len(eds)),
+                (np.concatenate((eds, inv_eds)), np.tile(hop_paths, 2)),
+            ),
+            shape=(len(edge_data), len(path_store)),
+        )
+        rates = _progressive_filling(incidence, flow_counts, max_link)
+        idle_bw = np.minimum(incidence @ (rates * flow_counts), max_link)  # Rounding
+
+        # Interesting data prints
+        if len(path_list) > 0:
+            full = np.sum(flow_counts[rates >= 1.0])
+            mean = np.sum(rates * flow_counts) / len(path_list)
+            print(f"Full, mean rate, min rate: {full}, {mean}, {np.min(rates)}")
+        return BwTable(edge_data.from_nodes, edge_data.to_nodes, idle_bw, capacity)
+
+
+def _progressive_filling(
+    incidence: sp.csr_matrix, flow_counts: np.ndarray, max_link: np.ndarray
+) -> np.ndarray:
+    # Max-min fair rates of the paths, with demand 1 per flow. All the active paths share the same rate level, which
+    # grows until the demand or the first saturated edge. Each round freezes at least one path, and the matrix is
+    # restricted to the active paths, so that the rounds get cheaper as the edges saturate.
+    rates = np.zeros(incidence.shape[1])
+    residual = max_link.copy()
+    active = np.arange(incidence.shape[1])
+    active_inc = incidence.tocsc()
+    level = 0.0
+    while len(active) > 0:
+        load = active_inc @ flow_counts[active].astype(np.float64)
+        used = load > 0
+        step = min(np.min(residual[used] / load[used], initial=np.inf), 1.0 - level)
+        level += step
+        residual[used] = np.maximum(residual[used] - step * load[used], 0.0)
+        if level >= 1.0:  # All the remaining paths get their full demand
+            rates[active] = 1.0
+            break
+
+        # Freeze the paths through the saturated edges
+        saturated = used & (residual <= SATURATION_TOL * np.maximum(max_link, 1.0))
+        frozen = active_inc.T @ saturated.astype(np.float64) > 0
+        rates[active[frozen]] = level
+        active = active[~frozen]
+        active_inc = active_inc[:, np.flatnonzero(~frozen)]
+    return rates
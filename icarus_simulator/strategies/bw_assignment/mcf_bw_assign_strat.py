@@ -0,0 +1,96 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+import numpy as np
+import scipy.sparse as sp
+
+from scipy.optimize import linprog
+from typing import List
+
+from icarus_simulator.strategies.bw_assignment.base_bw_assig_strat import (
+    BaseBwAssignStrat,
+)
+from icarus_simulator.structure_definitions import (
+    BwData,
+    PathData,
+    EdgeData,
+    PathId,
+)
+from icarus_simulator.tables import PathStore, EdgeIndex, BwTable
+
+
+# Traffic engineering over the load-balancing sets: a fractional multi-commodity flow that maximises the admitted
+# traffic. Each sampled pair is a commodity, demanding one quantum per sampled path on the pair, and its traffic can be
+# split over all the paths of its LbSet. Solved as a path-based LP with the HiGHS solver of scipy.
+# As in BidirBwAssignStrat, the traffic on a path is allocated on every edge of the path and on its inverse.
+class McfBwAssignStrat(BaseBwAssignStrat):
+    def __init__(self, isl_bw: int, udl_bw: int, utilisation: float, **kwargs):
+        super().__init__()
+        self.isl_bw = isl_bw
+        self.udl_bw = udl_bw
+        self.utilisation = utilisation
+        if len(kwargs) > 0:
+            pass  # Appease the unused param inspection
+
+    @property
+    def name(self) -> str:
+        return "mcf"
+
+    @property
+    def param_description(self) -> str:
+        return f"i{self.isl_bw}ud{self.udl_bw}u{self.utilisation}"
+
+    def compute(
+        self, path_data: PathData, path_list: List[PathId], edge_data: EdgeData
+    ) -> BwData:
+        is_updown = (edge_data.from_nodes == -1) | (edge_data.to_nodes == -1)
+        capacity = np.where(is_updown, self.udl_bw, self.isl_bw)
+        max_link = np.where(
+            is_updown,
+            int(self.udl_bw * self.utilisation),
+            int(self.isl_bw * self.utilisation),
+        ).astype(np.float64)
+        if len(path_list) == 0:
+            return BwTable(
+                edge_data.from_nodes,
+                edge_data.to_nodes,
+                np.zeros(len(edge_data)),
+                capacity,
+            )
+
+        # Commodities, with their demand, and all the paths of their LbSets
+        pairs = np.array(path_list, dtype=np.int64).reshape(-1, 3)[:, :2]
+        pairs, demands = np.unique(pairs, axis=0, return_counts=True)
+        path_ids, path_pairs = [], []
+        for pair_num, (src, dst) in enumerate(pairs.tolist()):
+            for list_id in range(len(path_data[(src, dst)])):
+                path_ids.append((src, dst, list_id))
+                path_pairs.append(pair_num)
+        path_store = PathStore.from_path_ids(path_data, path_ids)
+        eds, inv_eds, hop_offsets = path_store.hop_edges(EdgeIndex(edge_data.edges()))
+        assert np.all(eds >= 0) and np.all(inv_eds >= 0)
+
+        # Edge capacity rows, then demand rows: sum of the path flows of a commodity up to its demand
+        hop_paths = np.repeat(np.arange(len(path_store)), np.diff(hop_offsets))
+        edge_rows = sp.csr_matrix(
+            (
+                np.ones(2 * len(eds)),
+                (np.concatenate((eds, inv_eds)), np.tile(hop_paths, 2)),
+            ),
+            shape=(len(edge_data), len(path_store)),
+        )
+        demand_rows = sp.csr_matrix(
+            (np.ones(len(path_store)), (path_pairs, np.arange(len(path_store)))),
+            shape=(len(pairs), len(path_store)),
+        )
+        res = linprog(
+            -np.ones(len(path_store)),
+            A_ub=sp.vstack((edge_rows, demand_rows), format="csr"),
+            b_ub=np.concatenate((max_link, demands.astype(np.float64))),
+            bounds=(0, None),
+            method="highs",
+        )
+        assert res.status == 0, res.message
+        idle_bw = np.minimum(edge_rows @ res.x, max_link)  # Rounding
+
+        # Interesting data prints
+        print(f"Admitted, demand: {-res.fun}, {len(path_list)}")
+        return BwTable(edge_data.from_nodes, edge_data.to_nodes, idle_bw, capacity)
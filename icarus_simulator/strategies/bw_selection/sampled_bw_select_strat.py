@@ -1,20 +1,26 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
-import random
+import numpy as np
+
 from typing import List
 
 from icarus_simulator.strategies.bw_selection.base_bw_select_strat import (
     BaseBwSelectStrat,
 )
 from icarus_simulator.structure_definitions import GridPos, PathData, PathId
-from icarus_simulator.utils import get_ordered_idx
+from icarus_simulator.tables import EdgeIndex
+
+SAMPLE_CHUNK = (
+    1 << 22
+)  # Pairs sampled at once, bounds the memory of the temporary arrays
 
 
 # Computes a sampled traffic matrix. IMPORTANT: this strategy assumes that all paths are symmetrical, and path_data
 # only stores the ordered pairs for space and performance reasons.
 class SampledBwSelectStrat(BaseBwSelectStrat):
-    def __init__(self, sampled_quanta: int, **kwargs):
+    def __init__(self, sampled_quanta: int, seed: int = 0, **kwargs):
         super().__init__()
         self.sampled_quanta = sampled_quanta
+        self.seed = seed
         if len(kwargs) > 0:
             pass  # Appease the unused param inspection
 
@@ -24,24 +30,44 @@ class SampledBwSelectStrat(BaseBwSelectStrat):
 
     @property
     def param_description(self) -> str:
-        return f"{self.sampled_quanta}"
+        return f"{self.sampled_quanta}s{self.seed}"
 
     def compute(self, grid_pos: GridPos, path_data: PathData) -> List[PathId]:
-        random.seed("ETHZ")
-        # Sample communication pairs
-        samples = random.choices(
-            list(grid_pos.keys()),
-            [val.weight for val in grid_pos.values()],
-            k=self.sampled_quanta * 2,
+        rng = np.random.default_rng(
+            self.seed
+        )  # Local generator, phases can run concurrently
+        # Index of the ordered pairs, and size of their load-balancing sets
+        pair_index = EdgeIndex(list(path_data.keys()))
+        lbset_sizes = np.fromiter(
+            (len(lb_set) for lb_set in path_data.values()),
+            dtype=np.int64,
+            count=len(path_data),
         )
-        # If the pair exists, sample a suitable path
-        path_ids = []
-        for i in range(0, self.sampled_quanta * 2, 2):
-            ord_sample = get_ordered_idx((samples[i], samples[i + 1]))[0]
+        weights = grid_pos.weight / np.sum(grid_pos.weight)
+
+        src, dst, idx = [], [], []
+        for start in range(0, self.sampled_quanta, SAMPLE_CHUNK):
+            # Sample communication pairs
+            num = min(SAMPLE_CHUNK, self.sampled_quanta - start)
+            samples = rng.choice(grid_pos.ids, size=(num, 2), p=weights)
+            ord_samples = np.sort(samples, axis=1)
             # If the sample is not in the paths, or there is no path between the pair, the sample is dropped
-            if ord_sample not in path_data or len(path_data[ord_sample]) == 0:
-                continue
-            lbset_size = len(path_data[ord_sample])
-            id_in_lbset = random.randrange(0, lbset_size)
-            path_ids.append((ord_sample[0], ord_sample[1], id_in_lbset))
-        return path_ids
+            pairs = pair_index.lookup(ord_samples[:, 0], ord_samples[:, 1])
+            found = pairs >= 0
+            pairs, ord_samples = pairs[found], ord_samples[found]
+            found = lbset_sizes[pairs] > 0
+            pairs, ord_samples = pairs[found], ord_samples[found]
+            # Sample a suitable path for each pair
+            src.append(ord_samples[:, 0])
+            dst.append(ord_samples[:, 1])
+            idx.append(rng.integers(0, lbset_sizes[pairs]))
+
+        if len(src) == 0:
+            return []
+        return list(
+            zip(
+                np.concatenate(src).tolist(),
+                np.concatenate(dst).tolist(),
+                np.concatenate(idx).tolist(),
+            )
+        )
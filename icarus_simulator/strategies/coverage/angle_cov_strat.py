@@ -1,5 +1,5 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
-from icarus_simulator.sat_core.coverage import positions_satellite_coverage
+from icarus_simulator.sat_core.coverage import cart_satellite_coverage
 
 from icarus_simulator.strategies.coverage.base_coverage_strat import BaseCoverageStrat
 from icarus_simulator.structure_definitions import SatPos, GridPos, Coverage
@@ -21,9 +21,12 @@ class AngleCovStrat(BaseCoverageStrat):
         return f"{self.min_elev_angle}°"
 
     def compute(self, grid_pos: GridPos, sat_pos: SatPos) -> Coverage:
-        coverage = positions_satellite_coverage(
-            {ka: v.to_geo_pos() for ka, v in grid_pos.items()},
-            {ka: v.to_geo_pos() for ka, v in sat_pos.items()},
+        coverage = cart_satellite_coverage(
+            grid_pos.ids.tolist(),
+            grid_pos.cartesian(on_surface=False),
+            sat_pos.ids.tolist(),
+            sat_pos.cartesian(on_surface=False),
+            sat_pos.elev,
             self.min_elev_angle,
         )
         return coverage
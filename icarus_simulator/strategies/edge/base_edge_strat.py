@@ -5,15 +5,13 @@ This class is open for custom extension, in order to create different execution
 See BaseStrategy for more details.
 """
 from abc import abstractmethod
-from typing import Dict
 
 from icarus_simulator.strategies.base_strat import BaseStrat
-from icarus_simulator.structure_definitions import Edge, TempEdgeInfo, Path, PathId
+from icarus_simulator.structure_definitions import EdgeIncidence
+from icarus_simulator.tables import PathStore, EdgeIndex
 
 
 class BaseEdgeStrat(BaseStrat):
-    @abstractmethod  # Side effects on temp_edge_data are produced
-    def compute(
-        self, temp_edge_data: Dict[Edge, TempEdgeInfo], path: Path, path_id: PathId
-    ) -> None:
+    @abstractmethod
+    def compute(self, path_store: PathStore, edge_index: EdgeIndex) -> EdgeIncidence:
         raise NotImplementedError
@@ -1,9 +1,10 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
-from typing import Dict
+import numpy as np
+import scipy.sparse as sp
 
 from icarus_simulator.strategies.edge.base_edge_strat import BaseEdgeStrat
-from icarus_simulator.structure_definitions import Path, PathId, Edge, TempEdgeInfo
-from icarus_simulator.utils import get_edges
+from icarus_simulator.structure_definitions import EdgeIncidence
+from icarus_simulator.tables import PathStore, EdgeIndex
 
 
 class BidirEdgeStrat(BaseEdgeStrat):
@@ -15,29 +16,34 @@ class BidirEdgeStrat(BaseEdgeStrat):
     def param_description(self) -> None:
         return None
 
-    # Side effects on temp_edge_data are produced
-    def compute(
-        self, temp_edge_data: Dict[Edge, TempEdgeInfo], path: Path, path_id: PathId
-    ) -> None:
-        # Convert the up and downlink to the -1 convention
-        first, last = -path[0], -path[-1]
-        path[0], path[-1] = -1, -1
-        # For each edge in each path, compute stats
-        for ed in get_edges(path):
-            inv_ed = (ed[1], ed[0])
-            if ed not in temp_edge_data:
-                # paths_through, centrality, start_points
-                temp_edge_data[ed] = TempEdgeInfo([], 0, set())
-                temp_edge_data[inv_ed] = TempEdgeInfo([], 0, set())
-            # Update paths_through
-            # IMPORTANT: paths_through will ONLY contain paths through with the edge in the same order.
-            # Also the paths through the opposite edge are through the current edge, but must be taken in reversed form.
-            temp_edge_data[ed].paths_through.append(path_id)
-            # Update edge centrality
-            temp_edge_data[ed].centrality += 1
-            temp_edge_data[inv_ed].centrality += 1
-            # Update start_points
-            temp_edge_data[ed].source_gridpoints.add(first)
-            temp_edge_data[inv_ed].source_gridpoints.add(last)
-        # Restore the path first and last (gnd) hops
-        path[0], path[-1] = -first, -last
+    def compute(self, path_store: PathStore, edge_index: EdgeIndex) -> EdgeIncidence:
+        # All the hops of all the paths, with the up and downlinks converted to the -1 convention
+        path_nums, from_nodes, to_nodes = path_store.hops()
+        from_nodes, to_nodes = np.maximum(from_nodes, -1), np.maximum(to_nodes, -1)
+        eds = edge_index.lookup(from_nodes, to_nodes)
+        inv_eds = edge_index.lookup(to_nodes, from_nodes)
+        known = (eds >= 0) & (inv_eds >= 0)
+        path_nums, eds, inv_eds = path_nums[known], eds[known], inv_eds[known]
+        num_paths, num_eds = len(path_store), len(edge_index)
+
+        # IMPORTANT: paths_through will ONLY contain paths through with the edge in the same order.
+        # Also the paths through the opposite edge are through the current edge, but must be taken in reversed form.
+        # The conversion to CSC sums the duplicates and sorts the paths of each edge.
+        paths_through = sp.coo_matrix(
+            (np.ones(len(eds)), (path_nums, eds)), shape=(num_paths, num_eds)
+        ).tocsc()
+        # The edge centrality counts the paths in both directions
+        centrality = np.bincount(eds, minlength=num_eds) + np.bincount(
+            inv_eds, minlength=num_eds
+        )
+        # The path source is a start point of the edge, the path destination of the opposite edge
+        first = -path_store.nodes[path_store.offsets[:-1]]
+        last = -path_store.nodes[path_store.offsets[1:] - 1]
+        gnds = np.concatenate((first[path_nums], last[path_nums]))
+        num_gnds = int(gnds.max()) + 1 if len(gnds) > 0 else 0
+        source_gridpoints = sp.coo_matrix(
+            (np.ones(len(gnds)), (gnds, np.concatenate((eds, inv_eds)))),
+            shape=(num_gnds, num_eds),
+        ).tocsc()
+        source_gridpoints.data[:] = 1.0  # Sets of start points
+        return EdgeIncidence(paths_through, centrality, source_gridpoints)
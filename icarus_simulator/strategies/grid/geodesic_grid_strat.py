@@ -5,7 +5,8 @@ from anti_lib import Vec
 
 from icarus_simulator.strategies.grid.base_grid_strat import BaseGridStrat
 from icarus_simulator.sat_core.planetary_const import EARTH_SURFACE
-from icarus_simulator.structure_definitions import GridPos, GridPoint
+from icarus_simulator.structure_definitions import GridPos
+from icarus_simulator.tables import GridTable
 
 
 class GeodesicGridStrat(BaseGridStrat):
@@ -46,13 +47,14 @@ class GeodesicGridStrat(BaseGridStrat):
                 single_face_grid, freq, False, [verts[face[i]] for i in range(3)], face
             )
         points = [p.unit().v for p in points]  # Project onto sphere
-        grid = {
-            idx: GridPoint.from_geo_pos(cart2geo(p)) for idx, p in enumerate(points)
-        }
-        sur = EARTH_SURFACE / len(grid)
-        for idx in grid:
-            grid[idx].surface = sur
-        return grid
+        geo = [cart2geo(p) for p in points]
+        return GridTable(
+            ids=range(len(geo)),
+            lat=[g["lat"] for g in geo],
+            lon=[g["lon"] for g in geo],
+            elev=[g["elev"] for g in geo],
+            surface=[EARTH_SURFACE / len(geo)] * len(geo),
+        )
 
 
 def cart2geo(point):
@@ -5,7 +5,7 @@ from netCDF4 import Dataset
 from scipy.spatial.ckdtree import cKDTree
 import numpy as np
 
-from icarus_simulator.sat_core.coordinate_util import geo2cart
+from icarus_simulator.sat_core.coordinate_util import geo2cart_array
 from icarus_simulator.strategies.grid_weight.base_weight_strat import BaseWeightStrat
 from icarus_simulator.structure_definitions import GridPos
 
@@ -38,44 +38,24 @@ class GDPWeightStrat(BaseWeightStrat):
         # Add the default weight for this unweighted grid
         # Load the GDP data
         gdp_matrix = load_dataset(self.dataset)
-        lat_size, lon_size = gdp_matrix.shape
-        gdp_cart = []
-        gdp_values = []
-        idx = 0
-        gdp_grid = {}
-        for lat_id in range(0, lat_size):
-            for lon_id in range(0, lon_size):
-                value = gdp_matrix[lat_id, lon_id]
-                if value > 0:
-                    lat = get_lat(lat_id)
-                    lon = get_lon(lon_id)
-                    gdp_cart.append(geo2cart({"elev": 0, "lon": lon, "lat": lat}))
-                    gdp_grid[idx] = {"lat": lat, "lon": lon, "value": value}
-                    gdp_values.append(value)
-                    idx += 1
-
-        # Generate the homogeneous grid
-        grid_cart = np.zeros((len(grid_pos), 3))
-        for i in grid_pos:
-            grid_cart[i] = geo2cart(
-                {"elev": 0, "lon": grid_pos[i].lon, "lat": grid_pos[i].lat}
-            )
-            grid_pos[i].weight = 0.0
+        # Positive cells, in row-major order
+        lat_ids, lon_ids = np.nonzero(gdp_matrix > 0)
+        gdp_values = gdp_matrix[lat_ids, lon_ids]
+        gdp_cart = geo2cart_array(
+            get_lat(lat_ids), get_lon(lon_ids), np.zeros(len(lat_ids))
+        )
 
         # Put the homogeneous grid into a KD-tree and query all the points, summing values to the closest grid point
-        kd = cKDTree(grid_cart)
-        for gdp_idx in range(len(gdp_cart)):
-            _, closest_grid_idx = kd.query(gdp_cart[gdp_idx], k=1)
-            grid_pos[closest_grid_idx].weight += gdp_values[gdp_idx]
-
-        # Remove the zero-weight points
-        grid_pos = {idx: point for idx, point in grid_pos.items() if point.weight > 0.0}
-        # for idx, point in grid_s.items():
-        #    grid_s[idx].weight = math.log10(point.weight)
-        max_single_gdp = max(grid_pos.values(), key=lambda ka: ka.weight).weight
-        for gp in grid_pos:
-            grid_pos[gp].weight = grid_pos[gp].weight / max_single_gdp
-        return grid_pos
+        kd = cKDTree(grid_pos.cartesian())
+        _, closest_rows = kd.query(gdp_cart, k=1)
+        weight = np.zeros(len(grid_pos))
+        np.add.at(weight, closest_rows, gdp_values)
+
+        # Remove the zero-weight points. The input table is not modified
+        positive = weight > 0.0
+        weight = weight[positive]
+        # weight = np.log10(weight)
+        return grid_pos.filter(positive).with_weight(weight / np.max(weight))
 
 
 # Downsample an ndarray to a new shape by summing
@@ -1,4 +1,6 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
+import numpy as np
+
 from icarus_simulator.strategies.grid_weight.base_weight_strat import BaseWeightStrat
 from icarus_simulator.structure_definitions import GridPos
 
@@ -14,6 +16,4 @@ class UniformWeightStrat(BaseWeightStrat):
 
     def compute(self, grid_pos: GridPos) -> GridPos:
         # Add the default weight for this unweighted grid
-        for idx in grid_pos:
-            grid_pos[idx].weight = 1.0
-        return grid_pos
+        return grid_pos.with_weight(np.ones(len(grid_pos)))
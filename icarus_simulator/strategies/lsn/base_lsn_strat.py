@@ -7,13 +7,17 @@ See BaseStrategy for more details.
 import networkx as nx
 
 from abc import abstractmethod
-from typing import Tuple, List
+from typing import Tuple
 
 from icarus_simulator.strategies.base_strat import BaseStrat
-from icarus_simulator.structure_definitions import SatPos, IslInfo
+from icarus_simulator.structure_definitions import SatPos, Isls
 
 
 class BaseLSNStrat(BaseStrat):
     @abstractmethod
-    def compute(self) -> Tuple[SatPos, nx.Graph, List[IslInfo]]:
+    def compute(self) -> Tuple[SatPos, nx.Graph, Isls]:
+        raise NotImplementedError
+
+    def at_epoch_offset(self, offset: float) -> "BaseLSNStrat":
+        # Copy of the strategy computing the network the given seconds after its configured time, for time series
         raise NotImplementedError
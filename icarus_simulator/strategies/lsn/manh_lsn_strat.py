@@ -1,12 +1,20 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
-
+"""
+The constellation, i.e. the satellite orbits, is created once for each set of orbital parameters, and shared by all the
+strategy instances. Only the satellite positions and the ISLs are computed for each epoch offset, so that time series
+of many snapshots do not repeat the constellation setup.
+"""
+import copy
+import threading
 import networkx as nx
 
-from typing import Tuple, List
+from functools import lru_cache
+from typing import Tuple
 
-from icarus_simulator.sat_core import WalkerConstellationNetwork
+from icarus_simulator.sat_core import WalkerConstellationNetwork, ConstellationNetwork
 from icarus_simulator.strategies.lsn.base_lsn_strat import BaseLSNStrat
-from icarus_simulator.structure_definitions import SatPos, GeoPoint, IslInfo
+from icarus_simulator.structure_definitions import SatPos, Isls
+from icarus_simulator.tables import SatTable, IslTable
 
 
 class ManhLSNStrat(BaseLSNStrat):
@@ -52,21 +60,64 @@ class ManhLSNStrat(BaseLSNStrat):
             f"{str(self.epoch).replace(' ' , '').replace(':', '').replace('/', '')}"
         )
 
-    def compute(self) -> Tuple[SatPos, nx.Graph, List[IslInfo]]:
-        walker = WalkerConstellationNetwork(
+    def at_epoch_offset(self, offset: float) -> "ManhLSNStrat":
+        strat = copy.copy(self)
+        # The series offset is added to the configured one
+        configured = ((self.hrs * 60 + self.mins) * 60 + self.secs) * 1000 + self.millis
+        secs, millis = divmod(configured + round(offset * 1000), 1000)
+        mins, strat.secs = divmod(secs, 60)
+        strat.hrs, strat.mins = divmod(mins, 60)
+        strat.millis = millis
+        return strat
+
+    def compute(self) -> Tuple[SatPos, nx.Graph, Isls]:
+        walker = _get_walker(
             self.sats_per_orbit,
             self.orbits,
             self.inclination,
             self.epoch,
             self.f,
-            elevation=self.elevation,
+            self.elevation,
+        )
+        # The satellite objects are shared, and must not be propagated concurrently
+        with _propagation_lock:
+            geo_pos = walker.const.compute_positions_at_epoch_offset(
+                self.hrs, self.mins, self.secs, self.millis
+            )
+        cnet = ConstellationNetwork(
+            geo_pos, walker.num_sat_per_orbit, walker.num_orbits, walker.max_shift
+        )
+        cnet.generate_network(walker.motif)
+        sats = cnet.get_sats()
+        sat_pos = SatTable(
+            ids=list(sats.keys()),
+            lat=[val["lat"] for val in sats.values()],
+            lon=[val["lon"] for val in sats.values()],
+            elev=[val["elev"] for val in sats.values()],
+        )
+        nw = cnet.network
+        isls = cnet.get_isls()
+        isls = IslTable(
+            sat1=[isl["sat1"] for isl in isls],
+            sat2=[isl["sat2"] for isl in isls],
+            length=[isl["length"] for isl in isls],
         )
-        walker.compute_network_at_epoch_offset(self.hrs, self.mins, self.secs)
-        sat_pos = {
-            key: GeoPoint.from_geo_pos(val)
-            for key, val in walker.cnet.get_sats().items()
-        }
-        nw = walker.cnet.network
-        isls = walker.cnet.get_isls()
-        isls = [IslInfo(isl["sat1"], isl["sat2"], isl["length"]) for isl in isls]
         return sat_pos, nw, isls
+
+
+_propagation_lock = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _get_walker(
+    sats_per_orbit: int,
+    orbits: int,
+    inclination: int,
+    epoch: str,
+    f: int,
+    elevation: int,
+) -> WalkerConstellationNetwork:
+    with _propagation_lock:
+        return WalkerConstellationNetwork(
+            sats_per_orbit, orbits, inclination, epoch, f, elevation=elevation
+        )
@@ -1,9 +1,9 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
 import networkx as nx
-from geopy.distance import great_circle
 
 from icarus_simulator.strategies.routing.base_routing_strat import BaseRoutingStrat
 from icarus_simulator.structure_definitions import GridPos, SdPair, Coverage, LbSet
+from icarus_simulator.utils import great_circle_dist
 
 
 class KDSRoutStrat(BaseRoutingStrat):
@@ -26,11 +26,9 @@ class KDSRoutStrat(BaseRoutingStrat):
         self, pair: SdPair, grid: GridPos, network: nx.Graph, coverage: Coverage
     ) -> LbSet:
         in_grid, out_grid = pair[0], pair[1]
+        in_pos, out_pos = grid[in_grid], grid[out_grid]
         fiber_len = (
-            great_circle(
-                (grid[in_grid].lat, grid[in_grid].lon),
-                (grid[out_grid].lat, grid[out_grid].lon),
-            ).meters
+            great_circle_dist(in_pos.lat, in_pos.lon, out_pos.lat, out_pos.lon)
             * self.desirability_stretch
         )
         # Add the gnd nodes
@@ -9,7 +9,7 @@ from typing import List
 
 from icarus_simulator.strategies.base_strat import BaseStrat
 from icarus_simulator.structure_definitions import (
-    BwData,
+    AttackContext,
     AttackData,
     PathEdgeData,
     Edge,
@@ -20,7 +20,7 @@ class BaseZoneBneckStrat(BaseStrat):
     @abstractmethod
     def compute(
         self,
-        bw_data: BwData,
+        atk_ctx: AttackContext,
         atk_data: AttackData,
         path_edges: PathEdgeData,
         tot_cross_zone_paths: int,
@@ -1,5 +1,6 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
-import copy
+import heapq
+import numpy as np
 
 from typing import List
 
@@ -10,7 +11,7 @@ from icarus_simulator.structure_definitions import (
     PathEdgeData,
     Edge,
     AttackData,
-    BwData,
+    AttackContext,
 )
 
 
@@ -25,84 +26,124 @@ class DetectBneckStrat(BaseZoneBneckStrat):
 
     def compute(
         self,
-        bw_data: BwData,
+        atk_ctx: AttackContext,
         atk_data: AttackData,
         path_edges: PathEdgeData,
         tot_cross_zone_paths: int,
     ) -> List[List[Edge]]:
-        incrs = {ed: atk_data[ed].detectability for ed in path_edges}
-        costs = {ed: (incrs[ed] / len(path_edges[ed])) for ed in path_edges}
-        sorted_path_edges = sorted(costs.items(), key=lambda k: k[1])
+        edges = list(path_edges.keys())
+        edge_idxs = {ed: i for i, ed in enumerate(edges)}
+        incrs = [atk_data[ed].detectability for ed in edges]
+        costs = [incrs[i] / len(path_edges[ed]) for i, ed in enumerate(edges)]
+        sorted_idxs = sorted(range(len(edges)), key=lambda i: costs[i])
+        # The paths of each edge as a bitmask
+        masks = [_to_mask(path_edges[ed]) for ed in edges]
 
         # Then pick edges until full coverage is reached, with 3 specific attempts
-        inf = 90000000000000  # High value given to the already chosen edges
         bnecks = []
         for attempt_id in range(3):
-            costs_copy = copy.deepcopy(costs)
-            covered_paths, picked_edges, best_ed = set(), [], None
-
             # Force insertion of the 1st, 2nd and 3rd best elements in each attempt, to shake things up
-            try:
-                best_ed = sorted_path_edges[attempt_id][0]  # Get the key of the edge
-            except IndexError:  # The edge cannot be inserted, not enough candidates
+            if attempt_id >= len(sorted_idxs):  # Not enough candidates
                 continue
-            picked_edges.append(best_ed)
-            costs_copy[best_ed] = inf
-            covered_paths.update(path_edges[best_ed])
-
-            # Insert the rest of the edges
-            while len(covered_paths) < tot_cross_zone_paths:
-                # First, update the cost function to only include the non-covered paths
-                # costs[ed] = detectability / new_paths_covered
-                for ed in costs_copy:
-                    if costs_copy[ed] < inf:
-                        diff_len = len(path_edges[ed].difference(covered_paths))
-                        if diff_len == 0:
-                            costs_copy[ed] = inf  # useless, does not cover anything new
-                        else:
-                            costs_copy[ed] = incrs[ed] / diff_len
-
-                best_ed = min(costs_copy, key=lambda k: costs_copy[k])
-                if (
-                    costs_copy[best_ed] == inf
-                ):  # No more edges to choose from, we chose all of them
-                    break
-                picked_edges.append(best_ed)
-                costs_copy[best_ed] = inf
-                covered_paths.update(path_edges[best_ed])
-
-            # Greedily remove the redundant links
-            # Criterion (minimised, maximised): (min_redundancy, atk_bw)
-            redundancies = [0] * tot_cross_zone_paths
-            for pe in picked_edges:
-                for p in path_edges[pe]:
-                    redundancies[p] += 1
-            # Pick the most redundant one each time and remove it
-            while True:
-                removable_edges = []
-                for pe in picked_edges:
-                    removable, min_redundancy = True, 999999
-                    for p in path_edges[pe]:
-                        min_redundancy = min(min_redundancy, redundancies[p])
-                        if redundancies[p] - 1 == 0:
-                            removable = False
-                            break
-                    if removable:
-                        removable_edges.append(
-                            (min_redundancy, bw_data[pe].get_remaining_bw(), pe)
-                        )
-                if len(removable_edges) == 0:
-                    break
-                chosen = min(removable_edges, key=lambda k: (k[0], -k[1]))[2]
-                for p in path_edges[chosen]:
-                    redundancies[p] -= 1
-                picked_edges.remove(chosen)
+            best = sorted_idxs[attempt_id]
+            picked = _greedy_cover(best, masks, incrs, costs, tot_cross_zone_paths)
+            picked_edges = _remove_redundant(
+                [edges[i] for i in picked], atk_ctx, path_edges, tot_cross_zone_paths
+            )
 
             # Check if the found bottleneck covers all the paths to be covered
-            covered_paths = set()
+            covered = 0
             for link in picked_edges:
-                covered_paths.update(path_edges[link])
-            if len(covered_paths) == tot_cross_zone_paths:
+                covered |= masks[edge_idxs[link]]
+            if _popcount(covered) == tot_cross_zone_paths:
                 bnecks.append(picked_edges)
 
         return bnecks
+
+
+def _greedy_cover(
+    first: int,
+    masks: List[int],
+    incrs: List[float],
+    costs: List[float],
+    tot_paths: int,
+) -> List[int]:
+    # Pick the edge with the lowest cost = detectability / new_paths_covered until all the paths are covered, ties
+    # are broken by the edge order. The cost of an edge can only grow as paths are covered, so the costs in the heap
+    # are lower bounds, and only the top one is updated (lazy greedy). The edges with negative detectability get
+    # cheaper instead, so they are updated at each pick
+    covered, picked = masks[first], [first]
+    heap = [(costs[i], i) for i in range(len(masks)) if i != first and incrs[i] >= 0]
+    heapq.heapify(heap)
+    negatives = [i for i in range(len(masks)) if i != first and incrs[i] < 0]
+    while _popcount(covered) < tot_paths:
+        best = None
+        for i in negatives:
+            diff_len = _popcount(masks[i] & ~covered)
+            if diff_len > 0 and (best is None or (incrs[i] / diff_len, i) < best):
+                best = (incrs[i] / diff_len, i)
+        negatives = [i for i in negatives if masks[i] & ~covered]
+        while len(heap) > 0:
+            cost, i = heap[0]
+            diff_len = _popcount(masks[i] & ~covered)
+            if diff_len == 0:  # Useless, does not cover anything new
+                heapq.heappop(heap)
+            elif incrs[i] / diff_len == cost:  # Up to date, this is the best edge
+                break
+            else:
+                heapq.heapreplace(heap, (incrs[i] / diff_len, i))
+        if len(heap) > 0 and (best is None or heap[0] < best):
+            best = heapq.heappop(heap)
+        elif best is not None:
+            negatives.remove(best[1])
+        if best is None:  # No more edges to choose from, we chose all of them
+            break
+        picked.append(best[1])
+        covered |= masks[best[1]]
+    return picked
+
+
+def _remove_redundant(
+    picked_edges: List[Edge],
+    atk_ctx: AttackContext,
+    path_edges: PathEdgeData,
+    tot_paths: int,
+) -> List[Edge]:
+    # Greedily remove the redundant links
+    # Criterion (minimised, maximised): (min_redundancy, atk_bw)
+    # An edge is removable if all its paths are covered at least twice
+    picked_edges = list(picked_edges)
+    edge_paths = [np.fromiter(path_edges[pe], dtype=np.int64) for pe in picked_edges]
+    redundancies = np.zeros(tot_paths, dtype=np.int64)
+    for paths in edge_paths:
+        np.add.at(redundancies, paths, 1)
+    # Pick the most redundant one each time and remove it
+    while len(picked_edges) > 0:
+        lens = np.array([len(paths) for paths in edge_paths])
+        min_redundancies = np.minimum.reduceat(
+            redundancies[np.concatenate(edge_paths)], np.cumsum(lens) - lens
+        )
+        removable = np.flatnonzero(min_redundancies > 1)
+        if len(removable) == 0:
+            break
+        chosen = min(
+            removable,
+            key=lambda r: (
+                min_redundancies[r],
+                -atk_ctx.get_remaining_bw(picked_edges[r]),
+            ),
+        )
+        redundancies[edge_paths[chosen]] -= 1
+        del picked_edges[chosen], edge_paths[chosen]
+    return picked_edges
+
+
+def _to_mask(paths) -> int:
+    mask = 0
+    for p in paths:
+        mask |= 1 << p
+    return mask
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
@@ -17,3 +17,11 @@ class BaseZoneBuildStrat(BaseStrat):
         self, grid_pos: GridPos, center1: int, center2: int
     ) -> Tuple[List[int], List[int]]:
         raise NotImplementedError
+
+    def prepare(self, grid_pos: GridPos) -> None:
+        # Called once per phase, before the samples are processed. Override to precompute indices on the grid
+        return
+
+    def release(self) -> None:
+        # Called once per phase, after the samples are processed. Override to drop what prepare() built
+        return
@@ -1,10 +1,9 @@
 #  2020 Tommaso Ciussani and Giacomo Giuliari
 import numpy as np
 
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 from scipy.spatial.ckdtree import cKDTree
 
-from icarus_simulator.sat_core.coordinate_util import geo2cart
 from icarus_simulator.strategies.zone_build.base_zone_build_strat import (
     BaseZoneBuildStrat,
 )
@@ -15,6 +14,8 @@ class KclosestZoneStrat(BaseZoneBuildStrat):
     def __init__(self, size: int, **kwargs):
         super().__init__()
         self.size = size
+        self._grid_pos: Optional[GridPos] = None
+        self._neighbors: Optional[np.ndarray] = None
         if len(kwargs) > 0:
             pass  # Appease the unused param inspection
 
@@ -26,25 +27,31 @@ class KclosestZoneStrat(BaseZoneBuildStrat):
     def param_description(self) -> str:
         return f"{self.size}"
 
+    def prepare(self, grid_pos: GridPos) -> None:
+        self._get_neighbors(grid_pos)
+
+    def release(self) -> None:
+        # The table references the grid, which must not outlive the phase
+        self._grid_pos, self._neighbors = None, None
+
     def compute(
         self, grid_pos: GridPos, center1: int, center2: int
     ) -> Tuple[List[int], List[int]]:
-        grid_cart = np.zeros((len(grid_pos), 3))
-        grid_map = {}
-        for i, grid_id in enumerate(grid_pos):
-            grid_map[i] = grid_id
-            grid_cart[i] = geo2cart(
-                {"elev": 0, "lon": grid_pos[grid_id].lon, "lat": grid_pos[grid_id].lat}
-            )
-
-        # Put the homogeneous grid into a KD-tree and query all the points, summing values to the closest grid point
+        # The zones are rows of the table of the k points closest to every grid point
+        neighbors = self._get_neighbors(grid_pos)
         closest = []
-        kd = cKDTree(grid_cart)
-        for point in [grid_pos[center1], grid_pos[center2]]:
-            _, closest_grid_indices = kd.query(
-                geo2cart({"elev": 0, "lon": point.lon, "lat": point.lat}), k=self.size
-            )
-            if type(closest_grid_indices) == int:
-                closest_grid_indices = [closest_grid_indices]
-            closest.append([grid_map[idx] for idx in closest_grid_indices])
+        for row in grid_pos.rows([center1, center2]):
+            closest.append(neighbors[row].tolist())
         return closest[0], closest[1]
+
+    def _get_neighbors(self, grid_pos: GridPos) -> np.ndarray:
+        # The table is built once for the grid of the phase, and inherited by the worker processes
+        if self._neighbors is None or self._grid_pos is not grid_pos:
+            grid_cart = grid_pos.cartesian()
+
+            # Put the homogeneous grid into a KD-tree and query the k points closest to all the points at once
+            kd = cKDTree(grid_cart)
+            _, closest_rows = kd.query(grid_cart, k=self.size)
+            closest_rows = closest_rows.reshape(len(grid_cart), -1)
+            self._grid_pos, self._neighbors = grid_pos, grid_pos.ids[closest_rows]
+        return self._neighbors
@@ -25,9 +25,9 @@ class RandZoneStrat(BaseZoneSelectStrat):
         return f"{self.samples}"
 
     def compute(self, grid_pos: GridPos) -> List[Tuple[int, int]]:
-        random.seed("Icarus")
+        rng = random.Random("Icarus")  # Local generator, phases can run concurrently
         indices, locs, grid_pts = [], set(), list(grid_pos.keys())
         for i in range(self.samples):
-            loc1, loc2 = tuple(random.sample(grid_pts, 2))
+            loc1, loc2 = tuple(rng.sample(grid_pts, 2))
             indices.append((loc1, loc2))
         return indices
@@ -3,10 +3,14 @@
 Definitions for aliases and custom data structures used in the predefined phases and strategies of the library.
 """
 
+import numpy as np
+import scipy.sparse as sp
+
 from dataclasses import dataclass, field
 from typing import List, Tuple, Dict, Any, Set, Optional
 
 from .sat_core.coordinate_util import GeodeticPosition
+from .tables import GridTable, SatTable, IslTable, EdgeTable, BwTable, EdgeIndex
 
 Length = float
 Pname = str
@@ -44,8 +48,10 @@ class IslInfo:
 
 
 # List definitions associate each position to an index
-SatPos = Dict[int, GeoPoint]
-GridPos = Dict[int, GridPoint]
+# The tables are array-backed, with a dict-compatible (list-compatible for Isls) view of GeoPoint, GridPoint and IslInfo
+SatPos = SatTable
+Isls = IslTable
+GridPos = GridTable
 
 # Coverage -> first id is the gnd index, second is the satellite, float is the distance gnd-sat
 Coverage = Dict[int, Dict[int, Length]]
@@ -66,10 +72,11 @@ PathEdgeData = Dict[Edge, Set[int]]
 
 
 @dataclass
-class TempEdgeInfo:
-    paths_through: List[PathId]
-    centrality: float
-    source_gridpoints: Set[int]
+class EdgeIncidence:
+    # Columns are the edges of an EdgeIndex, paths are numbered as in a PathStore
+    paths_through: sp.csc_matrix  # Path x edge, nonzero if the path goes through the edge
+    centrality: np.ndarray  # Number of paths through each edge
+    source_gridpoints: sp.csc_matrix  # Grid id x edge, nonzero if the grid point is a source for the edge
 
 
 @dataclass
@@ -79,7 +86,8 @@ class EdgeInfo:
     cov_centr: float = 0.0
 
 
-EdgeData = Dict[Edge, EdgeInfo]  # The Edge here must be ordered numerically
+# Array-backed, with a dict-compatible view of EdgeInfo-like records. The paths through are indexed by integer numbers
+EdgeData = EdgeTable
 
 
 # Traffic matrix
@@ -92,7 +100,7 @@ class BwInfo:
         return self.capacity - self.idle_bw
 
 
-BwData = Dict[Edge, BwInfo]
+BwData = BwTable  # Array-backed, with a dict-compatible view of BwInfo-like records
 
 
 # SSingle-target attacks
@@ -118,6 +126,35 @@ class AttackInfo:
 
 AttackData = Dict[Edge, Optional[AttackInfo]]
 
+
+# Invariants of the attack phases, computed once per phase and passed to all the attack strategies
+@dataclass
+class AttackContext:
+    bw_data: BwData
+    remaining_bw: np.ndarray  # Remaining bandwidth of each edge, in the row order of bw_data
+    uplink_caps: np.ndarray  # Capacity of each uplink, 0 for the other edges
+    uplink_size: int  # Max uplink capacity, in case of weird bw assignments. Maximum uplink increase possible
+    isl_num: int  # Number of bidirectional ISLs
+    edge_index: EdgeIndex  # Edge numbers are the rows of bw_data
+
+    @staticmethod
+    def from_bw_data(bw_data: BwData) -> "AttackContext":
+        is_uplink = bw_data.from_nodes == -1
+        is_isl = (bw_data.from_nodes != -1) & (bw_data.to_nodes != -1)
+        uplink_caps = np.where(is_uplink, bw_data.capacity, 0)
+        return AttackContext(
+            bw_data=bw_data,
+            remaining_bw=bw_data.remaining_bw(),
+            uplink_caps=uplink_caps,
+            uplink_size=int(np.max(uplink_caps[is_uplink])),
+            isl_num=int(np.count_nonzero(is_isl) / 2),
+            edge_index=EdgeIndex(bw_data.edges()),
+        )
+
+    def get_remaining_bw(self, edge: Edge) -> float:
+        return self.remaining_bw[self.bw_data.index[edge]].item()
+
+
 Zone = List[int]
 TupleZone = Tuple[int, ...]
 
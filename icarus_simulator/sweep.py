@@ -0,0 +1,58 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+"""
+Parameter sweep over multiple simulation runs, e.g. the configurations generated by configuration.parse_config().
+
+Instead of running an IcarusSimulator for each configuration, all the runs are added to a single phase graph. As the
+phase keys depend on the phase configuration and on all the upstream keys, two runs share a node exactly when they share
+the whole computation prefix leading to it. For example, runs that only differ in the routing k share the LSN, Grid and
+Coverage nodes, and fan out from the Routing phase on.
+Every distinct phase is therefore computed (or read) once, its result stays in memory until the last consumer across
+all runs finishes, and the phases of all the runs are scheduled together on the available cores.
+
+Properties of a run are accessed with get_property(property_name, run_id), after compute_simulation(). The results
+materialized by get_property() stay in memory until release_run(run_id) is called, e.g. once the run has been plotted.
+"""
+from typing import List, Dict, Tuple, Optional
+
+from icarus_simulator.icarus_simulator import IcarusSimulator
+from icarus_simulator.phases.base_phase import BasePhase
+from icarus_simulator.structure_definitions import Pname
+
+
+class ParameterSweep(IcarusSimulator):
+    def __init__(
+        self,
+        runs: List[List[BasePhase]],
+        results_directory: str,
+        verify_cache: bool = False,
+        retain: Optional[List[Pname]] = None,
+        num_cores: Optional[int] = None,
+    ):
+        super().__init__([], results_directory, verify_cache, retain, num_cores)
+        self.runs = runs
+        self.run_producers: List[Dict[Pname, Tuple[int, int]]] = []
+
+    def get_property(self, property_name: str, run_id: int = 0):
+        producers = self.run_producers[run_id]
+        node_idx, out_idx = producers[property_name]  # Raises with wrong name
+        return self._materialize(node_idx)[out_idx]
+
+    def release_run(self, run_id: int) -> None:
+        # Release the results of a run that were materialized by get_property(), following the usual retain rules.
+        # Results still needed by a phase are kept, the released ones are reloaded or recomputed on the next access
+        for node_idx in set(idx for idx, _ in self.run_producers[run_id].values()):
+            if self.nodes[node_idx].finished:
+                self._release_if_dead(node_idx)
+
+    def compute_simulation(self):
+        self._reset_graph()
+        self.run_producers = []
+        for phases in self.runs:
+            producers, _, _ = self._add_phases(phases)
+            self.run_producers.append(producers)
+        total = sum(len(phases) for phases in self.runs)
+        print(
+            f"Sweep: {len(self.runs)} runs, {total} phases, {len(self.nodes)} distinct"
+        )
+        print("")
+        self._run_graph()
@@ -0,0 +1,582 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+"""
+Array-backed tables for the positional properties, stored as a struct of arrays: one numpy column per field.
+Strategies can use the columns directly (e.g. grid.lat, sats.cartesian()), without rebuilding arrays from the records.
+
+For compatibility with the dictionary-based structures, a position table (SatTable, GridTable) has an id column and
+behaves as a read-only dictionary from id to record: keys(), values(), items(), len(), iteration and item access keep
+the row order. Likewise, an IslTable behaves as a read-only list of records, and the edge tables (EdgeTable, BwTable) as
+read-only dictionaries from directed edge to record. Records are lightweight slotted objects,
+whose attributes read the table columns. to_dict() and to_list() convert to plain structures.
+
+Tables extend ColumnarProperty, and are therefore persisted as raw columns and memory-mapped when read, see
+result_store.py. Columns of a loaded table are read-only, use copy() to obtain a writable table.
+"""
+import numpy as np
+
+from typing import Dict, Iterator, List, Tuple, Optional, Sequence
+
+from icarus_simulator.result_store import ColumnarProperty
+from icarus_simulator.sat_core.coordinate_util import GeodeticPosition, geo2cart_array
+from icarus_simulator.utils import unit_vectors
+
+
+def _column_property(column: str) -> property:
+    # Read-only attribute of a record, reading the row of the table column
+    def getter(record) -> float:
+        return getattr(record._table, column)[record._row].item()
+
+    return property(getter)
+
+
+class _Record:
+    __slots__ = ("_table", "_row")
+    FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self, table, row: int):
+        self._table = table
+        self._row = row
+
+    def __eq__(self, other) -> bool:
+        return all(getattr(self, f) == getattr(other, f, None) for f in self.FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{f}={getattr(self, f)}" for f in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class GeoRecord(_Record):
+    __slots__ = ()
+    FIELDS = ("lat", "lon", "elev")
+    lat = _column_property("lat")
+    lon = _column_property("lon")
+    elev = _column_property("elev")
+
+    def to_geo_pos(self) -> GeodeticPosition:
+        return {"lat": self.lat, "lon": self.lon, "elev": self.elev}
+
+
+class GridRecord(GeoRecord):
+    __slots__ = ()
+    FIELDS = ("lat", "lon", "elev", "weight", "surface")
+    weight = _column_property("weight")
+    surface = _column_property("surface")
+
+
+class EdgeRecord(_Record):
+    __slots__ = ()
+    FIELDS = ("paths_through", "centrality", "cov_centr")
+    centrality = _column_property("centrality")
+    cov_centr = _column_property("cov_centr")
+
+    @property
+    def path_nums(self) -> np.ndarray:
+        return self._table.path_nums_at(self._row)
+
+    @property
+    def paths_through(self) -> List[Tuple[int, int, int]]:
+        return self._table.path_ids(self.path_nums)
+
+
+class BwRecord(_Record):
+    __slots__ = ()
+    FIELDS = ("idle_bw", "capacity")
+    idle_bw = _column_property("idle_bw")
+    capacity = _column_property("capacity")
+
+    def get_remaining_bw(self) -> float:
+        return self.capacity - self.idle_bw
+
+
+class IslRecord(_Record):
+    __slots__ = ()
+    FIELDS = ("sat1", "sat2", "length")
+    sat1 = _column_property("sat1")
+    sat2 = _column_property("sat2")
+    length = _column_property("length")
+
+
+class _ColumnTable(ColumnarProperty):
+    # A table whose constructor takes the COLUMNS arrays, in order
+    COLUMNS: Tuple[str, ...] = ()
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        return {col: getattr(self, col) for col in self.COLUMNS}
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "_ColumnTable":
+        return cls(*[columns[col] for col in cls.COLUMNS])
+
+    def __getstate__(self):
+        # Indices are rebuilt when needed
+        return self.to_columns()
+
+    def __setstate__(self, state):
+        self.__init__(*[state[col] for col in self.COLUMNS])
+
+
+class PositionTable(_ColumnTable):
+    COLUMNS = ("ids", "lat", "lon", "elev")
+    RECORD = GeoRecord
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        lat: Sequence[float],
+        lon: Sequence[float],
+        elev: Optional[Sequence[float]] = None,
+    ):
+        self.ids: np.ndarray = np.asarray(ids, dtype=np.int64)
+        self.lat: np.ndarray = np.asarray(lat, dtype=np.float64)
+        self.lon: np.ndarray = np.asarray(lon, dtype=np.float64)
+        self.elev: np.ndarray = _column(elev, len(self.ids))
+        self._index: Optional[Dict[int, int]] = None
+
+    # Array operations
+    @property
+    def index(self) -> Dict[int, int]:
+        # Map from id to row, built at the first access
+        if self._index is None:
+            self._index = {pos_id: row for row, pos_id in enumerate(self.ids.tolist())}
+        return self._index
+
+    def rows(self, ids: Sequence[int]) -> np.ndarray:
+        index = self.index
+        return np.array([index[pos_id] for pos_id in ids], dtype=np.int64)
+
+    def cartesian(self, on_surface: bool = True) -> np.ndarray:
+        # Cartesian coordinates of all points, shape (n, 3). The elevation is ignored if on_surface
+        elev = np.zeros(len(self)) if on_surface else self.elev
+        return geo2cart_array(self.lat, self.lon, elev)
+
+    def unit_vectors(self, rows: Optional[Sequence[int]] = None) -> np.ndarray:
+        # Unit vectors of the given rows (all by default), for the great-circle distances of utils.py
+        if rows is None:
+            return unit_vectors(self.lat, self.lon)
+        rows = np.asarray(rows, dtype=np.int64)
+        return unit_vectors(self.lat[rows], self.lon[rows])
+
+    def take(self, rows: Sequence[int]) -> "PositionTable":
+        # New table with the given rows, in the given order
+        rows = np.asarray(rows, dtype=np.int64)
+        return type(self)(*[getattr(self, col)[rows] for col in self.COLUMNS])
+
+    def filter(self, mask: Sequence[bool]) -> "PositionTable":
+        return self.take(np.flatnonzero(mask))
+
+    def copy(self) -> "PositionTable":
+        return type(self)(*[np.array(getattr(self, col)) for col in self.COLUMNS])
+
+    def relabel(self, mapping: Dict[int, int]) -> None:
+        # Change the ids in mapping, in place. As with a dictionary, relabeled points are moved to the end
+        moved = [self.index[old] for old in mapping if old in self.index]
+        if len(moved) == 0:
+            return
+        kept = np.ones(len(self), dtype=bool)
+        kept[moved] = False
+        order = np.concatenate((np.flatnonzero(kept), moved))
+        relabeled = self.take(order)
+        relabeled.ids[len(order) - len(moved) :] = [
+            mapping[int(self.ids[row])] for row in moved
+        ]
+        for col in self.COLUMNS:
+            setattr(self, col, getattr(relabeled, col))
+        self._index = None
+
+    # Legacy conversions
+    @classmethod
+    def from_dict(cls, points: Dict[int, object]) -> "PositionTable":
+        # From a dictionary of GeoPoint-like objects
+        return cls(
+            list(points.keys()),
+            *[[getattr(p, col) for p in points.values()] for col in cls.COLUMNS[1:]],
+        )
+
+    def to_dict(self) -> Dict[int, GeoRecord]:
+        return dict(self.items())
+
+    # Read-only dictionary view
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.index)
+
+    def __contains__(self, pos_id) -> bool:
+        return pos_id in self.index
+
+    def __getitem__(self, pos_id: int) -> GeoRecord:
+        return self.RECORD(self, self.index[pos_id])  # Raises with a wrong id
+
+    def get(self, pos_id: int, default=None) -> Optional[GeoRecord]:
+        if pos_id not in self.index:
+            return default
+        return self[pos_id]
+
+    def keys(self):
+        return self.index.keys()
+
+    def values(self) -> List[GeoRecord]:
+        return [self.RECORD(self, row) for row in range(len(self))]
+
+    def items(self) -> Iterator[Tuple[int, GeoRecord]]:
+        for pos_id, row in self.index.items():
+            yield pos_id, self.RECORD(self, row)
+
+
+class SatTable(PositionTable):
+    pass
+
+
+class GridTable(PositionTable):
+    COLUMNS = ("ids", "lat", "lon", "elev", "weight", "surface")
+    RECORD = GridRecord
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        lat: Sequence[float],
+        lon: Sequence[float],
+        elev: Optional[Sequence[float]] = None,
+        weight: Optional[Sequence[float]] = None,
+        surface: Optional[Sequence[float]] = None,
+    ):
+        super().__init__(ids, lat, lon, elev)
+        self.weight: np.ndarray = _column(weight, len(self.ids))
+        self.surface: np.ndarray = _column(surface, len(self.ids))
+
+    def with_weight(self, weight: Sequence[float]) -> "GridTable":
+        # New table with a fresh weight column, the other columns are shared as they are never written
+        return GridTable(
+            self.ids,
+            self.lat,
+            self.lon,
+            self.elev,
+            np.array(weight, dtype=np.float64),
+            self.surface,
+        )
+
+
+class IslTable(_ColumnTable):
+    COLUMNS = ("sat1", "sat2", "length")
+
+    def __init__(
+        self, sat1: Sequence[int], sat2: Sequence[int], length: Sequence[float]
+    ):
+        self.sat1: np.ndarray = np.asarray(sat1, dtype=np.int64)
+        self.sat2: np.ndarray = np.asarray(sat2, dtype=np.int64)
+        self.length: np.ndarray = np.asarray(length, dtype=np.float64)
+
+    def edges(self) -> List[Tuple[int, int]]:
+        return list(zip(self.sat1.tolist(), self.sat2.tolist()))
+
+    # Legacy conversions
+    @staticmethod
+    def from_list(isls: List[object]) -> "IslTable":
+        # From a list of IslInfo-like objects
+        return IslTable(*[[getattr(i, col) for i in isls] for col in IslTable.COLUMNS])
+
+    def to_list(self) -> List[IslRecord]:
+        return list(self)
+
+    # Read-only list view
+    def __len__(self) -> int:
+        return len(self.sat1)
+
+    def __iter__(self) -> Iterator[IslRecord]:
+        return (IslRecord(self, row) for row in range(len(self)))
+
+    def __getitem__(self, row: int) -> IslRecord:
+        if not -len(self) <= row < len(self):
+            raise IndexError("ISL index out of range")
+        return IslRecord(self, row % len(self))
+
+
+class PathStore(_ColumnTable):
+    # All the paths of a PathData, stored in CSR form: the nodes of path p are nodes[offsets[p]:offsets[p + 1]].
+    # Paths are numbered in the PathData order, and the path with number p has PathId (src[p], dst[p], idx[p]).
+    COLUMNS = ("nodes", "offsets", "src", "dst", "idx", "lengths")
+
+    def __init__(
+        self,
+        nodes: Sequence[int],
+        offsets: Sequence[int],
+        src: Sequence[int],
+        dst: Sequence[int],
+        idx: Sequence[int],
+        lengths: Sequence[float],
+    ):
+        self.nodes: np.ndarray = np.asarray(nodes, dtype=np.int64)
+        self.offsets: np.ndarray = np.asarray(offsets, dtype=np.int64)
+        self.src: np.ndarray = np.asarray(src, dtype=np.int64)
+        self.dst: np.ndarray = np.asarray(dst, dtype=np.int64)
+        self.idx: np.ndarray = np.asarray(idx, dtype=np.int64)
+        self.lengths: np.ndarray = np.asarray(lengths, dtype=np.float64)
+        assert len(self.offsets) == len(self.src) + 1
+
+    @staticmethod
+    def from_path_data(path_data: Dict) -> "PathStore":
+        nodes, offsets, src, dst, idx, lengths = [], [0], [], [], [], []
+        for pair, lb_set in path_data.items():
+            for list_id, (path, length) in enumerate(lb_set):
+                nodes.extend(path)
+                offsets.append(len(nodes))
+                src.append(pair[0])
+                dst.append(pair[1])
+                idx.append(list_id)
+                lengths.append(length)
+        return PathStore(nodes, offsets, src, dst, idx, lengths)
+
+    @staticmethod
+    def from_path_ids(
+        path_data: Dict, path_ids: List[Tuple[int, int, int]]
+    ) -> "PathStore":
+        # Only the given paths of a PathData, in the given order, also with repetitions
+        nodes, offsets, lengths = [], [0], []
+        for path_id in path_ids:
+            path, length = path_data[(path_id[0], path_id[1])][path_id[2]]
+            nodes.extend(path)
+            offsets.append(len(nodes))
+            lengths.append(length)
+        ids = np.array(path_ids, dtype=np.int64).reshape(-1, 3)
+        return PathStore(nodes, offsets, ids[:, 0], ids[:, 1], ids[:, 2], lengths)
+
+    def path(self, path_num: int) -> List[int]:
+        return self.nodes[self.offsets[path_num] : self.offsets[path_num + 1]].tolist()
+
+    def path_ids(
+        self, path_nums: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, int, int]]:
+        if path_nums is None:
+            return list(zip(self.src.tolist(), self.dst.tolist(), self.idx.tolist()))
+        path_nums = np.asarray(path_nums, dtype=np.int64)
+        return list(
+            zip(
+                self.src[path_nums].tolist(),
+                self.dst[path_nums].tolist(),
+                self.idx[path_nums].tolist(),
+            )
+        )
+
+    def hops(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (path_nums, from_nodes, to_nodes) of every hop of every path, in path order
+        num_hops = np.diff(self.offsets) - 1
+        path_nums = np.repeat(np.arange(len(self)), num_hops)
+        is_start = np.ones(len(self.nodes), dtype=bool)
+        is_start[self.offsets[1:] - 1] = False  # The last node of a path starts no hop
+        starts = np.flatnonzero(is_start)
+        return path_nums, self.nodes[starts], self.nodes[starts + 1]
+
+    def hop_edges(
+        self, edge_index: "EdgeIndex"
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Numbers of the edge and of the inverse edge of every hop, in the -1 notation and -1 if not in the index.
+        # Also returns the hop offsets: the hops of path p are hop_offsets[p]:hop_offsets[p + 1].
+        _, from_nodes, to_nodes = self.hops()
+        from_nodes, to_nodes = np.maximum(from_nodes, -1), np.maximum(to_nodes, -1)
+        hop_offsets = self.offsets - np.arange(len(self) + 1)
+        return (
+            edge_index.lookup(from_nodes, to_nodes),
+            edge_index.lookup(to_nodes, from_nodes),
+            hop_offsets,
+        )
+
+    def __len__(self) -> int:
+        return len(self.src)
+
+
+class _EdgeKeyedTable(_ColumnTable):
+    # A table with one row per directed edge, from_nodes[r] -> to_nodes[r], viewed as a read-only dictionary
+    RECORD = _Record
+
+    def __init__(self, from_nodes: Sequence[int], to_nodes: Sequence[int]):
+        self.from_nodes: np.ndarray = np.asarray(from_nodes, dtype=np.int64)
+        self.to_nodes: np.ndarray = np.asarray(to_nodes, dtype=np.int64)
+        self._index: Optional[Dict[Tuple[int, int], int]] = None
+
+    @property
+    def index(self) -> Dict[Tuple[int, int], int]:
+        # Map from edge to row, built at the first access
+        if self._index is None:
+            edges = zip(self.from_nodes.tolist(), self.to_nodes.tolist())
+            self._index = {ed: row for row, ed in enumerate(edges)}
+        return self._index
+
+    def edges(self) -> List[Tuple[int, int]]:
+        return list(self.index.keys())
+
+    def to_dict(self) -> Dict[Tuple[int, int], _Record]:
+        return dict(self.items())
+
+    # Read-only dictionary view
+    def __len__(self) -> int:
+        return len(self.from_nodes)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return iter(self.index)
+
+    def __contains__(self, edge) -> bool:
+        return edge in self.index
+
+    def __getitem__(self, edge: Tuple[int, int]) -> _Record:
+        return self.RECORD(self, self.index[edge])  # Raises with a wrong edge
+
+    def get(self, edge: Tuple[int, int], default=None) -> Optional[_Record]:
+        if edge not in self.index:
+            return default
+        return self[edge]
+
+    def keys(self):
+        return self.index.keys()
+
+    def values(self) -> List[_Record]:
+        return [self.RECORD(self, row) for row in range(len(self))]
+
+    def items(self) -> Iterator[Tuple[Tuple[int, int], _Record]]:
+        for edge, row in self.index.items():
+            yield edge, self.RECORD(self, row)
+
+
+class EdgeTable(_EdgeKeyedTable):
+    # Statistics of the directed edges, with an inverted index from each edge to the paths through it.
+    # The paths through the edge in row r are path_nums[indptr[r]:indptr[r + 1]], sorted, and the path with number p
+    # has PathId (path_src[p], path_dst[p], path_idx[p]).
+    COLUMNS = (
+        "from_nodes",
+        "to_nodes",
+        "centrality",
+        "cov_centr",
+        "indptr",
+        "path_nums",
+        "path_src",
+        "path_dst",
+        "path_idx",
+    )
+    RECORD = EdgeRecord
+
+    def __init__(
+        self,
+        from_nodes: Sequence[int],
+        to_nodes: Sequence[int],
+        centrality: Sequence[float],
+        cov_centr: Sequence[float],
+        indptr: Sequence[int],
+        path_nums: Sequence[int],
+        path_src: Sequence[int],
+        path_dst: Sequence[int],
+        path_idx: Sequence[int],
+    ):
+        super().__init__(from_nodes, to_nodes)
+        self.centrality: np.ndarray = np.asarray(centrality, dtype=np.float64)
+        self.cov_centr: np.ndarray = np.asarray(cov_centr, dtype=np.float64)
+        self.indptr: np.ndarray = np.asarray(indptr, dtype=np.int64)
+        self.path_nums: np.ndarray = np.asarray(path_nums, dtype=np.int64)
+        self.path_src: np.ndarray = np.asarray(path_src, dtype=np.int64)
+        self.path_dst: np.ndarray = np.asarray(path_dst, dtype=np.int64)
+        self.path_idx: np.ndarray = np.asarray(path_idx, dtype=np.int64)
+        assert len(self.indptr) == len(self.from_nodes) + 1
+
+    def path_nums_at(self, row: int) -> np.ndarray:
+        return self.path_nums[self.indptr[row] : self.indptr[row + 1]]
+
+    def paths(self, edge: Tuple[int, int]) -> np.ndarray:
+        # Sorted numbers of the paths through the edge, in the same direction
+        return self.path_nums_at(self.index[edge])
+
+    def path_ids(self, path_nums: Sequence[int]) -> List[Tuple[int, int, int]]:
+        path_nums = np.asarray(path_nums, dtype=np.int64)
+        return list(
+            zip(
+                self.path_src[path_nums].tolist(),
+                self.path_dst[path_nums].tolist(),
+                self.path_idx[path_nums].tolist(),
+            )
+        )
+
+
+class BwTable(_EdgeKeyedTable):
+    # Allocated (idle_bw) and total bandwidth of the directed edges. The allocation is integer, or fractional when the
+    # flows get a fair share of the bandwidth
+    COLUMNS = ("from_nodes", "to_nodes", "idle_bw", "capacity")
+    RECORD = BwRecord
+
+    def __init__(
+        self,
+        from_nodes: Sequence[int],
+        to_nodes: Sequence[int],
+        idle_bw: Sequence[float],
+        capacity: Sequence[int],
+    ):
+        super().__init__(from_nodes, to_nodes)
+        self.idle_bw: np.ndarray = np.asarray(idle_bw)
+        if not np.issubdtype(self.idle_bw.dtype, np.floating):
+            self.idle_bw = self.idle_bw.astype(np.int64)
+        self.capacity: np.ndarray = np.asarray(capacity, dtype=np.int64)
+
+    def remaining_bw(self) -> np.ndarray:
+        return self.capacity - self.idle_bw
+
+
+def sorted_intersection(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Intersection of two sorted arrays of unique values, sorted
+    if len(a) == 0 or len(b) == 0:
+        return a[:0]
+    pos = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[pos] == a]
+
+
+def sorted_difference(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Values of the sorted array a that are not in the sorted array b, sorted
+    return a[~sorted_isin(a, b)]
+
+
+def sorted_isin(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Mask of the values of the array a that are in the sorted array b
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros(len(a), dtype=bool)
+    pos = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return b[pos] == a
+
+
+def segment_positions(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    # Concatenation of the ranges [start, start + length)
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()))
+
+
+class EdgeIndex:
+    # Numbering of a list of edges, to index the columns of edge matrices. Node ids must be >= -1
+    def __init__(self, edges: List[Tuple[int, int]]):
+        self.edges: List[Tuple[int, int]] = edges
+        arr = np.array(edges, dtype=np.int64).reshape(-1, 2)
+        self._base: int = int(arr.max()) + 2 if len(edges) > 0 else 1
+        keys = self._keys(arr[:, 0], arr[:, 1])
+        self._order: np.ndarray = np.argsort(keys, kind="stable")
+        self._sorted_keys: np.ndarray = keys[self._order]
+
+    def _keys(self, from_nodes: np.ndarray, to_nodes: np.ndarray) -> np.ndarray:
+        return (from_nodes + 1) * self._base + (to_nodes + 1)
+
+    def lookup(self, from_nodes: np.ndarray, to_nodes: np.ndarray) -> np.ndarray:
+        # Edge numbers of the given edges, -1 for the edges not in the index
+        from_nodes, to_nodes = np.asarray(from_nodes), np.asarray(to_nodes)
+        result = np.full(len(from_nodes), -1, dtype=np.int64)
+        valid = (from_nodes >= -1) & (from_nodes + 1 < self._base)
+        valid &= (to_nodes >= -1) & (to_nodes + 1 < self._base)
+        if len(self.edges) == 0 or not np.any(valid):
+            return result
+        keys = self._keys(from_nodes[valid], to_nodes[valid])
+        pos = np.searchsorted(self._sorted_keys, keys)
+        pos = np.minimum(pos, len(self._sorted_keys) - 1)
+        found = self._sorted_keys[pos] == keys
+        result[np.flatnonzero(valid)[found]] = self._order[pos[found]]
+        return result
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+
+def _column(values: Optional[Sequence[float]], size: int) -> np.ndarray:
+    if values is None:
+        return np.zeros(size, dtype=np.float64)
+    return np.asarray(values, dtype=np.float64)
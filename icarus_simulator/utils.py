@@ -3,8 +3,12 @@
 File containing utility functions
 """
 import math
+import numpy as np
+
 from typing import Tuple, List
 
+from icarus_simulator.sat_core.planetary_const import GREAT_CIRCLE_RADIUS
+
 
 def get_ordered_idx(idx: Tuple[int, int]):
     if idx[0] > idx[1]:
@@ -29,6 +33,50 @@ def get_edge_length(network, ed, prop="length"):
     return network[ed[0]][ed[1]][prop]
 
 
+def unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    # Unit vectors of points on the sphere, shape (n, 3). Latitudes and longitudes are in degrees
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack(
+        (np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1
+    )
+
+
+def great_circle_dists(units1: np.ndarray, units2: np.ndarray) -> np.ndarray:
+    # Great-circle distances in meters between all the unit vectors of units1 and units2, shape (len1, len2).
+    # The atan2 of the cross and dot products is accurate at all angles, unlike the arccos of the dot product
+    cross = np.cross(units1[:, np.newaxis, :], units2[np.newaxis, :, :])
+    return GREAT_CIRCLE_RADIUS * np.arctan2(
+        np.linalg.norm(cross, axis=-1), units1 @ units2.T
+    )
+
+
+def paired_great_circle_dists(units1: np.ndarray, units2: np.ndarray) -> np.ndarray:
+    # Great-circle distances in meters between the unit vectors in the same rows of units1 and units2, shape (n,)
+    cross = np.cross(units1, units2)
+    return GREAT_CIRCLE_RADIUS * np.arctan2(
+        np.linalg.norm(cross, axis=-1), np.einsum("ij,ij->i", units1, units2)
+    )
+
+
+def great_circle_dist(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # Great-circle distance in meters between two points in degrees, as great_circle_dists() without numpy overhead
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    x1, y1, z1 = (
+        math.cos(lat1) * math.cos(lon1),
+        math.cos(lat1) * math.sin(lon1),
+        math.sin(lat1),
+    )
+    x2, y2, z2 = (
+        math.cos(lat2) * math.cos(lon2),
+        math.cos(lat2) * math.sin(lon2),
+        math.sin(lat2),
+    )
+    cross = math.sqrt(
+        (y1 * z2 - z1 * y2) ** 2 + (z1 * x2 - x1 * z2) ** 2 + (x1 * y2 - y1 * x2) ** 2
+    )
+    return GREAT_CIRCLE_RADIUS * math.atan2(cross, x1 * x2 + y1 * y2 + z1 * z2)
+
+
 def compute_intervals_uniform(length: int, cpus: int) -> List[Tuple[int, int]]:
     if length < cpus:
         cpus = length
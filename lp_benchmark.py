@@ -0,0 +1,97 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+"""
+Benchmark of the LP backends (see icarus_simulator/lp_solver.py) on the link attack phase.
+The upstream phases of the first configuration in configuration.py are computed, or read from the results directory,
+then the link attack of a sample of the edges is computed once with LPFeasStrat for every backend, and timed.
+The attack costs obtained with the different backends are compared, as the LPs can have multiple optimal solutions.
+The backends that are not available in the environment (see LPSolver.is_available) are skipped.
+
+Example, on 1000 edges and 8 cores:
+    python lp_benchmark.py --edges 1000 --cores 8 --solvers highs gurobi
+"""
+import time
+import random
+import argparse
+
+from icarus_simulator.icarus_simulator import IcarusSimulator
+from icarus_simulator.default_properties import *
+from icarus_simulator.lp_solver import SOLVERS
+from icarus_simulator.phases.link_attack_phase import AttackMultiproc, group_targets
+from icarus_simulator.strategies import LPFeasStrat
+from icarus_simulator.structure_definitions import AttackContext
+
+from configuration import CONFIG, parse_config, get_strat
+from main import create_phases, RESULTS_DIR, CORE_NUMBER
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the LP backends on the link attack phase."
+    )
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--cores", type=int, default=CORE_NUMBER)
+    parser.add_argument("--edges", type=int, help="number of sampled edges")
+    parser.add_argument("--solvers", nargs="+", default=["highs", "gurobi"])
+    args = parser.parse_args()
+    solvers = []
+    for solver in args.solvers:
+        if SOLVERS[solver].is_available():
+            solvers.append(solver)
+        else:
+            print(f"Skipping {solver}, it requires {SOLVERS[solver].REQUIREMENT}")
+    if len(solvers) == 0:
+        return
+
+    # Upstream properties, up to the traffic phase
+    conf = parse_config(CONFIG)[0]
+    sim = IcarusSimulator(
+        create_phases(conf)[:6], args.results_dir, num_cores=args.cores
+    )
+    sim.compute_simulation()
+    grid_pos, path_data = sim.get_property(GRID_POS), sim.get_property(PATH_DATA)
+    edge_data, bw_data = sim.get_property(EDGE_DATA), sim.get_property(BW_DATA)
+    edges = list(bw_data.keys())
+    if args.edges is not None and args.edges < len(edges):
+        edges = random.Random("ETHZ").sample(edges, args.edges)
+    allowed_sources = get_strat("atk_constr", conf).compute(grid_pos)
+    atk_ctx = AttackContext.from_bw_data(bw_data)
+
+    results = {}
+    for solver in solvers:
+        multi = AttackMultiproc(
+            args.cores,
+            1,
+            group_targets(edges, 1),
+            process_params=(
+                get_strat("atk_filt", conf),
+                LPFeasStrat(solver=solver),
+                get_strat("atk_optim", conf),
+                path_data,
+                edge_data,
+                atk_ctx,
+                allowed_sources,
+            ),
+        )
+        start = time.time()
+        results[solver] = multi.process_batches()
+        duration = time.time() - start
+        print(
+            f"{solver}: {duration:.2f}s for {len(edges)} edges, "
+            f"{duration / max(len(edges), 1) * 1000:.2f}ms per edge"
+        )
+
+    # Compare the attack costs to the first backend
+    base = results[solvers[0]]
+    for solver in solvers[1:]:
+        diff = 0
+        for ed, info in base.items():
+            other = results[solver][ed]
+            if (info is None) != (other is None) or (
+                info is not None and info.cost != other.cost
+            ):
+                diff += 1
+        print(f"{solver}: {diff} of {len(base)} attack costs differ from {solvers[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,10 +16,12 @@ After adjusting the class constants, execute the file to create the plots and th
 Due to the computational burden, it is advised to always run this library on a heavy-multicore machine.
 """
 from statistics import mean
+from typing import Dict, List
 
-from icarus_simulator.icarus_simulator import IcarusSimulator
+from icarus_simulator.sweep import ParameterSweep
 from icarus_simulator.default_properties import *
 from icarus_simulator.phases import *
+from icarus_simulator.phases.base_phase import BasePhase
 from sat_plotter import GeoPlotBuilder
 from sat_plotter.stat_plot_builder import StatPlotBuilder
 
@@ -30,138 +32,145 @@ CORE_NUMBER = 30
 RESULTS_DIR = "result_dumps"
 
 
+def create_phases(conf: Dict) -> List[BasePhase]:
+    # SIMULATION: phase definition for a single configuration
+    lsn_ph = LSNPhase(
+        True,
+        True,
+        lsn_strat=get_strat("lsn", conf),
+        lsn_out=SAT_POS,
+        nw_out=SAT_NW,
+        isls_out=SAT_ISLS,
+    )
+
+    grid_ph = GridPhase(
+        True,
+        True,
+        grid_strat=get_strat("grid", conf),
+        weight_strat=get_strat("gweight", conf),
+        grid_out=FULL_GRID_POS,
+        size_out=GRID_FULL_SZ,
+    )
+
+    cov_ph = CoveragePhase(
+        True,
+        True,
+        cov_strat=get_strat("cover", conf),
+        sat_in=SAT_POS,
+        grid_in=FULL_GRID_POS,
+        cov_out=COVERAGE,
+        grid_out=GRID_POS,
+    )
+
+    rout_ph = RoutingPhase(
+        True,
+        True,
+        CORE_NUMBER,
+        2,
+        rout_strat=get_strat("rout", conf),
+        grid_in=GRID_POS,
+        cov_in=COVERAGE,
+        nw_in=SAT_NW,
+        paths_out=PATH_DATA,
+    )
+
+    edge_ph = EdgePhase(
+        True,
+        True,
+        ed_strat=get_strat("edges", conf),
+        paths_in=PATH_DATA,
+        nw_in=SAT_NW,
+        sats_in=SAT_POS,
+        grid_in=GRID_POS,
+        edges_out=EDGE_DATA,
+    )
+
+    # FULL_GRID_POS is passed for consistency with other experiments, where the coverage grid filtering is different
+    bw_ph = TrafficPhase(
+        True,
+        True,
+        select_strat=get_strat("bw_sel", conf),
+        assign_strat=get_strat("bw_asg", conf),
+        grid_in=FULL_GRID_POS,
+        paths_in=PATH_DATA,
+        edges_in=EDGE_DATA,
+        bw_out=BW_DATA,
+    )
+
+    latk_ph = LinkAttackPhase(
+        True,
+        True,
+        CORE_NUMBER,
+        3,
+        geo_constr_strat=get_strat("atk_constr", conf),
+        filter_strat=get_strat("atk_filt", conf),
+        feas_strat=get_strat("atk_feas", conf),
+        optim_strat=get_strat("atk_optim", conf),
+        grid_in=GRID_POS,
+        paths_in=PATH_DATA,
+        edges_in=EDGE_DATA,
+        bw_in=BW_DATA,
+        latk_out=ATK_DATA,
+        group_size=conf["lnk_atk"]["group_size"],
+    )
+
+    zatk_ph = ZoneAttackPhase(
+        True,
+        True,
+        CORE_NUMBER,
+        4,
+        geo_constr_strat=get_strat("atk_constr", conf),
+        zone_select_strat=get_strat("zone_select", conf),
+        zone_build_strat=get_strat("zone_build", conf),
+        zone_edges_strat=get_strat("zone_edges", conf),
+        zone_bneck_strat=get_strat("zone_bneck", conf),
+        atk_filter_strat=get_strat("atk_filt", conf),
+        atk_feas_strat=get_strat("atk_feas", conf),
+        atk_optim_strat=get_strat("atk_optim", conf),
+        grid_in=GRID_POS,
+        paths_in=PATH_DATA,
+        edges_in=EDGE_DATA,
+        bw_in=BW_DATA,
+        atk_in=ATK_DATA,
+        zatk_out=ZONE_ATK_DATA,
+    )
+
+    return [lsn_ph, grid_ph, cov_ph, rout_ph, edge_ph, bw_ph, latk_ph, zatk_ph]
+
+
 def main():
 
     # Optional feature: parse the configuration file
     full_conf = parse_config(CONFIG)
 
+    # SIMULATION: all the configurations are computed together. Phases in common are computed only once
+    sweep = ParameterSweep(
+        [create_phases(conf) for conf in full_conf], RESULTS_DIR, num_cores=CORE_NUMBER
+    )
+    sweep.compute_simulation()
+    print("Computation finished")
+
     for conf_id, conf in enumerate(full_conf):
-        # Repeat the simulation process for all configurations in the config file
+        # Repeat the plotting process for all configurations in the config file
         print(
             "---------------------------------------------------------------------------------"
         )
         print(f"Configuration number {conf_id}")  # 0-based
 
-        # SIMULATION: phase definition and final computation
-        lsn_ph = LSNPhase(
-            True,
-            True,
-            lsn_strat=get_strat("lsn", conf),
-            lsn_out=SAT_POS,
-            nw_out=SAT_NW,
-            isls_out=SAT_ISLS,
-        )
-
-        grid_ph = GridPhase(
-            True,
-            True,
-            grid_strat=get_strat("grid", conf),
-            weight_strat=get_strat("gweight", conf),
-            grid_out=FULL_GRID_POS,
-            size_out=GRID_FULL_SZ,
-        )
-
-        cov_ph = CoveragePhase(
-            True,
-            True,
-            cov_strat=get_strat("cover", conf),
-            sat_in=SAT_POS,
-            grid_in=FULL_GRID_POS,
-            cov_out=COVERAGE,
-            grid_out=GRID_POS,
-        )
-
-        rout_ph = RoutingPhase(
-            True,
-            True,
-            CORE_NUMBER,
-            2,
-            rout_strat=get_strat("rout", conf),
-            grid_in=GRID_POS,
-            cov_in=COVERAGE,
-            nw_in=SAT_NW,
-            paths_out=PATH_DATA,
-        )
-
-        edge_ph = EdgePhase(
-            True,
-            True,
-            CORE_NUMBER,
-            1,
-            ed_strat=get_strat("edges", conf),
-            paths_in=PATH_DATA,
-            nw_in=SAT_NW,
-            sats_in=SAT_POS,
-            grid_in=GRID_POS,
-            edges_out=EDGE_DATA,
-        )
-
-        # FULL_GRID_POS is passed for consistency with other experiments, where the coverage grid filtering is different
-        bw_ph = TrafficPhase(
-            True,
-            True,
-            select_strat=get_strat("bw_sel", conf),
-            assign_strat=get_strat("bw_asg", conf),
-            grid_in=FULL_GRID_POS,
-            paths_in=PATH_DATA,
-            edges_in=EDGE_DATA,
-            bw_out=BW_DATA,
-        )
-
-        latk_ph = LinkAttackPhase(
-            True,
-            True,
-            CORE_NUMBER,
-            3,
-            geo_constr_strat=get_strat("atk_constr", conf),
-            filter_strat=get_strat("atk_filt", conf),
-            feas_strat=get_strat("atk_feas", conf),
-            optim_strat=get_strat("atk_optim", conf),
-            grid_in=GRID_POS,
-            paths_in=PATH_DATA,
-            edges_in=EDGE_DATA,
-            bw_in=BW_DATA,
-            latk_out=ATK_DATA,
-        )
-
-        zatk_ph = ZoneAttackPhase(
-            True,
-            True,
-            CORE_NUMBER,
-            4,
-            geo_constr_strat=get_strat("atk_constr", conf),
-            zone_select_strat=get_strat("zone_select", conf),
-            zone_build_strat=get_strat("zone_build", conf),
-            zone_edges_strat=get_strat("zone_edges", conf),
-            zone_bneck_strat=get_strat("zone_bneck", conf),
-            atk_filter_strat=get_strat("atk_filt", conf),
-            atk_feas_strat=get_strat("atk_feas", conf),
-            atk_optim_strat=get_strat("atk_optim", conf),
-            grid_in=GRID_POS,
-            paths_in=PATH_DATA,
-            edges_in=EDGE_DATA,
-            bw_in=BW_DATA,
-            atk_in=ATK_DATA,
-            zatk_out=ZONE_ATK_DATA,
-        )
-
-        sim = IcarusSimulator(
-            [lsn_ph, grid_ph, cov_ph, rout_ph, edge_ph, bw_ph, latk_ph, zatk_ph],
-            RESULTS_DIR,
-        )
-        sim.compute_simulation()
-        print("Computation finished")
-
         # EXAMPLE PLOTS
         # GEOGRAPHICAL PLOTS
         sat_pos, isls, grid_pos = (
-            sim.get_property(SAT_POS),
-            sim.get_property(SAT_ISLS),
-            sim.get_property(GRID_POS),
+            sweep.get_property(SAT_POS, conf_id),
+            sweep.get_property(SAT_ISLS, conf_id),
+            sweep.get_property(GRID_POS, conf_id),
         )
-        edge_data, bw_data = sim.get_property(EDGE_DATA), sim.get_property(BW_DATA)
-        path_data, atk_data = sim.get_property(PATH_DATA), sim.get_property(ATK_DATA)
-        zatk_data = sim.get_property(ZONE_ATK_DATA)
+        edge_data, bw_data = sweep.get_property(EDGE_DATA, conf_id), sweep.get_property(
+            BW_DATA, conf_id
+        )
+        path_data, atk_data = sweep.get_property(
+            PATH_DATA, conf_id
+        ), sweep.get_property(ATK_DATA, conf_id)
+        zatk_data = sweep.get_property(ZONE_ATK_DATA, conf_id)
 
         # As a first example, we plot the network as a background for other plots.
         # Note: for this plot, only outputs from lsn_ph are required, so Simulator([lsn_ph], BASEDIR) would work too
@@ -171,7 +180,7 @@ def main():
         )
 
         # Plot the grid with weights. The points are automatically bigger.
-        pt_vals = {idx: val.weight for idx, val in grid_pos.items()}
+        pt_vals = dict(zip(grid_pos.ids.tolist(), grid_pos.weight.tolist()))
         GeoPlotBuilder().set_transparency(False).point_heatmap(
             grid_pos, pt_vals
         ).save_to_file("02_grid.png")
@@ -348,6 +357,9 @@ def main():
             "15_zone_detect_cost.png"
         )
 
+        # The results of this configuration are not needed anymore, the next ones are loaded on demand
+        sweep.release_run(conf_id)
+
 
 # Execute on main
 if __name__ == "__main__":
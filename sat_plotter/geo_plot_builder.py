@@ -11,12 +11,13 @@ from typing import Dict, List
 
 from icarus_simulator.structure_definitions import (
     GeoPoint,
-    IslInfo,
+    Isls,
     SatPos,
     GridPos,
     Path,
     Edge,
 )
+from icarus_simulator.tables import PositionTable
 
 
 class GeoPlotBuilder:
@@ -75,13 +76,20 @@ class GeoPlotBuilder:
         return self
 
     # Plot the whole constellation in the background
-    def constellation(self, sat_pos: SatPos, isls: List[IslInfo]) -> "GeoPlotBuilder":
-        for isl in isls:
-            self.path(
-                [sat_pos[isl.sat1], sat_pos[isl.sat2]],
-                "rgba(200, 200, 200, 0.5)",
-                self.LOW,
-            )
+    def constellation(self, sat_pos: SatPos, isls: Isls) -> "GeoPlotBuilder":
+        # All the ISLs in a single trace, separated by None
+        rows1 = sat_pos.rows(isls.sat1.tolist())
+        rows2 = sat_pos.rows(isls.sat2.tolist())
+        lats, lons = [], []
+        for lat1, lon1, lat2, lon2 in zip(
+            sat_pos.lat[rows1].tolist(),
+            sat_pos.lon[rows1].tolist(),
+            sat_pos.lat[rows2].tolist(),
+            sat_pos.lon[rows2].tolist(),
+        ):
+            lats.extend([lat1, lat2, None])
+            lons.extend([lon1, lon2, None])
+        self._lines(lats, lons, "rgba(200, 200, 200, 0.5)", self.LOW)
         self.points(sat_pos, "rgba(200, 200, 200, 0.5)", self.LOW, "SAT")
         return self
 
@@ -171,11 +179,17 @@ class GeoPlotBuilder:
     def points(
         self, point_dict: Dict[int, GeoPoint], color: str, size_id: int, word_hover: str
     ) -> "GeoPlotBuilder":
-        lats, lons, texts = [], [], []
-        for idx, point in point_dict.items():
-            lats.append(point.lat)
-            lons.append(point.lon)
-            texts.append(f"{word_hover}{idx} - {point.lat}, {point.lon}")
+        if isinstance(point_dict, PositionTable):  # Read the columns directly
+            ids = point_dict.ids.tolist()
+            lats, lons = point_dict.lat.tolist(), point_dict.lon.tolist()
+        else:
+            ids = list(point_dict.keys())
+            lats = [point.lat for point in point_dict.values()]
+            lons = [point.lon for point in point_dict.values()]
+        texts = [
+            f"{word_hover}{idx} - {lat}, {lon}"
+            for idx, lat, lon in zip(ids, lats, lons)
+        ]
         self.fig.add_trace(
             go.Scattergeo(
                 lon=lons,
@@ -201,6 +215,18 @@ class GeoPlotBuilder:
         for cur in path_points:
             lats.append(cur.lat)
             lons.append(cur.lon)
+        self._lines(lats, lons, color, size_id, dash, hover)
+        return self
+
+    def _lines(
+        self,
+        lats: List[float],
+        lons: List[float],
+        color: str,
+        size_id: int,
+        dash: str = "solid",
+        hover: str = "",
+    ) -> None:
         self.fig.add_trace(
             go.Scattergeo(
                 lon=lons,
@@ -211,7 +237,6 @@ class GeoPlotBuilder:
                 line=dict(width=self.l_thick[size_id], color=color, dash=dash),
             )
         )
-        return self
 
     def arrow(
         self,
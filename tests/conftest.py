@@ -0,0 +1,107 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+"""
+Shared fixtures for the regression tests.
+The optimised strategies are checked against the implementations they replaced, on a small scenario that is
+computed once per test session: a 8x8 Walker constellation over a coarse geodesic grid.
+"""
+import pytest
+
+from icarus_simulator.icarus_simulator import IcarusSimulator
+from icarus_simulator.default_properties import (
+    SAT_POS,
+    SAT_NW,
+    SAT_ISLS,
+    FULL_GRID_POS,
+    GRID_FULL_SZ,
+    GRID_POS,
+    COVERAGE,
+    PATH_DATA,
+    EDGE_DATA,
+    BW_DATA,
+)
+from icarus_simulator.phases import (
+    LSNPhase,
+    GridPhase,
+    CoveragePhase,
+    RoutingPhase,
+    EdgePhase,
+    TrafficPhase,
+)
+from icarus_simulator.strategies import (
+    ManhLSNStrat,
+    GeodesicGridStrat,
+    UniformWeightStrat,
+    AngleCovStrat,
+    KSPRoutStrat,
+    BidirEdgeStrat,
+    SampledBwSelectStrat,
+    BidirBwAssignStrat,
+)
+
+SCENARIO_PROPS = [FULL_GRID_POS, GRID_POS, PATH_DATA, EDGE_DATA, BW_DATA]
+
+
+@pytest.fixture(scope="session")
+def scenario(tmp_path_factory):
+    lsn_strat = ManhLSNStrat(53, 8, 8, 1, 550000, 0, 2, 17, 0, "2020/01/01 00:00:00")
+    phases = [
+        LSNPhase(
+            False,
+            False,
+            lsn_strat=lsn_strat,
+            lsn_out=SAT_POS,
+            nw_out=SAT_NW,
+            isls_out=SAT_ISLS,
+        ),
+        GridPhase(
+            False,
+            False,
+            grid_strat=GeodesicGridStrat(3),
+            weight_strat=UniformWeightStrat(),
+            grid_out=FULL_GRID_POS,
+            size_out=GRID_FULL_SZ,
+        ),
+        CoveragePhase(
+            False,
+            False,
+            cov_strat=AngleCovStrat(25),
+            sat_in=SAT_POS,
+            grid_in=FULL_GRID_POS,
+            cov_out=COVERAGE,
+            grid_out=GRID_POS,
+        ),
+        RoutingPhase(
+            False,
+            False,
+            1,
+            1,
+            rout_strat=KSPRoutStrat(2.3, 3),
+            grid_in=GRID_POS,
+            nw_in=SAT_NW,
+            cov_in=COVERAGE,
+            paths_out=PATH_DATA,
+        ),
+        EdgePhase(
+            False,
+            False,
+            ed_strat=BidirEdgeStrat(),
+            paths_in=PATH_DATA,
+            nw_in=SAT_NW,
+            sats_in=SAT_POS,
+            grid_in=GRID_POS,
+            edges_out=EDGE_DATA,
+        ),
+        TrafficPhase(
+            False,
+            False,
+            select_strat=SampledBwSelectStrat(5000),
+            assign_strat=BidirBwAssignStrat(120, 60, 0.9),
+            grid_in=FULL_GRID_POS,
+            paths_in=PATH_DATA,
+            edges_in=EDGE_DATA,
+            bw_out=BW_DATA,
+        ),
+    ]
+    sim = IcarusSimulator(phases, str(tmp_path_factory.mktemp("results")), num_cores=1)
+    sim.compute_simulation()
+    return {prop: sim.get_property(prop) for prop in SCENARIO_PROPS}
@@ -0,0 +1,65 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+import pytest
+
+from icarus_simulator.default_properties import FULL_GRID_POS, PATH_DATA, EDGE_DATA
+from icarus_simulator.strategies import BidirBwAssignStrat, SampledBwSelectStrat
+from icarus_simulator.structure_definitions import BwInfo
+from icarus_simulator.utils import get_edges
+
+
+def reference_assignment(strat, path_data, path_list, edge_data):
+    # The dict-based greedy admission that BidirBwAssignStrat replaced
+    max_updown = int(strat.udl_bw * strat.utilisation)
+    max_isl = int(strat.isl_bw * strat.utilisation)
+    bw_data = {
+        ed: (BwInfo(0, strat.isl_bw) if -1 not in ed else BwInfo(0, strat.udl_bw))
+        for ed in edge_data
+    }
+    for path_id in path_list:
+        path = path_data[(path_id[0], path_id[1])][path_id[2]][0]
+        path = [-1] + path[1:-1] + [-1]
+        eds = list(get_edges(path))
+        eds[1], eds[-1] = eds[-1], eds[1]
+        path_fits = True
+        for ed in eds:
+            max_link = max_updown if -1 in ed else max_isl
+            if bw_data[ed].idle_bw + 1 > max_link:
+                path_fits = False
+                break
+        if path_fits:
+            for ed in get_edges(path):
+                bw_data[ed].idle_bw += 1
+                bw_data[(ed[1], ed[0])].idle_bw += 1
+    return bw_data
+
+
+@pytest.mark.parametrize(
+    "isl_bw, udl_bw, quanta, seed",
+    [(120, 60, 5000, 0), (12, 6, 5000, 1), (40, 30, 20000, 2), (1000, 1000, 500, 3)],
+)
+def test_assignment_matches_reference(scenario, isl_bw, udl_bw, quanta, seed):
+    path_data, edge_data = scenario[PATH_DATA], scenario[EDGE_DATA]
+    path_list = SampledBwSelectStrat(quanta, seed).compute(
+        scenario[FULL_GRID_POS], path_data
+    )
+    strat = BidirBwAssignStrat(isl_bw, udl_bw, 0.9)
+    bw_data = strat.compute(path_data, path_list, edge_data)
+    expected = reference_assignment(strat, path_data, path_list, edge_data)
+
+    assert list(bw_data.keys()) == list(expected.keys())
+    for ed, info in expected.items():
+        assert bw_data[ed].idle_bw == info.idle_bw
+        assert bw_data[ed].capacity == info.capacity
+
+
+def test_assignment_leaves_paths_unchanged(scenario):
+    path_data, edge_data = scenario[PATH_DATA], scenario[EDGE_DATA]
+    path_list = SampledBwSelectStrat(2000).compute(scenario[FULL_GRID_POS], path_data)
+    before = {
+        pair: [list(path) for path, _ in lb_set] for pair, lb_set in path_data.items()
+    }
+    BidirBwAssignStrat(120, 60, 0.9).compute(path_data, path_list, edge_data)
+    after = {
+        pair: [list(path) for path, _ in lb_set] for pair, lb_set in path_data.items()
+    }
+    assert before == after
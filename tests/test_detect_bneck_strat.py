@@ -0,0 +1,95 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+import copy
+import random
+
+from icarus_simulator.default_properties import BW_DATA
+from icarus_simulator.strategies import DetectBneckStrat
+from icarus_simulator.structure_definitions import AttackContext, AttackInfo
+
+
+def reference_bottlenecks(atk_ctx, atk_data, path_edges, tot_cross_zone_paths):
+    # The set cover that DetectBneckStrat replaced, which rescans all the edges at each pick
+    incrs = {ed: atk_data[ed].detectability for ed in path_edges}
+    costs = {ed: (incrs[ed] / len(path_edges[ed])) for ed in path_edges}
+    sorted_path_edges = sorted(costs.items(), key=lambda k: k[1])
+    inf = 90000000000000
+    bnecks = []
+    for attempt_id in range(3):
+        costs_copy = copy.deepcopy(costs)
+        if attempt_id >= len(sorted_path_edges):
+            continue
+        best_ed = sorted_path_edges[attempt_id][0]
+        picked_edges = [best_ed]
+        costs_copy[best_ed] = inf
+        covered_paths = set(path_edges[best_ed])
+        while len(covered_paths) < tot_cross_zone_paths:
+            for ed in costs_copy:
+                if costs_copy[ed] < inf:
+                    diff_len = len(path_edges[ed].difference(covered_paths))
+                    if diff_len == 0:
+                        costs_copy[ed] = inf
+                    else:
+                        costs_copy[ed] = incrs[ed] / diff_len
+            best_ed = min(costs_copy, key=lambda k: costs_copy[k])
+            if costs_copy[best_ed] == inf:
+                break
+            picked_edges.append(best_ed)
+            costs_copy[best_ed] = inf
+            covered_paths.update(path_edges[best_ed])
+
+        redundancies = [0] * tot_cross_zone_paths
+        for pe in picked_edges:
+            for p in path_edges[pe]:
+                redundancies[p] += 1
+        while True:
+            removable_edges = []
+            for pe in picked_edges:
+                removable, min_redundancy = True, 999999
+                for p in path_edges[pe]:
+                    min_redundancy = min(min_redundancy, redundancies[p])
+                    if redundancies[p] - 1 == 0:
+                        removable = False
+                        break
+                if removable:
+                    removable_edges.append(
+                        (min_redundancy, atk_ctx.get_remaining_bw(pe), pe)
+                    )
+            if len(removable_edges) == 0:
+                break
+            chosen = min(removable_edges, key=lambda k: (k[0], -k[1]))[2]
+            for p in path_edges[chosen]:
+                redundancies[p] -= 1
+            picked_edges.remove(chosen)
+
+        covered_paths = set()
+        for link in picked_edges:
+            covered_paths.update(path_edges[link])
+        if len(covered_paths) == tot_cross_zone_paths:
+            bnecks.append(picked_edges)
+    return bnecks
+
+
+def random_instance(rng, edges, max_paths, max_edges, negative):
+    tot = rng.randint(1, max_paths)
+    path_edges, atk_data = {}, {}
+    for ed in rng.sample(edges, rng.randint(1, max_edges)):
+        size = rng.randint(1, min(tot, rng.choice([1, 3, 10, 40])))
+        path_edges[ed] = set(rng.sample(range(tot), size))
+        low = -1 if negative else 0
+        detect = rng.choice([rng.randint(0, 5), rng.randint(low, 60)])
+        atk_data[ed] = AttackInfo(0, detect, 0, set())
+    return atk_data, path_edges, tot
+
+
+def test_bottlenecks_match_reference(scenario):
+    # Few candidates with few paths, so that the detectability ties are frequent, and some larger instances
+    atk_ctx = AttackContext.from_bw_data(scenario[BW_DATA])
+    edges = list(scenario[BW_DATA].keys())
+    strat, rng = DetectBneckStrat(), random.Random(0)
+    for trial in range(1000):
+        max_paths, max_edges = (60, 40) if trial < 850 else (400, 200)
+        atk_data, path_edges, tot = random_instance(
+            rng, edges, max_paths, max_edges, trial % 5 == 0
+        )
+        expected = reference_bottlenecks(atk_ctx, atk_data, path_edges, tot)
+        assert strat.compute(atk_ctx, atk_data, path_edges, tot) == expected
@@ -0,0 +1,64 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+import random
+
+from collections import Counter
+
+from icarus_simulator.default_properties import GRID_POS, PATH_DATA, EDGE_DATA
+from icarus_simulator.strategies import DirectionalFilteringStrat
+
+
+def reference_directions(edges, edge_data, path_data, allowed_sources):
+    # The dict-based truncation that DirectionalFilteringStrat replaced
+    direction_data = {}
+    for edge in edges:
+        inv_ed = (edge[1], edge[0])
+        idxs_in_order = edge_data[edge].paths_through
+        idxs_in_rev = list(set(edge_data[inv_ed].paths_through) - set(idxs_in_order))
+        idxs = idxs_in_order + idxs_in_rev
+        for i, idx in enumerate(idxs):
+            in_order = i < len(idxs_in_order)
+            base_path = path_data[(idx[0], idx[1])][idx[2]][0]
+            pair = idx[0], idx[1]
+            if not in_order:
+                base_path = base_path[::-1]
+                pair = idx[1], idx[0]
+            if -base_path[0] not in allowed_sources:
+                continue
+            if edge[1] != -1:
+                last_idx = base_path.index(edge[1])
+                truncated = tuple([-1] + base_path[1 : last_idx + 1])
+            else:
+                truncated = tuple([-1] + base_path[1:-1] + [-1])
+            direction_data.setdefault(truncated, []).append(pair)
+    return direction_data
+
+
+def normalize(direction_data):
+    # The reference visits the reversed paths in set order
+    return {dire: Counter(pairs) for dire, pairs in direction_data.items()}
+
+
+def test_single_edges_match_reference(scenario):
+    edge_data, path_data = scenario[EDGE_DATA], scenario[PATH_DATA]
+    ids = scenario[GRID_POS].ids.tolist()
+    strat = DirectionalFilteringStrat()
+    strat.prepare(edge_data, path_data)
+    for allowed in [ids, random.Random(0).sample(ids, len(ids) // 3)]:
+        for edge in edge_data.keys():
+            expected = reference_directions([edge], edge_data, path_data, allowed)
+            result = strat.compute([edge], edge_data, path_data, allowed)
+            assert normalize(result) == normalize(expected)
+    strat.release()
+
+
+def test_edge_groups_match_reference(scenario):
+    edge_data, path_data = scenario[EDGE_DATA], scenario[PATH_DATA]
+    ids = scenario[GRID_POS].ids.tolist()
+    edges = list(edge_data.keys())
+    strat = DirectionalFilteringStrat()
+    rng = random.Random(1)
+    for _ in range(20):
+        group = rng.sample(edges, 5)
+        expected = reference_directions(group, edge_data, path_data, ids)
+        result = strat.compute(group, edge_data, path_data, ids)
+        assert normalize(result) == normalize(expected)
@@ -0,0 +1,75 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+import numpy as np
+import pytest
+
+from icarus_simulator.default_properties import FULL_GRID_POS
+from icarus_simulator.strategies import KclosestZoneStrat
+from icarus_simulator.utils import (
+    unit_vectors,
+    great_circle_dists,
+    paired_great_circle_dists,
+    great_circle_dist,
+)
+
+great_circle = pytest.importorskip("geopy.distance").great_circle
+
+# The kernels agree with geopy well below a millimeter, at all angles
+TOLERANCE = 1e-6
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(-90, 90, 200), rng.uniform(-180, 180, 200)
+    # Coincident, antipodal, polar and date-line points
+    lat[:8] = [0, 0, 45, -45, 90, -90, 10, 10]
+    lon[:8] = [0, 180, 10, -170, 0, 0, 179.9, -179.9]
+    return lat, lon
+
+
+def test_all_pairs_match_geopy(points):
+    lat, lon = points
+    units = unit_vectors(lat, lon)
+    dists = great_circle_dists(units, units)
+    for i in range(len(lat)):
+        for j in range(len(lat)):
+            expected = great_circle((lat[i], lon[i]), (lat[j], lon[j])).meters
+            assert dists[i, j] == pytest.approx(expected, abs=TOLERANCE)
+
+
+def test_paired_and_scalar_match_geopy(points):
+    lat, lon = points
+    perm = np.random.default_rng(1).permutation(len(lat))
+    # Also pair the edge cases among themselves
+    perm[:8] = [1, 0, 3, 2, 5, 4, 7, 6]
+    dists = paired_great_circle_dists(
+        unit_vectors(lat, lon), unit_vectors(lat[perm], lon[perm])
+    )
+    for i, j in enumerate(perm):
+        expected = great_circle((lat[i], lon[i]), (lat[j], lon[j])).meters
+        assert dists[i] == pytest.approx(expected, abs=TOLERANCE)
+        scalar = great_circle_dist(lat[i], lon[i], lat[j], lon[j])
+        assert scalar == pytest.approx(expected, abs=TOLERANCE)
+
+
+def test_zone_distances_match_geopy(scenario):
+    # The minimum distance between two zones, as computed by the zone attack phase
+    grid_pos = scenario[FULL_GRID_POS]
+    grid_units, ids = grid_pos.unit_vectors(), grid_pos.ids.tolist()
+    strat = KclosestZoneStrat(4)
+    for i in range(len(ids)):
+        zone1, zone2 = strat.compute(grid_pos, ids[i], ids[(i * 11 + 5) % len(ids)])
+        min_dist = float(
+            great_circle_dists(
+                grid_units[grid_pos.rows(zone1)], grid_units[grid_pos.rows(zone2)]
+            ).min()
+        )
+        expected = min(
+            great_circle(
+                (grid_pos[idx1].lat, grid_pos[idx1].lon),
+                (grid_pos[idx2].lat, grid_pos[idx2].lon),
+            ).meters
+            for idx1 in zone1
+            for idx2 in zone2
+        )
+        assert min_dist == pytest.approx(expected, abs=TOLERANCE)
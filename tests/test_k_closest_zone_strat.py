@@ -0,0 +1,55 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+import numpy as np
+import pytest
+
+from scipy.spatial import cKDTree
+
+from icarus_simulator.default_properties import FULL_GRID_POS, GRID_POS
+from icarus_simulator.sat_core.coordinate_util import geo2cart
+from icarus_simulator.strategies import KclosestZoneStrat, GeodesicGridStrat
+
+
+def reference_zones(size, grid_pos, center1, center2):
+    # The zones built as before the neighbor table: a KD-tree of the grid is built and queried at each call
+    grid_cart = np.zeros((len(grid_pos), 3))
+    grid_map = {}
+    for i, grid_id in enumerate(grid_pos):
+        grid_map[i] = grid_id
+        grid_cart[i] = geo2cart(
+            {"elev": 0, "lon": grid_pos[grid_id].lon, "lat": grid_pos[grid_id].lat}
+        )
+    closest = []
+    kd = cKDTree(grid_cart)
+    for point in [grid_pos[center1], grid_pos[center2]]:
+        _, closest_grid_indices = kd.query(
+            geo2cart({"elev": 0, "lon": point.lon, "lat": point.lat}), k=size
+        )
+        closest.append([grid_map[idx] for idx in np.atleast_1d(closest_grid_indices)])
+    return closest[0], closest[1]
+
+
+@pytest.fixture(scope="module")
+def grids(scenario):
+    return [scenario[GRID_POS], scenario[FULL_GRID_POS], GeodesicGridStrat(5).compute()]
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 12])
+def test_zones_match_reference(grids, size):
+    strat = KclosestZoneStrat(size)
+    for grid_pos in grids:
+        ids = grid_pos.ids.tolist()
+        strat.prepare(grid_pos)
+        for i in range(len(ids)):
+            center1, center2 = ids[i], ids[(i * 7 + 3) % len(ids)]
+            expected = reference_zones(size, grid_pos, center1, center2)
+            assert strat.compute(grid_pos, center1, center2) == expected
+        strat.release()
+
+
+def test_table_follows_the_grid(grids):
+    # Without prepare(), the table is built at the first call, and rebuilt when the grid changes
+    strat = KclosestZoneStrat(3)
+    for grid_pos in grids + grids:
+        center1, center2 = grid_pos.ids[0], grid_pos.ids[-1]
+        expected = reference_zones(3, grid_pos, center1, center2)
+        assert strat.compute(grid_pos, center1, center2) == expected
@@ -0,0 +1,161 @@
+#  2020 Tommaso Ciussani and Giacomo Giuliari
+import pytest
+
+from math import sqrt, log, ceil
+
+from icarus_simulator.default_properties import GRID_POS, PATH_DATA, EDGE_DATA, BW_DATA
+from icarus_simulator.strategies import (
+    DirectionalFilteringStrat,
+    ProbFeasStrat,
+    BinSearchOptimStrat,
+)
+from icarus_simulator.strategies.atk_feasibility_check.base_feas_strat import (
+    BaseFeasStrat,
+)
+from icarus_simulator.structure_definitions import AttackContext, PairInfo
+from icarus_simulator.utils import get_ordered_idx, get_edges
+
+
+class ReferenceProbFeasStrat(BaseFeasStrat):
+    # The dict-based greedy that ProbFeasStrat replaced
+    def __init__(self, beta: float):
+        super().__init__()
+        self.beta = beta
+
+    @property
+    def name(self) -> str:
+        return "ref"
+
+    @property
+    def param_description(self) -> str:
+        return f"{self.beta}"
+
+    def compute(
+        self, congest_edges, path_data, atk_ctx, direction_data, max_uplink_increase
+    ):
+        gamma, beta, target = 1 / (atk_ctx.isl_num ** 2), self.beta, congest_edges[0]
+        needed_hosts = atk_ctx.get_remaining_bw(target)
+
+        prob_map = {}
+        for dire, pairs in direction_data.items():
+            for p in pairs:
+                if p not in prob_map:
+                    prob_map[p] = PairInfo()
+                prob_map[p].prob += 1
+                prob_map[p].directions.add(dire)
+        for p in prob_map:
+            ord_p = get_ordered_idx(p)[0]
+            prob_map[p].prob /= len(path_data[ord_p])
+            prob_map[p].tot = len(path_data[ord_p])
+        pair_list = list(prob_map.keys())
+        pair_list.sort(key=lambda k: prob_map[k].prob, reverse=True)
+
+        def max_mean(cap):
+            return (
+                -sqrt(log(gamma) * (log(gamma) - 8 * cap)) - log(gamma) + 2 * cap
+            ) / 2
+
+        mean = 0.0
+        min_mean = sqrt(log(beta) * (log(beta) - 2 * needed_hosts)) + needed_hosts
+        min_mean -= log(beta)
+        link_means, link_max_means, link_caps = {}, {}, {}
+        atk_flow_set = set()
+        for pair in pair_list:
+            prob, tot = prob_map[pair].prob, prob_map[pair].tot
+            link_counts = {}
+            for di in prob_map[pair].directions:
+                for link in get_edges(di, excl_end=1):
+                    if link not in link_means:
+                        cap = atk_ctx.get_remaining_bw(link)
+                        if link[0] == -1:
+                            cap = min(cap, max_uplink_increase)
+                        link_caps[link], link_means[link] = cap, 0.0
+                        link_max_means[link] = max_mean(cap)
+                    link_counts[link] = link_counts.get(link, 0) + 1
+
+            if prob == 1.0:
+                fits = int(ceil(needed_hosts - mean))
+            else:
+                fits = int(ceil((min_mean - mean) / prob))
+            for link in link_counts:
+                link_prob = link_counts[link] / tot
+                if link_prob == 1.0:
+                    fits_link = int(link_caps[link] - link_means[link])
+                else:
+                    fits_link = int(
+                        (link_max_means[link] - link_means[link]) / link_prob
+                    )
+                fits = min(fits, fits_link)
+                if fits <= 0:
+                    break
+            if fits <= 0:
+                continue
+
+            if prob == 1.0:
+                needed_hosts -= fits
+                if needed_hosts <= 0:
+                    min_mean = 0.0
+                else:
+                    min_mean = sqrt(log(beta) * (log(beta) - 2 * needed_hosts))
+                    min_mean += needed_hosts - log(beta)
+            else:
+                mean += prob * fits
+            atk_flow_set.add((pair, fits))
+            if mean >= min_mean:
+                break
+
+            for link in link_counts:
+                link_prob = link_counts[link] / tot
+                if link_prob == 1.0:
+                    link_caps[link] = max(link_caps[link] - fits, 0)
+                    link_max_means[link] = max(max_mean(link_caps[link]), 0)
+                else:
+                    link_means[link] += link_prob * fits
+
+        if mean < min_mean:
+            return None, -1, -1
+        on_trg = ceil(mean + atk_ctx.get_remaining_bw(target) - needed_hosts)
+        detect = -1
+        for link in link_caps:
+            if link[0] == -1:
+                final_cap = min(atk_ctx.get_remaining_bw(link), max_uplink_increase)
+                incr = ceil(link_means[link] + final_cap - link_caps[link])
+                detect = max(detect, incr)
+        return atk_flow_set, on_trg, detect
+
+
+@pytest.fixture(scope="module")
+def attack_inputs(scenario):
+    edge_data, path_data = scenario[EDGE_DATA], scenario[PATH_DATA]
+    atk_ctx = AttackContext.from_bw_data(scenario[BW_DATA])
+    allowed = scenario[GRID_POS].ids.tolist()
+    filter_strat = DirectionalFilteringStrat()
+    directions = {
+        edge: filter_strat.compute([edge], edge_data, path_data, allowed)
+        for edge in scenario[BW_DATA].keys()
+    }
+    return path_data, atk_ctx, directions
+
+
+@pytest.mark.parametrize("beta", [0.1, 0.5, 0.9])
+def test_compute_matches_reference(attack_inputs, beta):
+    path_data, atk_ctx, directions = attack_inputs
+    strat, reference = ProbFeasStrat(beta), ReferenceProbFeasStrat(beta)
+    feasible = 0
+    for up in [atk_ctx.uplink_size, 10, 3, 1, 0]:
+        for edge, direction_data in directions.items():
+            result = strat.compute([edge], path_data, atk_ctx, direction_data, up)
+            expected = reference.compute([edge], path_data, atk_ctx, direction_data, up)
+            assert result == expected
+            feasible += result[0] is not None
+    assert feasible > 0
+
+
+def test_prepared_problem_matches_reference(attack_inputs):
+    # The same problem is solved for all the bounds of the binary search
+    path_data, atk_ctx, directions = attack_inputs
+    strat, reference = ProbFeasStrat(0.1), ReferenceProbFeasStrat(0.1)
+    optim = BinSearchOptimStrat(1.0)
+    for edge, direction_data in directions.items():
+        args = [edge], path_data, atk_ctx, direction_data, atk_ctx.uplink_size
+        assert optim.compute(*args, strat) == optim.compute(*args, reference)